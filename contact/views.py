@@ -8,6 +8,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_http_methods
 from .forms import ContactForm
+from core import site_cache
 from .models import ContactInfo, ContactMessage
 
 
@@ -19,7 +20,7 @@ class ContactView(TemplateView):
         
         # Get active contact information
         try:
-            contact_info = ContactInfo.objects.filter(is_active=True).first()
+            contact_info = site_cache.get_contact_info()
             if not contact_info:
                 # Create default contact info if none exists
                 contact_info = ContactInfo.objects.create(
@@ -59,7 +60,7 @@ class ContactView(TemplateView):
                 contact_message = form.save()
                 
                 # Get contact info for email
-                contact_info = ContactInfo.objects.filter(is_active=True).first()
+                contact_info = site_cache.get_contact_info()
                 
                 # Send email notification
                 if contact_info and settings.EMAIL_HOST_USER:
@@ -145,7 +146,7 @@ class ContactAjaxView(TemplateView):
 def get_contact_info(request):
     """API endpoint to get contact information"""
     try:
-        contact_info = ContactInfo.objects.filter(is_active=True).first()
+        contact_info = site_cache.get_contact_info()
         if contact_info:
             return JsonResponse({
                 'success': True,
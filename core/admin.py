@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django import forms
 from django.urls import reverse
 from django.utils.html import format_html
@@ -190,6 +190,13 @@ class WebsiteThemeAdmin(admin.ModelAdmin):
             # Deactivate all other themes
             WebsiteTheme.objects.filter(is_active=True).exclude(pk=obj.pk).update(is_active=False)
         super().save_model(request, obj, form, change)
+        if obj.get_custom_css_markup():
+            self.message_user(
+                request,
+                'Custom CSS contains HTML outside <style> tags (e.g. <script>); it is not added to pages, '
+                'only the CSS inside <style> tags is.',
+                messages.WARNING,
+            )
 
 
 
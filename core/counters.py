@@ -0,0 +1,95 @@
+"""
+Denormalized counts for the page hero stats.
+
+Counting rows on every render of every page with a hero adds up, so the
+totals live in SiteCounter rows. Signals (see core.signals) add or subtract
+one as counted rows are created or deleted, inside the same transaction, so a
+rolled back save leaves the counter untouched; reading every counter is then
+a single query on a tiny table.
+
+The upcoming events count changes as days pass without anything being saved,
+and the sports count (distinct sports that have events) can't be adjusted by
+one when an event moves between sports. Both are recomputed (an indexed date
+range count, a distinct count of event sports) the first time they are read
+on a new day, and after any event is saved or deleted.
+
+Bulk operations that skip signals (bulk_create, queryset.update) can make the
+totals drift; `manage.py reconcile_counters` recomputes them exactly.
+"""
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Counter name -> model whose rows it counts
+COUNTED_MODELS = {
+    'events': 'events.Event',
+    'teams': 'teams.Team',
+    'players': 'teams.Player',
+    'gallery_items': 'gallery.GalleryItem',
+}
+UPCOMING_EVENTS = 'upcoming_events'
+# Sports with at least one event, not every Sport row
+EVENT_SPORTS = 'sports'
+# Recomputed after event changes and daily instead of adjusted by signals
+EVENT_COUNTERS = (UPCOMING_EVENTS, EVENT_SPORTS)
+COUNTER_NAMES = (*COUNTED_MODELS, *EVENT_COUNTERS)
+
+
+def compute(name, today=None):
+    """Exact value of a counter"""
+    Event = apps.get_model('events.Event')
+    if name == UPCOMING_EVENTS:
+        return Event.objects.upcoming(today).count()
+    if name == EVENT_SPORTS:
+        return Event._base_manager.order_by().values('sport').distinct().count()
+    return apps.get_model(COUNTED_MODELS[name])._base_manager.count()
+
+
+def increment(name, delta=1):
+    from .models import SiteCounter
+    SiteCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def expire(*names):
+    """Have event counters recomputed on their next read"""
+    from .models import SiteCounter
+    SiteCounter.objects.filter(name__in=names).update(as_of=None)
+
+
+def store(name, today=None):
+    """Recompute a counter and save it; returns the new value"""
+    from .models import SiteCounter
+    today = today or timezone.localdate()
+    value = compute(name, today)
+    as_of = today if name in EVENT_COUNTERS else None
+    try:
+        with transaction.atomic():
+            SiteCounter.objects.update_or_create(name=name, defaults={'value': value, 'as_of': as_of})
+    except IntegrityError:
+        # Another request created the row first; its value is as good as ours
+        pass
+    return value
+
+
+def get_counters():
+    """{counter name: value} for every counter, computing missing or outdated ones"""
+    from .models import SiteCounter
+    today = timezone.localdate()
+    rows = {row.name: row for row in SiteCounter.objects.filter(name__in=COUNTER_NAMES)}
+    counters = {}
+    for name in COUNTER_NAMES:
+        row = rows.get(name)
+        if row is None or (name in EVENT_COUNTERS and row.as_of != today):
+            counters[name] = store(name, today)
+        else:
+            counters[name] = row.value
+    return counters
+
+
+def reconcile():
+    """Recompute every counter; returns [(name, stored value or None, exact value)]"""
+    from .models import SiteCounter
+    today = timezone.localdate()
+    stored = dict(SiteCounter.objects.filter(name__in=COUNTER_NAMES).values_list('name', 'value'))
+    return [(name, stored.get(name), store(name, today)) for name in COUNTER_NAMES]
@@ -0,0 +1,77 @@
+"""
+Cached state of polled feeds: the event calendars (events.ical) and the news
+RSS and Atom feeds (news.feeds).
+
+Calendar apps and feed readers poll, so answering an unchanged feed must be
+cheap. A FeedState derives an ETag token and the Last-Modified time from the
+number of rows of a model and their max(updated_at), and keeps them in the
+Django cache. Signals call invalidate() after the rows change; it also records
+the time of the change, so that a deletion moves Last-Modified forward. A
+conditional request for an unchanged feed is answered with 304 from the cache
+alone, and rendered bodies are cached under the state token, so a change
+retires them too.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+BODY_TIMEOUT = 60 * 60 * 24
+
+
+class FeedState:
+    """ETag, Last-Modified and rendered bodies of the feeds of one model"""
+
+    def __init__(self, prefix, model):
+        self.prefix = prefix
+        self.model = model
+
+    @property
+    def state_key(self):
+        return f'{self.prefix}:state'
+
+    @property
+    def changed_key(self):
+        return f'{self.prefix}:changed'
+
+    def get_state(self):
+        """{'token': str, 'last_modified': aware datetime or None} of the current rows"""
+        state = cache.get(self.state_key)
+        if state is None:
+            stats = self.model._default_manager.aggregate(count=Count('pk'), last=Max('updated_at'))
+            last_modified = max(filter(None, [stats['last'], cache.get(self.changed_key)]), default=None)
+            identity = f"{stats['count']}|{last_modified.isoformat() if last_modified else ''}"
+            state = {
+                'token': hashlib.sha256(identity.encode()).hexdigest()[:20],
+                'last_modified': last_modified,
+            }
+            cache.set(self.state_key, state, None)
+        return state
+
+    def invalidate(self):
+        """Forget the state after rows changed"""
+        cache.set(self.changed_key, timezone.now(), None)
+        cache.delete(self.state_key)
+
+    def get_request_state(self, request):
+        """get_state(), read once per request: ETag, Last-Modified and body all use it"""
+        states = request.__dict__.setdefault('_feed_states', {})
+        if self.prefix not in states:
+            states[self.prefix] = self.get_state()
+        return states[self.prefix]
+
+    def get_etag(self, request, variant):
+        return f"\"{self.get_request_state(request)['token']}-{variant}\""
+
+    def get_last_modified(self, request):
+        return self.get_request_state(request)['last_modified']
+
+    def get_body(self, request, variant, render):
+        """render() of a feed variant, from the cache while the rows are unchanged"""
+        key = f"{self.prefix}:body:{self.get_request_state(request)['token']}:{variant}:{request.get_host()}"
+        body = cache.get(key)
+        if body is None:
+            body = render()
+            cache.set(key, body, BODY_TIMEOUT)
+        return body
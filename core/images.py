@@ -0,0 +1,307 @@
+"""
+Responsive image variants.
+
+The images of the RESPONSIVE_IMAGE_FIELDS are resized with Pillow to each of
+settings.IMAGE_VARIANT_WIDTHS (never upscaled) and written to the default
+storage as WebP plus a fallback (JPEG, or PNG for images with transparency)
+under variants/<original name>/. A variants.json manifest beside them records
+what was generated. Encoding takes seconds for a large photo, so new uploads
+are left to generate_image_variants (run from cron) unless
+settings.IMAGE_VARIANTS_ON_UPLOAD asks for them right after the upload commits.
+
+Templates render the variants through the responsive_images tags
+(<picture> with srcset/sizes, or a capped URL for CSS backgrounds). Manifests
+are cached by original name, so rendering never touches Pillow and only reads
+storage once per image; images without variants fall back to the original
+(and are looked up again after MISSING_MANIFEST_TIMEOUT). Variants of an
+image that is replaced or deleted are removed once nothing references it.
+
+Hero and gallery images also carry a tiny blurred placeholder, a data URI
+stored on the model when the image is saved (update_placeholder), which
+templates layer under the real image so something shows before it arrives;
+generate_placeholders backfills it.
+"""
+import base64
+import json
+import logging
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'variants'
+MANIFEST_NAME = 'variants.json'
+
+# Seconds an image without variants is remembered as such: its variants are
+# usually being generated right after the upload is committed
+MISSING_MANIFEST_TIMEOUT = 60
+
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+DEFAULT_QUALITY = 80
+DEFAULT_WEBP_METHOD = 4
+
+# Longest side of the placeholders, in pixels; browsers stretch them smoothly
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+# (model label, field name) of the uploads that get variants
+RESPONSIVE_IMAGE_FIELDS = (
+    ('core.HeroSlide', 'background_image'),
+    ('core.PageHero', 'background_image'),
+    ('gallery.GalleryItem', 'image'),
+    ('events.Event', 'banner'),
+    ('events.EventImage', 'image'),
+    ('news.NewsArticle', 'featured_image'),
+    ('teams.Team', 'logo'),
+    ('teams.Player', 'photo'),
+)
+
+# (model label, image field name) of the models storing an image_placeholder
+PLACEHOLDER_FIELDS = (
+    ('core.HeroSlide', 'background_image'),
+    ('core.PageHero', 'background_image'),
+    ('gallery.GalleryItem', 'image'),
+)
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+
+
+def get_widths():
+    return sorted(set(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def get_responsive_fields():
+    """(model, field name) pairs of RESPONSIVE_IMAGE_FIELDS"""
+    return [(apps.get_model(label), field_name) for label, field_name in RESPONSIVE_IMAGE_FIELDS]
+
+
+def _variant_dir(name):
+    return f'{VARIANTS_DIR}/{name}'
+
+
+def _variant_name(name, width, ext):
+    return f'{_variant_dir(name)}/{width}w.{ext}'
+
+
+def _cache_key(name):
+    return f'core:image_variants:{name}'
+
+
+def _save(name, content):
+    # Overwrite in place; storage would otherwise pick a new name
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def load_manifest(name):
+    """Manifest written for an original, or None if it has no variants yet"""
+    try:
+        with default_storage.open(f'{_variant_dir(name)}/{MANIFEST_NAME}') as fh:
+            return json.loads(fh.read())
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def get_manifest(name):
+    """Cached manifest of an original; {} when there are no variants"""
+    if not name:
+        return {}
+    key = _cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = load_manifest(name)
+        if manifest is None:
+            manifest = {}
+            cache.set(key, manifest, MISSING_MANIFEST_TIMEOUT)
+        else:
+            cache.set(key, manifest)
+    return manifest
+
+
+def _encode(image, fmt, quality):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, fmt, quality=quality, optimize=True, progressive=True)
+    elif fmt == 'WEBP':
+        image.save(buffer, fmt, quality=quality, method=getattr(settings, 'IMAGE_VARIANT_WEBP_METHOD', DEFAULT_WEBP_METHOD))
+    else:
+        image.save(buffer, fmt, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(name, force=False):
+    """Write the variants of a stored image and return its manifest.
+
+    Existing variants are reused unless force is set. Returns {} for files
+    Pillow can't read and for animated images, which keep being served as-is.
+    """
+    if not name:
+        return {}
+    if force:
+        delete_variants(name)
+    manifest = None if force else load_manifest(name)
+    if manifest is None:
+        manifest = _build_variants(name)
+    cache.set(_cache_key(name), manifest)
+    return manifest
+
+
+def _build_variants(name):
+    try:
+        with default_storage.open(name) as fh:
+            image = Image.open(fh)
+            if getattr(image, 'n_frames', 1) > 1:
+                return {}
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, OSError, Image.DecompressionBombError) as exc:
+        logger.warning('Cannot create variants of %s: %s', name, exc)
+        return {}
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpg'
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', DEFAULT_QUALITY)
+
+    width, height = image.size
+    widths = sorted({min(target, width) for target in get_widths()})
+    for target in widths:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS
+        )
+        for ext in ('webp', fallback):
+            _save(_variant_name(name, target, ext), _encode(resized, FORMATS[ext][0], quality))
+
+    manifest = {'width': width, 'height': height, 'fallback': fallback, 'widths': widths}
+    _save(f'{_variant_dir(name)}/{MANIFEST_NAME}', json.dumps(manifest).encode('utf-8'))
+    return manifest
+
+
+def get_srcset(name, manifest, ext):
+    return ', '.join(
+        f'{default_storage.url(_variant_name(name, width, ext))} {width}w' for width in manifest['widths']
+    )
+
+
+def get_image_sources(fieldfile):
+    """Sources to render an image field with, from its cached manifest.
+
+    Returns a dict with 'src' and, when variants exist, 'width', 'height' and
+    a list of 'sources' (content type, srcset), preferred format first.
+    """
+    if not fieldfile:
+        return {}
+    name = fieldfile.name
+    manifest = get_manifest(name)
+    if not manifest or not manifest.get('widths'):
+        return {'src': fieldfile.url}
+    fallback = manifest['fallback']
+    return {
+        'src': default_storage.url(_variant_name(name, manifest['widths'][-1], fallback)),
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'sources': [(FORMATS[ext][1], get_srcset(name, manifest, ext)) for ext in ('webp', fallback)],
+    }
+
+
+def get_background_url(fieldfile):
+    """URL of the largest fallback variant of an image (the original if it has none).
+
+    CSS backgrounds can't choose between sizes, so they get a single variant,
+    capped at the largest configured width instead of the full upload.
+    """
+    if not fieldfile:
+        return ''
+    manifest = get_manifest(fieldfile.name)
+    if not manifest or not manifest.get('widths'):
+        return fieldfile.url
+    return default_storage.url(_variant_name(fieldfile.name, manifest['widths'][-1], manifest['fallback']))
+
+
+def delete_variants(name):
+    """Remove the variants of an original"""
+    directory = _variant_dir(name)
+    try:
+        _, files = default_storage.listdir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        files = []
+    for filename in files:
+        default_storage.delete(f'{directory}/{filename}')
+    cache.delete(_cache_key(name))
+
+
+def make_placeholder(file):
+    """Blurred, tiny JPEG of an image file as a data: URI, or '' if it can't be read"""
+    try:
+        file.seek(0)
+        image = Image.open(file)
+        # JPEGs are decoded straight at a fraction of their size
+        image.draft('RGB', (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        image = image.convert('RGB').filter(ImageFilter.GaussianBlur(0.6))
+    except (OSError, Image.DecompressionBombError) as exc:
+        logger.warning('Cannot create a placeholder of %s: %s', getattr(file, 'name', file), exc)
+        return ''
+    finally:
+        file.seek(0)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def make_stored_placeholder(name):
+    """Placeholder of a file in the default storage"""
+    try:
+        with default_storage.open(name) as fh:
+            return make_placeholder(fh)
+    except (FileNotFoundError, OSError) as exc:
+        logger.warning('Cannot create a placeholder of %s: %s', name, exc)
+        return ''
+
+
+def update_placeholder(instance, field_name, placeholder_field='image_placeholder'):
+    """Set an instance's placeholder from its image field before it is saved.
+
+    Only new uploads (and images without a placeholder yet) are read.
+    """
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        setattr(instance, placeholder_field, '')
+    elif not fieldfile._committed:
+        setattr(instance, placeholder_field, make_placeholder(fieldfile.file))
+    elif not getattr(instance, placeholder_field):
+        setattr(instance, placeholder_field, make_stored_placeholder(fieldfile.name))
+
+
+def get_perceptual_hash(file):
+    """64-bit difference hash (dHash) of an image file as 16 hex digits, or ''.
+
+    Visually identical images (re-encoded, resized, ...) get hashes a few bits apart.
+    """
+    try:
+        file.seek(0)
+        image = Image.open(file)
+        image.draft('L', (64, 64))
+        image = image.convert('L').resize((9, 8), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        return ''
+    finally:
+        file.seek(0)
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
@@ -0,0 +1,48 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils.text import Truncator
+from core.models import WebsiteTheme
+from core.theme_css import THEME_CSS_DIR
+
+
+class Command(BaseCommand):
+    help = 'Compile every WebsiteTheme into its fingerprinted stylesheet (run at deploy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete compiled stylesheets that no theme references any more',
+        )
+
+    def handle(self, *args, **options):
+        themes = WebsiteTheme.objects.all()
+        if not themes.exists():
+            self.stdout.write(self.style.WARNING('No themes found. Run create_default_theme first.'))
+            return
+
+        for theme in themes:
+            name = theme.compile_css()
+            self.stdout.write(f'{theme.name}: {name}')
+            markup = theme.get_custom_css_markup()
+            if markup:
+                self.stdout.write(self.style.WARNING(
+                    f'  custom_css has markup outside <style> tags, which is no longer added to pages: '
+                    f'{Truncator(" ".join(markup.split())).chars(80)}'
+                ))
+
+        if options['prune']:
+            in_use = set(WebsiteTheme.objects.values_list('compiled_css', flat=True))
+            try:
+                _, files = default_storage.listdir(THEME_CSS_DIR)
+            except FileNotFoundError:
+                files = []
+            removed = 0
+            for filename in files:
+                name = f'{THEME_CSS_DIR}/{filename}'
+                if name not in in_use:
+                    default_storage.delete(name)
+                    removed += 1
+            self.stdout.write(f'Pruned {removed} stale stylesheet(s)')
+
+        self.stdout.write(self.style.SUCCESS('Theme stylesheets compiled'))
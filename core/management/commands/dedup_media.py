@@ -0,0 +1,170 @@
+import hashlib
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.template.defaultfilters import filesizeformat
+
+from core.images import delete_variants, get_perceptual_hash
+from core.models import MediaBlob
+from core.storage import get_file_fields, get_upload_prefixes, is_in_rich_text, is_referenced
+
+
+def hash_stored_file(name):
+    """sha256 and size of a stored file, or None if it is missing"""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with default_storage.open(name) as fh:
+            for chunk in fh.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+    except (FileNotFoundError, OSError):
+        return None
+    return digest.hexdigest(), size
+
+
+class Command(BaseCommand):
+    help = 'Report the bytes saved by media deduplication and merge or prune duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help='Index every referenced file and point rows at one copy of identical files, deleting the others',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='List indexed files in upload directories that nothing references any more',
+        )
+        parser.add_argument(
+            '--confirm',
+            action='store_true',
+            help='With --prune, delete the files listed instead of only reporting them',
+        )
+        parser.add_argument(
+            '--similar',
+            action='store_true',
+            help='List images that look alike (perceptual hash) but are not byte-identical',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=6,
+            help='Maximum differing perceptual hash bits for --similar (default: 6)',
+        )
+
+    def handle(self, *args, **options):
+        # Storage name -> [(model, field name)] of the rows referencing it
+        references = defaultdict(list)
+        for model, field_name in get_file_fields():
+            names = (
+                model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).distinct()
+            )
+            for name in names:
+                references[name].append((model, field_name))
+
+        groups = defaultdict(list)
+        sizes = {}
+        for name in sorted(references):
+            result = hash_stored_file(name)
+            if result is not None:
+                groups[result[0]].append(name)
+                sizes[result[0]] = result[1]
+        duplicates = {digest: names for digest, names in groups.items() if len(names) > 1}
+
+        if options['merge']:
+            self.index(groups, sizes)
+            self.merge(duplicates, references)
+            duplicates = {}
+        if options['prune']:
+            self.prune(options['confirm'])
+
+        avoided = MediaBlob.objects.aggregate(total=Sum(F('size') * F('duplicates_avoided')))['total'] or 0
+        self.stdout.write(f'{MediaBlob.objects.count()} indexed file(s), {len(references)} file(s) referenced by models')
+        self.stdout.write(self.style.SUCCESS(f'Reclaimed by deduplication: {filesizeformat(avoided)}'))
+        if duplicates:
+            reclaimable = sum(sizes[digest] * (len(names) - 1) for digest, names in duplicates.items())
+            self.stdout.write(self.style.WARNING(
+                f'{sum(len(names) - 1 for names in duplicates.values())} duplicate file(s) on disk, '
+                f'{filesizeformat(reclaimable)} reclaimable with --merge:'
+            ))
+            for names in duplicates.values():
+                self.stdout.write('  ' + '  =  '.join(names))
+
+        if options['similar']:
+            self.report_similar(options['threshold'])
+
+    def index(self, groups, sizes):
+        """Record a blob for every stored file, the first name of each group being the copy kept"""
+        indexed = set(MediaBlob.objects.filter(sha256__in=groups).values_list('sha256', flat=True))
+        for digest, names in groups.items():
+            if digest in indexed:
+                continue
+            name = names[0]
+            with default_storage.open(name) as fh:
+                perceptual_hash = get_perceptual_hash(fh)
+            MediaBlob.objects.create(sha256=digest, name=name, size=sizes[digest], perceptual_hash=perceptual_hash)
+
+    def merge(self, duplicates, references):
+        blobs = dict(MediaBlob.objects.filter(sha256__in=duplicates).values_list('sha256', 'name'))
+        for digest, names in duplicates.items():
+            keep = blobs[digest]
+            for name in names:
+                if name == keep:
+                    continue
+                for model, field_name in references[name]:
+                    for instance in model._base_manager.filter(**{field_name: name}):
+                        setattr(instance, field_name, keep)
+                        # Saved normally, so caches, variants and placeholders follow
+                        try:
+                            with transaction.atomic():
+                                instance.save()
+                        except IntegrityError as exc:
+                            self.stdout.write(self.style.WARNING(f'Kept {name} for {model.__name__} {instance.pk}: {exc}'))
+                # Still used by a row that couldn't be saved, or by rich text
+                if is_referenced(name) or is_in_rich_text(name):
+                    self.stdout.write(self.style.WARNING(f'Kept {name}, still referenced'))
+                    continue
+                default_storage.delete(name)
+                delete_variants(name)
+                MediaBlob.objects.filter(sha256=digest).update(duplicates_avoided=F('duplicates_avoided') + 1)
+                self.stdout.write(f'Merged {name} into {keep}')
+
+    def prune(self, confirm=False):
+        # Blobs outside the upload_to directories of file fields (rich-text
+        # editor uploads, ...) are referenced from HTML only and never pruned
+        prefixes = get_upload_prefixes()
+        if prefixes is None:
+            self.stdout.write(self.style.WARNING('Not pruning: file fields without a fixed upload directory'))
+            return
+        prefixes = tuple(prefixes)
+        unreferenced = [
+            blob for blob in MediaBlob.objects.order_by('name').iterator()
+            if blob.name.startswith(prefixes) and not is_referenced(blob.name) and not is_in_rich_text(blob.name)
+        ]
+        for blob in unreferenced:
+            if confirm:
+                default_storage.delete(blob.name)
+                delete_variants(blob.name)
+            self.stdout.write(f'  {blob.name}')
+        if confirm:
+            self.stdout.write(f'Pruned {len(unreferenced)} unreferenced file(s)')
+        else:
+            self.stdout.write(f'{len(unreferenced)} unreferenced file(s) would be pruned; run with --confirm to delete them')
+
+    def report_similar(self, threshold):
+        blobs = list(MediaBlob.objects.exclude(perceptual_hash='').values_list('name', 'perceptual_hash'))
+        hashes = [(name, int(value, 16)) for name, value in blobs]
+        pairs = 0
+        for i, (name, value) in enumerate(hashes):
+            for other_name, other_value in hashes[i + 1:]:
+                distance = bin(value ^ other_value).count('1')
+                if distance <= threshold:
+                    pairs += 1
+                    self.stdout.write(f'  {name}  ~  {other_name}  ({distance} bits)')
+        self.stdout.write(f'{pairs} similar pair(s)')
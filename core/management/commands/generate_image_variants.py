@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from core.images import get_manifest, get_responsive_fields, generate_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the responsive WebP/JPEG variants of uploaded images that have none yet. '
+        'Run it from cron so new uploads get theirs within minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist (e.g. after changing IMAGE_VARIANT_WIDTHS)',
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field_name in get_responsive_fields():
+            names.update(
+                model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            )
+
+        done = skipped = 0
+        for name in sorted(names):
+            # Cached manifests spare a storage read per image on every run
+            if not options['force'] and get_manifest(name):
+                done += 1
+            elif generate_variants(name, force=options['force']):
+                done += 1
+            else:
+                skipped += 1
+                self.stdout.write(self.style.WARNING(f'Skipped {name}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Variants ready for {done} image(s), {skipped} skipped'))
@@ -0,0 +1,53 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from core.images import PLACEHOLDER_FIELDS, make_stored_placeholder
+
+
+class Command(BaseCommand):
+    help = 'Compute the blurred placeholders of existing hero and gallery images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Images decoded in parallel (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute placeholders that are already set',
+        )
+
+    def handle(self, *args, **options):
+        # image name -> [(model, pk)], so rows sharing a file decode it once
+        rows = defaultdict(list)
+        for label, field_name in PLACEHOLDER_FIELDS:
+            model = apps.get_model(label)
+            queryset = model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['force']:
+                queryset = queryset.filter(image_placeholder='')
+            for pk, name in queryset.values_list('pk', field_name):
+                rows[name].append((model, pk))
+
+        # Pillow releases the GIL while decoding and resizing; the database is
+        # only written from this thread
+        names = sorted(rows)
+        updated = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            for name, placeholder in zip(names, executor.map(make_stored_placeholder, names)):
+                if not placeholder:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'Skipped {name}'))
+                    continue
+                pks_by_model = defaultdict(list)
+                for model, pk in rows[name]:
+                    pks_by_model[model].append(pk)
+                for model, pks in pks_by_model.items():
+                    updated += model._base_manager.filter(pk__in=pks).update(image_placeholder=placeholder)
+
+        self.stdout.write(self.style.SUCCESS(f'Set {updated} placeholder(s) from {len(names) - failed} image(s), {failed} skipped'))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.static_export import get_export_root, publish
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the public site to static HTML (+ .gz) for nginx. Only pages affected by '
+        'content changed since the last run are re-rendered; use --all after a deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Export directory (default: STATIC_EXPORT_ROOT)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-render every page, e.g. after templates or code changed',
+        )
+        parser.add_argument(
+            '--host',
+            help='Host header used to render the pages (default: first ALLOWED_HOSTS entry)',
+        )
+
+    def handle(self, *args, **options):
+        root = options['output'] or get_export_root()
+        host = options['host'] or next(
+            (host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')),
+            'localhost',
+        )
+
+        result = publish(root=root, host=host, full=options['all'])
+
+        verbose = options['verbosity'] > 1
+        for url in result['rendered']:
+            if verbose:
+                self.stdout.write(f'rendered  {url}')
+        for url, reason in result['skipped']:
+            self.stdout.write(self.style.WARNING(f'skipped   {url} ({reason})'))
+        for url in result['removed']:
+            self.stdout.write(f'removed   {url}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Published to {root}: {len(result['rendered'])} rendered, "
+            f"{len(result['unchanged'])} unchanged, {len(result['removed'])} removed, "
+            f"{len(result['skipped'])} skipped"
+        ))
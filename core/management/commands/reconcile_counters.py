@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized site counters shown in page hero stats'
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for name, stored, value in reconcile():
+            if stored == value:
+                self.stdout.write(f'{name}: {value}')
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f'{name}: {stored} -> {value}'))
+        self.stdout.write(self.style.SUCCESS(f'Reconciled site counters ({drifted} corrected)'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_aboutsection_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitetheme',
+            name='compiled_css',
+            field=models.FileField(blank=True, editable=False, help_text='Fingerprinted stylesheet generated on save', upload_to='theme/'),
+        ),
+    ]
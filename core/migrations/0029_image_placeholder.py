@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_websitetheme_compiled_css'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='heroslide',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pagehero',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Storage name of the file', max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('perceptual_hash', models.CharField(blank=True, max_length=16)),
+                ('duplicates_avoided', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['name'], name='core_mediablob_name_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,19 @@
-from django.db import models
+import re
+
+from django.db import models, transaction
 from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .images import get_background_url, update_placeholder
 
+# custom_css used to be output into the page as-is; only its <style> blocks
+# (or the whole value, if it is plain CSS) now go into the theme stylesheet
+STYLE_BLOCK_RE = re.compile(r'<style[^>]*>(.*?)</style>', re.IGNORECASE | re.DOTALL)
+MARKUP_RE = re.compile(r'<[a-zA-Z!/]')
 
 class RecognitionAchievement(models.Model):
     title = models.CharField(max_length=200)
@@ -30,6 +39,8 @@ class HeroSlide(models.Model):
     subtitle = models.CharField(max_length=300, blank=True)
     description = models.TextField(blank=True)
     background_image = models.ImageField(upload_to="hero/")
+    # Blurred data: URI of background_image, shown while it loads (set by save())
+    image_placeholder = models.TextField(blank=True, editable=False)
     button_text = models.CharField(max_length=50, blank=True)
     button_url = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
@@ -45,6 +56,10 @@ class HeroSlide(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_placeholder(self, 'background_image')
+        super().save(*args, **kwargs)
+
 
 class WebsiteTheme(models.Model):
     # Basic Settings
@@ -195,6 +210,9 @@ class WebsiteTheme(models.Model):
     
     # Custom CSS
     custom_css = models.TextField(blank=True, help_text="Custom CSS code")
+
+    # Compiled stylesheet (see core.theme_css)
+    compiled_css = models.FileField(upload_to='theme/', blank=True, editable=False, help_text="Fingerprinted stylesheet generated on save")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -211,6 +229,32 @@ class WebsiteTheme(models.Model):
             # Deactivate all other themes
             WebsiteTheme.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
         super().save(*args, **kwargs)
+        self.compile_css()
+
+    def compile_css(self):
+        """Compile this theme into its fingerprinted stylesheet and store the file name"""
+        from . import site_cache
+        from .theme_css import compile_theme_css
+        name = compile_theme_css(self)
+        if name != self.compiled_css.name:
+            self.compiled_css.name = name
+            WebsiteTheme.objects.filter(pk=self.pk).update(compiled_css=name)
+            transaction.on_commit(site_cache.bump_version)
+        return name
+
+    def get_custom_css_rules(self):
+        """Return custom_css without any surrounding <style> tags"""
+        blocks = STYLE_BLOCK_RE.findall(self.custom_css)
+        if blocks:
+            return '\n'.join(block.strip() for block in blocks)
+        if self.get_custom_css_markup():
+            return ''
+        return self.custom_css
+
+    def get_custom_css_markup(self):
+        """HTML in custom_css outside <style> blocks (scripts, links, ...), which the stylesheet leaves out"""
+        rest = STYLE_BLOCK_RE.sub('', self.custom_css).strip()
+        return rest if MARKUP_RE.search(rest) else ''
 
 
 class PageHero(models.Model):
@@ -252,6 +296,8 @@ class PageHero(models.Model):
         null=True, 
         help_text="Background image for the hero section"
     )
+    # Blurred data: URI of background_image, shown while it loads (set by save())
+    image_placeholder = models.TextField(blank=True, editable=False)
     background_overlay = models.CharField(
         max_length=7, 
         default="#000000", 
@@ -308,6 +354,10 @@ class PageHero(models.Model):
 
     def __str__(self):
         return f"{self.get_page_display()} Hero"
+
+    def save(self, *args, **kwargs):
+        update_placeholder(self, 'background_image')
+        super().save(*args, **kwargs)
     
     def get_background_style(self):
         """Generate CSS background style based on background_type"""
@@ -318,18 +368,28 @@ class PageHero(models.Model):
         elif self.background_type == 'image' and self.background_image:
             overlay_color = self.background_overlay
             opacity = self.background_overlay_opacity
-            return f"background-image: linear-gradient(rgba({int(overlay_color[1:3], 16)}, {int(overlay_color[3:5], 16)}, {int(overlay_color[5:7], 16)}, {opacity})), url('{self.background_image.url}'); background-size: cover; background-position: center; background-repeat: no-repeat; background-attachment: fixed;"
+            # The placeholder layer shows through until the image has loaded
+            placeholder = f", url('{self.image_placeholder}')" if self.image_placeholder else ''
+            return f"background-image: linear-gradient(rgba({int(overlay_color[1:3], 16)}, {int(overlay_color[3:5], 16)}, {int(overlay_color[5:7], 16)}, {opacity})), url('{get_background_url(self.background_image)}'){placeholder}; background-size: cover; background-position: center; background-repeat: no-repeat; background-attachment: fixed;"
         return ""
     
+    @cached_property
+    def site_counters(self):
+        """Denormalized site counts, read in one query per hero"""
+        from .counters import get_counters
+        return get_counters()
+
     def get_event_count(self):
-        """Get total events count for display"""
-        from events.models import Event
-        return Event.objects.count()
+        """Number of upcoming events (dated today or later, in TIME_ZONE).
+
+        This used to count every event, past ones included; templates label it
+        'Upcoming Events' since the count changed meaning.
+        """
+        return self.site_counters['upcoming_events']
     
     def get_sports_count(self):
-        """Get unique sports count for display"""
-        from events.models import Event
-        return Event.objects.values('sport').distinct().count()
+        """Number of distinct sports that have events (not every Sport row)"""
+        return self.site_counters['sports']
 
 
 class AboutSection(models.Model):
@@ -797,5 +857,47 @@ class AboutTeamMember(models.Model):
         return attrs
 
 
+class MediaBlob(models.Model):
+    """One stored upload, by content hash (see core.storage.DedupFileSystemStorage).
+
+    An upload whose bytes match an existing blob reuses its file instead of
+    being written again; duplicates_avoided counts how often that happened.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, help_text="Storage name of the file")
+    size = models.PositiveBigIntegerField()
+    # dHash of images, for spotting near-duplicates (dedup_media --similar)
+    perceptual_hash = models.CharField(max_length=16, blank=True)
+    duplicates_avoided = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+        indexes = [
+            models.Index(fields=['name'], name='core_mediablob_name_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
 
 
+class SiteCounter(models.Model):
+    """A row count shown in page hero stats, kept up to date by signals (see core.counters).
+
+    Counters that depend on the date (upcoming events) hold the day they were
+    computed for in as_of and are recomputed once it is no longer today.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    as_of = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Site Counter'
+        verbose_name_plural = 'Site Counters'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,239 @@
+"""
+On-demand resized media: /media/r/<width>x<height>/<path>.
+
+A requested size must be in settings.RESIZE_ALLOWED_SIZES, so the endpoint
+can't be used to generate arbitrary numbers of files. The first request for
+a variant resizes the original with Pillow (cropped to fill the box; a height
+of 0 keeps the aspect ratio) and writes it to RESIZE_CACHE_DIR; later requests
+are served from there. A per-variant lock file makes concurrent requests wait
+for the one process doing the resize instead of repeating it, and the cache is
+trimmed back under RESIZE_CACHE_MAX_BYTES by evicting the least recently
+served files. The size of the cache is kept as a running total in the Django
+cache, so the cache directory is only walked when that total goes over the
+limit or is not known (first resize, or once the total has expired).
+
+Cache files are named after the source file's identity (name, size, mtime)
+and the requested variant, and that name doubles as a strong ETag: the bytes
+behind it never change. URLs carry a short version of the same identity
+(?v=...), so responses to the current version can be cached as immutable;
+requests without it, or with an outdated one, get a short max-age and
+revalidate with the ETag.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+from PIL import Image, ImageOps
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALLOWED_SIZES = ('240x240', '600x600', '1200x0', '1920x0')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+RESIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+QUALITY = 82
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg', 'png': 'image/png'}
+
+# Seconds browsers may reuse a response requested without the current ?v= version
+UNVERSIONED_MAX_AGE = 60 * 60
+
+# Bytes in the resize cache, as of the last eviction plus the files added since
+SIZE_KEY = 'core:resize_cache_bytes'
+
+
+def get_allowed_sizes():
+    return set(getattr(settings, 'RESIZE_ALLOWED_SIZES', DEFAULT_ALLOWED_SIZES))
+
+
+def get_max_bytes():
+    return getattr(settings, 'RESIZE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def get_cache_dir():
+    return str(getattr(settings, 'RESIZE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'resize_cache')))
+
+
+def is_allowed(width, height):
+    return f'{width}x{height}' in get_allowed_sizes()
+
+
+def _get_identity(name):
+    """Name, size and mtime of a stored file; raises like get_variant_key()"""
+    stat = os.stat(default_storage.path(name))
+    return f'{name}|{stat.st_size}|{stat.st_mtime_ns}'
+
+
+def get_variant_key(name, width, height, fmt):
+    """Cache file stem for a variant of the current version of a stored file.
+
+    Raises FileNotFoundError for missing files and SuspiciousFileOperation for
+    names outside the media root.
+    """
+    identity = f'{_get_identity(name)}|{width}x{height}|{fmt}'
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:40]
+
+
+def get_source_version(name):
+    """Short token that changes whenever a stored file is replaced, or '' if it is missing"""
+    try:
+        identity = _get_identity(name)
+    except (OSError, SuspiciousFileOperation):
+        return ''
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:12]
+
+
+def _cache_path(key, fmt):
+    # Two levels of fan-out keep directories small
+    return os.path.join(get_cache_dir(), key[:2], f'{key}.{fmt}')
+
+
+def _resize(name, width, height, fmt):
+    with default_storage.open(name) as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha and fmt != 'jpg' else 'RGB')
+    if height:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    elif image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=QUALITY, method=6)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def get_output_format(name, accepts_webp):
+    if accepts_webp:
+        return 'webp'
+    return 'png' if name.lower().endswith(('.png', '.gif')) else 'jpg'
+
+
+def get_variant(name, width, height, accepts_webp=False):
+    """Return (path, key, content type) of a cached variant, resizing it first if needed.
+
+    Raises FileNotFoundError if the original doesn't exist or can't be read as
+    an image, and SuspiciousFileOperation for names outside the media root.
+    """
+    if not name.lower().endswith(RESIZABLE_EXTENSIONS):
+        raise FileNotFoundError(name)
+    fmt = get_output_format(name, accepts_webp)
+    key = get_variant_key(name, width, height, fmt)
+    path = _cache_path(key, fmt)
+
+    if os.path.exists(path):
+        _touch(path)
+        return path, key, CONTENT_TYPES[fmt]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.lock', 'w') as lock:
+        if fcntl is not None:
+            # Whoever holds the lock resizes; the others wait, then find the file
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(path):
+                try:
+                    data = _resize(name, width, height, fmt)
+                except (OSError, Image.DecompressionBombError) as exc:
+                    raise FileNotFoundError(f'{name}: {exc}') from exc
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as fh:
+                    fh.write(data)
+                os.replace(tmp_path, path)
+                total = _add_to_total(len(data))
+                if total is None or total > get_max_bytes():
+                    evict()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    try:
+        os.remove(f'{path}.lock')
+    except FileNotFoundError:
+        pass
+    return path, key, CONTENT_TYPES[fmt]
+
+
+def _touch(path):
+    """Mark a cached file as recently served (mtime is the LRU clock)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _add_to_total(size):
+    """Count a new file in the running cache size; None if the total isn't known"""
+    try:
+        return cache.incr(SIZE_KEY, size)
+    except ValueError:
+        return None
+
+
+def evict(max_bytes=None):
+    """Delete the least recently served variants until the cache fits in max_bytes.
+
+    Trims to 90% of the limit so that eviction doesn't run on every new file,
+    and stores the resulting size as the running total. Returns the number of
+    files removed.
+    """
+    if max_bytes is None:
+        max_bytes = get_max_bytes()
+    entries, total = [], 0
+    for directory, _, filenames in os.walk(get_cache_dir()):
+        for filename in filenames:
+            if filename.endswith(('.lock', '.tmp')):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        cache.set(SIZE_KEY, total)
+        return 0
+
+    removed = 0
+    target = max_bytes * 0.9
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    cache.set(SIZE_KEY, total)
+    return removed
+
+
+def get_resized_url(fieldfile, size):
+    """URL of a resized variant of an image field, or of the original if the size isn't allowed"""
+    if not fieldfile:
+        return ''
+    if size not in get_allowed_sizes():
+        logger.warning('Image size %s is not in RESIZE_ALLOWED_SIZES', size)
+        return fieldfile.url
+    url = f"{settings.MEDIA_URL.rstrip('/')}/r/{size}/{filepath_to_uri(fieldfile.name)}"
+    version = get_source_version(fieldfile.name)
+    return f'{url}?v={version}' if version else url
+
@@ -0,0 +1,130 @@
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+
+from contact.models import ContactInfo
+from page_content.models import MenuItem, Page
+from registration.models import RegistrationPageSetting
+from .models import WebsiteTheme, Footer, QuickLink, Popup
+from . import counters, site_cache, static_export
+from .images import delete_variants, get_responsive_fields, generate_variants
+from .storage import is_referenced
+
+
+SITE_CHROME_MODELS = (
+    WebsiteTheme, Footer, QuickLink, Popup, ContactInfo, RegistrationPageSetting,
+    # Menu URLs depend on page slugs
+    MenuItem, Page,
+)
+
+
+def invalidate_site_chrome(sender, **kwargs):
+    """Bump the chrome version once the change to a site-wide singleton is committed"""
+    transaction.on_commit(site_cache.bump_version)
+
+
+request_started.connect(site_cache.start_request, dispatch_uid='site_chrome_request_started')
+request_finished.connect(site_cache.finish_request, dispatch_uid='site_chrome_request_finished')
+
+for _model in SITE_CHROME_MODELS:
+    post_save.connect(invalidate_site_chrome, sender=_model, dispatch_uid=f'site_chrome_save_{_model._meta.label_lower}')
+    post_delete.connect(invalidate_site_chrome, sender=_model, dispatch_uid=f'site_chrome_delete_{_model._meta.label_lower}')
+
+
+def delete_unused_variants(name):
+    # Deduplicated uploads share one file (and its variants) between rows
+    if not is_referenced(name):
+        delete_variants(name)
+
+
+def remember_replaced_image(sender, instance, field_name=None, **kwargs):
+    """Note the stored name of an image that a new upload (or clearing the field) replaces"""
+    fieldfile = getattr(instance, field_name)
+    if instance.pk is None or (fieldfile and fieldfile._committed):
+        return
+    old_name = sender._base_manager.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+    if old_name:
+        instance.__dict__.setdefault('_replaced_images', {})[field_name] = old_name
+
+
+def create_image_variants(sender, instance, field_name=None, **kwargs):
+    """Generate the responsive variants of a new upload once it is committed, if enabled"""
+    fieldfile = getattr(instance, field_name)
+    if fieldfile and getattr(settings, 'IMAGE_VARIANTS_ON_UPLOAD', False):
+        transaction.on_commit(partial(generate_variants, fieldfile.name))
+    old_name = instance.__dict__.get('_replaced_images', {}).pop(field_name, None)
+    if old_name and old_name != fieldfile.name:
+        transaction.on_commit(partial(delete_unused_variants, old_name))
+
+
+def delete_image_variants(sender, instance, field_name=None, **kwargs):
+    fieldfile = getattr(instance, field_name)
+    if fieldfile:
+        transaction.on_commit(partial(delete_unused_variants, fieldfile.name))
+
+
+for _model, _field_name in get_responsive_fields():
+    _uid = f'image_variants_{_model._meta.label_lower}_{_field_name}'
+    pre_save.connect(
+        partial(remember_replaced_image, field_name=_field_name), sender=_model, weak=False,
+        dispatch_uid=f'{_uid}_pre_save',
+    )
+    post_save.connect(
+        partial(create_image_variants, field_name=_field_name), sender=_model, weak=False,
+        dispatch_uid=_uid,
+    )
+    post_delete.connect(
+        partial(delete_image_variants, field_name=_field_name), sender=_model, weak=False,
+        dispatch_uid=f'{_uid}_delete',
+    )
+
+
+def count_created(sender, instance, created=False, counter=None, **kwargs):
+    if created:
+        counters.increment(counter)
+
+
+def count_deleted(sender, instance, counter=None, **kwargs):
+    counters.increment(counter, -1)
+
+
+for _counter, _label in counters.COUNTED_MODELS.items():
+    _model = apps.get_model(_label)
+    post_save.connect(
+        partial(count_created, counter=_counter), sender=_model, weak=False,
+        dispatch_uid=f'site_counter_save_{_counter}',
+    )
+    post_delete.connect(
+        partial(count_deleted, counter=_counter), sender=_model, weak=False,
+        dispatch_uid=f'site_counter_delete_{_counter}',
+    )
+
+
+def expire_event_counters(sender, **kwargs):
+    """A new, moved or deleted event can change the upcoming and sports counts"""
+    counters.expire(*counters.EVENT_COUNTERS)
+
+
+post_save.connect(expire_event_counters, sender='events.Event', dispatch_uid='site_counter_upcoming_save')
+post_delete.connect(expire_event_counters, sender='events.Event', dispatch_uid='site_counter_upcoming_delete')
+
+
+def stamp_export_change(sender, **kwargs):
+    """Rows of an exported model without auto_now changed: re-render its pages on the next publish"""
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        transaction.on_commit(partial(static_export.mark_changed, sender))
+
+
+for _model in static_export.get_stamped_models():
+    _uid = f'static_export_{_model._meta.label_lower}'
+    if _model._meta.auto_created:
+        # Implicit many-to-many tables only send m2m_changed
+        m2m_changed.connect(stamp_export_change, sender=_model, dispatch_uid=_uid)
+    else:
+        post_save.connect(stamp_export_change, sender=_model, dispatch_uid=f'{_uid}_save')
+        post_delete.connect(stamp_export_change, sender=_model, dispatch_uid=f'{_uid}_delete')
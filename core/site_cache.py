@@ -0,0 +1,133 @@
+"""
+Versioned in-process cache for the site-wide singletons ("chrome") that are
+rendered on every page: the active theme, the footer with its quick links,
+the active popup, the active contact info, the active registration page
+setting and the navigation menu tree.
+
+Loaded objects are memoized per process and tagged with a version stamp kept
+in the (shared) Django cache, without a timeout. Saving or deleting any of the
+source models bumps the stamp (see core.signals), so every process reloads on
+its next request while a warm render costs no database queries at all. The
+stamp is read from the cache once per request, however many singletons the
+page uses.
+"""
+import uuid
+
+from asgiref.local import Local
+from django.core.cache import cache
+
+VERSION_KEY = 'core:site_chrome:version'
+
+# name -> (version, value)
+_local = {}
+
+# Version stamp read during the current request (see start_request)
+_request = Local()
+
+
+def get_version():
+    """Return the current chrome version stamp, creating one if needed."""
+    version = getattr(_request, 'version', None)
+    if version is not None:
+        return version
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    if getattr(_request, 'active', False):
+        _request.version = version
+    return version
+
+
+def bump_version():
+    """Invalidate every cached singleton in every process."""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    _local.clear()
+    if getattr(_request, 'active', False):
+        _request.version = version
+
+
+def start_request(**kwargs):
+    """request_started receiver: read the stamp afresh, then keep it for the request"""
+    _request.active = True
+    _request.version = None
+
+
+def finish_request(**kwargs):
+    _request.active = False
+    _request.version = None
+
+
+def _cached(name, loader):
+    version = get_version()
+    entry = _local.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    value = loader()
+    _local[name] = (version, value)
+    return value
+
+
+def get_active_theme():
+    """Active WebsiteTheme or None"""
+    from .models import WebsiteTheme
+    return _cached('theme', lambda: WebsiteTheme.objects.filter(is_active=True).first())
+
+
+def get_footer():
+    """Footer with its quick links prefetched, or None"""
+    from .models import Footer
+    return _cached('footer', lambda: Footer.objects.prefetch_related('quick_links').first())
+
+
+def get_active_popup():
+    """Active Popup or None"""
+    from .models import Popup
+    return _cached('popup', lambda: Popup.objects.filter(is_active=True).first())
+
+
+def get_contact_info():
+    """Active contact.ContactInfo or None"""
+    from contact.models import ContactInfo
+    return _cached('contact_info', lambda: ContactInfo.objects.filter(is_active=True).first())
+
+
+def get_registration_setting():
+    """Active registration.RegistrationPageSetting or None"""
+    from registration.models import RegistrationPageSetting
+    return _cached('registration_setting', lambda: RegistrationPageSetting.objects.filter(is_active=True).first())
+
+
+def get_site_menu():
+    """Nested list of active menu items with their URLs already resolved"""
+    return _cached('site_menu', build_site_menu)
+
+
+def build_site_menu():
+    """Materialize the navbar tree from a single query.
+
+    Returns top-level items in order, each with its active children, as plain
+    dicts: {'title', 'url', 'children': [{'title', 'url'}]}.
+    """
+    from page_content.models import MenuItem
+    items = list(
+        MenuItem.objects.filter(is_active=True)
+        .select_related('page')
+        .order_by('order', 'pk')
+    )
+    children = {}
+    for item in items:
+        if item.parent_id is not None:
+            children.setdefault(item.parent_id, []).append({
+                'title': item.title,
+                'url': item.get_absolute_url(),
+            })
+    return [
+        {
+            'title': item.title,
+            'url': item.get_absolute_url(),
+            'children': children.get(item.pk, []),
+        }
+        for item in items if item.parent_id is None
+    ]
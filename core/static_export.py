@@ -0,0 +1,328 @@
+"""
+Static export of the public site (see the publish_static command).
+
+Every public URL is resolved to its view, which is called with an anonymous
+GET request (no middleware), and the response is written to
+<root>/<path>/index.html with a precompressed index.html.gz beside it, so
+nginx can serve the pages without touching Django (try_files + gzip_static).
+
+A manifest in the export root records a fingerprint of every model the pages
+read from. An incremental run only re-renders URLs that are new or whose apps
+changed since the previous run (any change to the site chrome re-renders
+everything), and removes the files of URLs that went away, e.g. an
+unpublished article. Pages that embed a CSRF token or don't answer 200 are
+never exported and stay with Django.
+
+Models with an auto_now timestamp are fingerprinted with one aggregate. The
+others carry a change stamp in the cache, replaced by core.signals whenever
+one of their rows is saved or deleted; bulk updates send no signals, so run
+publish_static --all after editing such rows with queryset.update().
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponseNotFound, HttpResponseServerError
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+
+from events.archive import get_archive_years
+from events.models import Event
+from news.models import NewsArticle
+from page_content.models import Page
+from sports.models import Sport
+from teams.models import Team
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+PAGE_FILENAME = 'index.html'
+
+
+def _urls(*names):
+    return lambda: [reverse(name) for name in names]
+
+
+# urls: callable returning the URLs of the route
+# apps: app labels the pages read from besides the site chrome
+# daily: content also depends on today's date (upcoming/past events)
+ROUTES = (
+    {'urls': _urls('core:home'), 'apps': ('core', 'events', 'sports', 'news', 'gallery'), 'daily': True},
+    {'urls': _urls('core:about'), 'apps': ('core',)},
+    {'urls': _urls('news:news_list'), 'apps': ('core', 'news')},
+    {
+        'urls': lambda: [
+            reverse('news:news_detail', args=[slug])
+            for slug in NewsArticle.objects.filter(is_published=True).values_list('slug', flat=True)
+        ],
+        'apps': ('news',),
+    },
+    {'urls': _urls('events:event_list', 'events:upcoming_events'), 'apps': ('core', 'events', 'sports'), 'daily': True},
+    {
+        'urls': lambda: [reverse('events:event_detail', args=[pk]) for pk in Event.objects.values_list('pk', flat=True)],
+        'apps': ('events', 'sports'),
+        'daily': True,
+    },
+    {
+        'urls': lambda: [
+            url
+            for year, _, months in get_archive_years()
+            for url in [reverse('events:event_archive_year', args=[year])] + [
+                reverse('events:event_archive_month', args=[month.year, month.month]) for month, _ in months
+            ]
+        ],
+        'apps': ('core', 'events', 'sports'),
+        'daily': True,
+    },
+    {'urls': _urls('teams:team_list'), 'apps': ('core', 'teams')},
+    {
+        'urls': lambda: [
+            reverse('teams:team_detail', args=[slug])
+            for slug in Team.objects.filter(is_active=True).values_list('slug', flat=True)
+        ],
+        'apps': ('teams', 'sports'),
+    },
+    {'urls': _urls('sports:sport_list'), 'apps': ('core', 'sports')},
+    {
+        'urls': lambda: [
+            reverse('sports:sport_detail', args=[slug])
+            for slug in Sport.objects.filter(is_active=True).values_list('slug', flat=True)
+        ],
+        # Sport pages list their upcoming events
+        'apps': ('sports', 'teams', 'events'),
+        'daily': True,
+    },
+    {'urls': _urls('gallery:gallery'), 'apps': ('core', 'gallery')},
+    {
+        'urls': lambda: [
+            reverse('core:page_detail', args=[slug])
+            for slug in Page.objects.filter(is_published=True).values_list('slug', flat=True)
+        ],
+        # Blog preview blocks list news articles
+        'apps': ('page_content', 'news'),
+    },
+)
+
+
+def get_export_root():
+    return str(settings.STATIC_EXPORT_ROOT)
+
+
+def get_site_chrome_models():
+    # Imported here: core.signals imports this module to stamp changes
+    from .signals import SITE_CHROME_MODELS
+    return SITE_CHROME_MODELS
+
+
+def get_exported_models():
+    """The chrome models and every model of the exported apps"""
+    models = set(get_site_chrome_models())
+    for route in ROUTES:
+        for app_label in route['apps']:
+            models.update(apps.get_app_config(app_label).get_models(include_auto_created=True))
+    return models
+
+
+def _auto_now_field(model):
+    return next(
+        (field.attname for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)), None
+    )
+
+
+def get_stamped_models():
+    """Exported models without an auto_now timestamp, whose changes are stamped by signals"""
+    return [model for model in get_exported_models() if _auto_now_field(model) is None]
+
+
+def _change_key(model):
+    return f'core:static_export:{model._meta.label_lower}:changed'
+
+
+def mark_changed(model):
+    """Give the model a new change stamp, so the next run re-renders the pages reading it"""
+    cache.set(_change_key(model), uuid.uuid4().hex, None)
+
+
+def _get_change_stamps(models):
+    """Current change stamp of each model, creating missing ones.
+
+    A stamp lost from the cache is replaced by a new one, which only costs
+    one unneeded re-render of the pages reading the model.
+    """
+    keys = {model: _change_key(model) for model in models}
+    found = cache.get_many(keys.values())
+    stamps, missing = {}, {}
+    for model, key in keys.items():
+        stamp = found.get(key)
+        if stamp is None:
+            stamp = missing[key] = uuid.uuid4().hex
+        stamps[model] = stamp
+    if missing:
+        cache.set_many(missing, None)
+    return stamps
+
+
+def model_fingerprint(model, stamp=None):
+    """Short string that changes whenever rows of the model are added, edited or deleted.
+
+    Row count and highest pk catch additions and deletions; edits show in the
+    latest auto_now timestamp, or in the change stamp for models without one.
+    """
+    auto_now = _auto_now_field(model)
+    aggregates = {'count': Count('pk'), 'last_pk': Max('pk')}
+    if auto_now:
+        aggregates['last_change'] = Max(auto_now)
+    stats = model._base_manager.aggregate(**aggregates)
+    if auto_now:
+        stamp = stats['last_change'].isoformat() if stats['last_change'] else ''
+    return f"{stats['count']}:{stats['last_pk']}:{stamp or ''}"
+
+
+def get_fingerprints():
+    """Fingerprints of the exported models, by label"""
+    models = get_exported_models()
+    stamps = _get_change_stamps([model for model in models if _auto_now_field(model) is None])
+    return {model._meta.label_lower: model_fingerprint(model, stamps.get(model)) for model in models}
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _page_path(root, url):
+    return os.path.join(root, url.strip('/'), PAGE_FILENAME)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_page(root, url, content):
+    path = _page_path(root, url)
+    _write_atomic(path, content)
+    # mtime=0 keeps the archive byte-identical for identical pages
+    _write_atomic(f'{path}.gz', gzip.compress(content, compresslevel=9, mtime=0))
+
+
+def _remove_page(root, url):
+    path = _page_path(root, url)
+    for name in (path, f'{path}.gz'):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+    # Drop directories left empty, never the export root itself
+    directory = os.path.dirname(path)
+    while os.path.abspath(directory) != os.path.abspath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def render_url(factory, url):
+    """Response of the view behind url to an anonymous GET, rendered without middleware"""
+    request = factory.get(url)
+    request.user = AnonymousUser()
+    try:
+        match = resolve(url)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except (Http404, Resolver404):
+        return HttpResponseNotFound()
+    except Exception:
+        logger.exception('Cannot render %s for the static export', url)
+        return HttpResponseServerError()
+    return response
+
+
+def publish(root=None, host='localhost', full=False):
+    """Export the public site to root, incrementally unless full is set.
+
+    Returns a dict of URL lists: 'rendered', 'unchanged', 'skipped' (with the
+    reason) and 'removed'.
+    """
+    root = root or get_export_root()
+    os.makedirs(root, exist_ok=True)
+    previous = load_manifest(root)
+    previous_pages = previous['pages'] if previous else {}
+    today = timezone.localdate().isoformat()
+
+    fingerprints = get_fingerprints()
+    if previous and not full:
+        old = previous['fingerprints']
+        changed = {label for label, value in fingerprints.items() if old.get(label) != value}
+        changed.update(set(old) - set(fingerprints))
+        new_day = previous['date'] != today
+    else:
+        changed, new_day = set(fingerprints), True
+    chrome_changed = any(model._meta.label_lower in changed for model in get_site_chrome_models())
+    changed_apps = {label.split('.')[0] for label in changed}
+
+    factory = RequestFactory(HTTP_HOST=host)
+    pages = {}
+    result = {'rendered': [], 'unchanged': [], 'skipped': [], 'removed': []}
+    for route in ROUTES:
+        daily = route.get('daily', False)
+        for url in route['urls']():
+            entry = previous_pages.get(url)
+            stale = (
+                full or entry is None or chrome_changed or changed_apps.intersection(route['apps'])
+                or (daily and new_day)
+            )
+            if not stale:
+                pages[url] = entry
+                result['unchanged'].append(url)
+                continue
+
+            response = render_url(factory, url)
+            if response.status_code != 200:
+                result['skipped'].append((url, f'HTTP {response.status_code}'))
+                continue
+            if b'csrfmiddlewaretoken' in response.content:
+                result['skipped'].append((url, 'contains a form'))
+                continue
+
+            digest = hashlib.sha256(response.content).hexdigest()
+            if entry is None or entry['sha256'] != digest or not os.path.exists(_page_path(root, url)):
+                _write_page(root, url, response.content)
+                result['rendered'].append(url)
+            else:
+                result['unchanged'].append(url)
+            pages[url] = {'sha256': digest}
+
+    for url in previous_pages:
+        if url not in pages:
+            _remove_page(root, url)
+            result['removed'].append(url)
+
+    manifest = {
+        'generated': timezone.now().isoformat(),
+        'date': today,
+        'fingerprints': fingerprints,
+        'pages': pages,
+    }
+    _write_atomic(
+        os.path.join(root, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'),
+    )
+    return result
@@ -0,0 +1,159 @@
+"""
+Deduplicating media storage.
+
+Every upload is hashed (sha256) before it is written. If a file with the same
+bytes was stored before (see core.models.MediaBlob), the existing name is
+returned and nothing is written, so model fields simply share the file, and
+with it its responsive variants and placeholders. Files the site generates
+itself (variants, compiled stylesheets, ...) are not uploads and are stored
+under the names they ask for.
+
+Shared files are never removed by a model: deleting a blob that a file field
+still references is skipped, and dedup_media --prune removes the blobs that
+nothing references any more. Rich-text editor uploads are blobs too, but only
+HTML refers to them, so pruning is limited to the upload_to directories of
+file fields and skips any file named in a rich-text field.
+"""
+import hashlib
+import logging
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django_ckeditor_5.fields import CKEditor5Field
+
+from .images import get_perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+
+def get_file_hash(content):
+    """sha256 hex digest and size of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size
+
+
+def get_file_fields():
+    """(model, field name) of every FileField/ImageField of the project"""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def get_dedup_file_fields(name=''):
+    """(model, field name) of the file fields stored in a DedupFileSystemStorage.
+
+    Only these can share a blob. Fields uploading to the directory of name
+    come first, as they are the likeliest to reference it.
+    """
+    fields = [
+        (model, field_name) for model, field_name in get_file_fields()
+        if isinstance(model._meta.get_field(field_name).storage, DedupFileSystemStorage)
+    ]
+    directory = name.rpartition('/')[0]
+    return sorted(fields, key=lambda item: _upload_dir(*item) != directory)
+
+
+def _upload_dir(model, field_name):
+    upload_to = model._meta.get_field(field_name).upload_to
+    return upload_to.strip('/') if isinstance(upload_to, str) else None
+
+
+def count_references(name):
+    """Number of rows whose file fields point to a storage name"""
+    return sum(
+        model._base_manager.filter(**{field_name: name}).count()
+        for model, field_name in get_dedup_file_fields(name)
+    )
+
+
+def is_referenced(name):
+    """Whether any file field points to a storage name; stops at the first reference"""
+    return any(
+        model._base_manager.filter(**{field_name: name}).exists()
+        for model, field_name in get_dedup_file_fields(name)
+    )
+
+
+def get_upload_prefixes():
+    """Directories file fields upload to, e.g. 'gallery/'; None if a field's is not fixed.
+
+    Fields uploading to the media root itself are left out: editor uploads land
+    there as well.
+    """
+    prefixes = set()
+    for model, field_name in get_file_fields():
+        upload_to = model._meta.get_field(field_name).upload_to
+        if callable(upload_to):
+            return None
+        if '%' in upload_to:
+            # Date-based directories ('news/%Y/') only fix the part before the first '%'
+            upload_to = upload_to.split('%', 1)[0].rpartition('/')[0]
+        if upload_to.strip('/'):
+            prefixes.add(upload_to.strip('/') + '/')
+    return prefixes
+
+
+def get_rich_text_fields():
+    """(model, field name) of every CKEditor rich-text field of the project"""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, CKEditor5Field)
+    ]
+
+
+def is_in_rich_text(name):
+    """Whether any rich-text field mentions a storage name (e.g. in an <img src>)"""
+    return any(
+        model._base_manager.filter(**{f'{field_name}__contains': name}).exists()
+        for model, field_name in get_rich_text_fields()
+    )
+
+
+class DedupFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct uploaded file once"""
+
+    def _save(self, name, content):
+        if not isinstance(content, UploadedFile):
+            return super()._save(name, content)
+
+        from .models import MediaBlob
+
+        digest, size = get_file_hash(content)
+        blob = MediaBlob.objects.filter(sha256=digest).first()
+        if blob is not None and self.exists(blob.name):
+            MediaBlob.objects.filter(pk=blob.pk).update(duplicates_avoided=F('duplicates_avoided') + 1)
+            return blob.name
+
+        name = super()._save(name, content)
+        values = {'name': name, 'size': size, 'perceptual_hash': get_perceptual_hash(content)}
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.update_or_create(sha256=digest, defaults=values)
+        except IntegrityError:
+            # Stored concurrently by another request; this copy stays unindexed
+            logger.warning('Duplicate upload of %s stored as %s', digest, name)
+        return name
+
+    def delete(self, name):
+        from .models import MediaBlob
+
+        blob = MediaBlob.objects.filter(name=name).first()
+        if blob is not None:
+            if is_referenced(name):
+                logger.info('Keeping shared file %s, still referenced', name)
+                return
+            blob.delete()
+        super().delete(name)
@@ -0,0 +1,51 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from core.images import get_image_sources, get_background_url
+from core.resize import get_resized_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', placeholder='', **attrs):
+    """Render an image field as <picture> with WebP and fallback srcsets.
+
+    Extra keyword arguments become <img> attributes, with underscores turned
+    into dashes: {% responsive_image item.image sizes="50vw" alt=item.title class="img-fluid" data_caption=item.title %}
+    Images without variants render as a plain <img> of the original. A
+    placeholder (data: URI) is painted as the <img> background until the image loads.
+    """
+    sources = get_image_sources(image)
+    if not sources:
+        return ''
+    img_attrs = {name.replace('_', '-'): value for name, value in attrs.items()}
+    img_attrs.setdefault('loading', 'lazy')
+    if placeholder:
+        style = f"background: url('{placeholder}') center / cover no-repeat;"
+        img_attrs['style'] = f"{style} {img_attrs['style']}" if img_attrs.get('style') else style
+    if 'sources' not in sources:
+        return format_html('<img src="{}"{}>', sources['src'], flatatt(img_attrs))
+
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((content_type, srcset, sizes) for content_type, srcset in sources['sources']),
+        ),
+        sources['src'],
+        flatatt(img_attrs),
+    )
+
+
+@register.simple_tag
+def background_image_url(image):
+    """URL to use for an image field in a CSS background"""
+    return get_background_url(image)
+
+
+@register.filter
+def resized(image, size):
+    """URL of an image field resized to an allowed size, e.g. {{ img.image|resized:"600x600" }}"""
+    return get_resized_url(image, size)
@@ -1,3 +1,682 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from gallery.models import Category, GalleryItem, Tag
+from news.models import NewsArticle
+from page_content.models import MenuItem, Page
+from sports.models import Sport
+from events.models import Event
+from . import counters, images, resize, site_cache, static_export
+from .models import Footer, MediaBlob, SiteCounter, WebsiteTheme
+from .theme_css import THEME_CSS_DIR
+from .storage import count_references, is_referenced
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_image(color, name='photo.png', size=(40, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class MediaTestCase(TestCase):
+    """Runs with an empty temporary MEDIA_ROOT and cache"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CACHES=LOCMEM_CACHE)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[16], IMAGE_VARIANTS_ON_UPLOAD=True)
+class ImageVariantTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Matches')
+
+    def create_item(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return GalleryItem.objects.create(title='Photo', category=self.category, image=image)
+
+    def has_variants(self, name):
+        return default_storage.exists(f'{images.VARIANTS_DIR}/{name}/{images.MANIFEST_NAME}')
+
+    @override_settings(IMAGE_VARIANTS_ON_UPLOAD=False)
+    def test_uploads_are_left_to_the_command(self):
+        item = self.create_item(make_image('red'))
+        self.assertFalse(self.has_variants(item.image.name))
+
+        call_command('generate_image_variants', stdout=StringIO())
+        self.assertTrue(self.has_variants(item.image.name))
+        with mock.patch.object(images, 'load_manifest') as load_manifest:
+            out = StringIO()
+            call_command('generate_image_variants', stdout=out)
+        # Already done: answered from the cached manifest
+        load_manifest.assert_not_called()
+        self.assertIn('Variants ready for 1 image(s), 0 skipped', out.getvalue())
+
+    def test_missing_manifest_is_cached_briefly(self):
+        with mock.patch.object(images.cache, 'set') as cache_set:
+            self.assertEqual(images.get_manifest('gallery/missing.png'), {})
+        cache_set.assert_called_once_with(images._cache_key('gallery/missing.png'), {}, images.MISSING_MANIFEST_TIMEOUT)
+
+    def test_replacing_an_image_deletes_its_variants(self):
+        item = self.create_item(make_image('red'))
+        old_name = item.image.name
+        self.assertEqual(images.get_manifest(old_name)['widths'], [16])
+
+        item.image = make_image('blue')
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+
+        self.assertFalse(self.has_variants(old_name))
+        self.assertEqual(images.get_manifest(old_name), {})
+        self.assertTrue(self.has_variants(item.image.name))
+
+    def test_variants_of_shared_files_are_kept(self):
+        item = self.create_item(make_image('red'))
+        other = self.create_item(make_image('red', name='copy.png'))
+        self.assertEqual(other.image.name, item.image.name)
+
+        item.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertTrue(self.has_variants(other.image.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertFalse(self.has_variants(other.image.name))
+
+
+class PlaceholderTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Matches')
+
+    def decode(self, placeholder):
+        prefix = 'data:image/jpeg;base64,'
+        self.assertTrue(placeholder.startswith(prefix))
+        return Image.open(BytesIO(base64.b64decode(placeholder[len(prefix):])))
+
+    def test_placeholder_is_a_tiny_jpeg(self):
+        image = self.decode(images.make_placeholder(make_image('red', size=(400, 200))))
+        self.assertEqual((image.format, image.size), ('JPEG', (16, 8)))
+
+    def test_unreadable_file_has_no_placeholder(self):
+        with self.assertLogs('core.images', 'WARNING'):
+            self.assertEqual(images.make_placeholder(SimpleUploadedFile('bad.png', b'not an image')), '')
+
+    def test_placeholder_follows_the_image(self):
+        item = GalleryItem.objects.create(title='Photo', category=self.category, image=make_image('red'))
+        self.assertEqual(self.decode(item.image_placeholder).size, (16, 12))
+
+        # Saving without a new upload doesn't read the image again
+        with mock.patch.object(images, 'make_placeholder') as make_placeholder:
+            item.save()
+        make_placeholder.assert_not_called()
+
+        item.image = None
+        item.save()
+        self.assertEqual(item.image_placeholder, '')
+
+    def test_stored_image_without_placeholder_is_read(self):
+        name = default_storage.save('gallery/stored.png', make_image('blue'))
+        item = GalleryItem(title='Photo', category=self.category, image=name)
+        images.update_placeholder(item, 'image')
+        self.assertEqual(self.decode(item.image_placeholder).size, (16, 12))
+
+    def test_backfill_command(self):
+        first = GalleryItem.objects.create(title='One', category=self.category, image=make_image('red'))
+        second = GalleryItem.objects.create(title='Two', category=self.category, image=make_image('red', 'copy.png'))
+        with self.assertLogs('core.images', 'WARNING'):
+            missing = GalleryItem.objects.create(title='Gone', category=self.category, image='gallery/missing.png')
+        GalleryItem.objects.update(image_placeholder='')
+        self.assertEqual(first.image.name, second.image.name)
+
+        out = StringIO()
+        with self.assertLogs('core.images', 'WARNING'), \
+                mock.patch.object(images, 'Image', wraps=Image) as pil:
+            call_command('generate_placeholders', workers=2, stdout=out)
+        self.assertIn('Set 2 placeholder(s) from 1 image(s), 1 skipped', out.getvalue())
+        # Rows sharing a file decode it once
+        self.assertEqual(pil.open.call_count, 1)
+        for item in (first, second):
+            item.refresh_from_db()
+            self.assertTrue(item.image_placeholder)
+        missing.refresh_from_db()
+        self.assertEqual(missing.image_placeholder, '')
+
+        # Only rows without a placeholder are revisited, unless forced
+        with self.assertLogs('core.images', 'WARNING'):
+            call_command('generate_placeholders', stdout=(out := StringIO()))
+        self.assertIn('Set 0 placeholder(s) from 0 image(s), 1 skipped', out.getvalue())
+        with self.assertLogs('core.images', 'WARNING'):
+            call_command('generate_placeholders', force=True, stdout=(out := StringIO()))
+        self.assertIn('Set 2 placeholder(s) from 1 image(s), 1 skipped', out.getvalue())
+
+
+class DedupStorageTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Matches')
+
+    def create_item(self, image):
+        return GalleryItem.objects.create(title='Photo', category=self.category, image=image)
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('dedup_media', '--prune', *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_item(make_image('red'))
+        second = self.create_item(make_image('red', name='other.png'))
+        third = self.create_item(make_image('blue'))
+
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertNotEqual(third.image.name, first.image.name)
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.duplicates_avoided, 1)
+        self.assertEqual(count_references(first.image.name), 2)
+        self.assertEqual(count_references(third.image.name), 1)
+
+    def test_shared_file_is_kept_until_unreferenced(self):
+        first = self.create_item(make_image('red'))
+        second = self.create_item(make_image('red'))
+        name = first.image.name
+
+        first.image.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+
+        second.delete()
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_prune_is_a_dry_run_without_confirm(self):
+        item = self.create_item(make_image('red'))
+        name = item.image.name
+        item.delete()
+
+        self.assertIn(name, self.prune())
+        self.assertTrue(default_storage.exists(name))
+
+        self.assertIn('Pruned 1 unreferenced file(s)', self.prune('--confirm'))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_prune_keeps_editor_uploads(self):
+        # The editor stores uploads at the media root through the default storage
+        editor_upload = default_storage.save('diagram.png', make_image('green'))
+        # A field upload later inserted into rich text
+        item = self.create_item(make_image('red'))
+        inserted = item.image.name
+        item.delete()
+        Sport.objects.create(name='Cricket', description=f'<img src="{default_storage.url(inserted)}">')
+
+        self.assertIn('Pruned 0 unreferenced file(s)', self.prune('--confirm'))
+        self.assertTrue(default_storage.exists(editor_upload))
+        self.assertTrue(default_storage.exists(inserted))
+
+
+    def test_reference_check_stops_at_the_first_reference(self):
+        name = self.create_item(make_image('red')).image.name
+        self.assertTrue(name.startswith('gallery/'))
+        # The gallery field uploading to the file's directory is asked first
+        with self.assertNumQueries(1):
+            self.assertTrue(is_referenced(name))
+        self.assertFalse(is_referenced('gallery/unknown.png'))
+
+    def test_merge_keeps_duplicates_used_in_rich_text(self):
+        content = make_image('red').read()
+        kept = default_storage.save('gallery/first.png', ContentFile(content))
+        duplicate = default_storage.save('gallery/second.png', ContentFile(content))
+        first = self.create_item(kept)
+        second = self.create_item(duplicate)
+        Sport.objects.create(name='Cricket', description=f'<img src="{default_storage.url(duplicate)}">')
+
+        out = StringIO()
+        call_command('dedup_media', '--merge', stdout=out)
+        second.refresh_from_db()
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertIn(f'Kept {duplicate}, still referenced', out.getvalue())
+        self.assertTrue(default_storage.exists(duplicate))
+
+
+class ResizeTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(RESIZE_CACHE_DIR=cache_dir, RESIZE_ALLOWED_SIZES=['20x20', '30x0'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.cache_dir = cache_dir
+        self.name = default_storage.save('gallery/photo.png', ContentFile(make_image('red').read()))
+
+    def test_only_allowed_sizes_are_served(self):
+        self.assertTrue(resize.is_allowed(20, 20))
+        self.assertFalse(resize.is_allowed(21, 20))
+        self.assertEqual(self.client.get(f'/media/r/21x20/{self.name}').status_code, 404)
+
+        response = self.client.get(f'/media/r/20x20/{self.name}', HTTP_ACCEPT='image/webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (20, 20))
+
+        response = self.client.get(f'/media/r/20x20/{self.name}', HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT='image/webp')
+        self.assertEqual(response.status_code, 304)
+
+    def test_only_versioned_urls_are_immutable(self):
+        item = GalleryItem(title='Photo', image=self.name)
+        url = resize.get_resized_url(item.image, '20x20')
+        self.assertRegex(url, r'^/media/r/20x20/gallery/photo\.png\?v=[0-9a-f]{12}$')
+
+        self.assertEqual(self.cache_control(url), 'public, max-age=31536000, immutable')
+        self.assertEqual(
+            self.cache_control(f'/media/r/20x20/{self.name}'), f'public, max-age={resize.UNVERSIONED_MAX_AGE}'
+        )
+
+        # Replacing the original under the same name changes the URL
+        with open(default_storage.path(self.name), 'wb') as fh:
+            fh.write(make_image('blue').read())
+        new_url = resize.get_resized_url(item.image, '20x20')
+        self.assertNotEqual(new_url, url)
+        self.assertNotIn('immutable', self.cache_control(url))
+        self.assertIn('immutable', self.cache_control(new_url))
+
+    def cache_control(self, url):
+        response = self.client.get(url)
+        # Closing a file response ends the request (request_finished)
+        response.close()
+        return response['Cache-Control']
+
+    def test_concurrent_requests_resize_once(self):
+        calls = []
+        original_resize = resize._resize
+
+        def slow_resize(*args):
+            calls.append(args)
+            time.sleep(0.2)
+            return original_resize(*args)
+
+        results = []
+        with mock.patch.object(resize, '_resize', slow_resize):
+            threads = [
+                threading.Thread(target=lambda: results.append(resize.get_variant(self.name, 20, 20)))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({path for path, _, _ in results}), 1)
+        self.assertTrue(os.path.exists(results[0][0]))
+
+    def write_cached(self, name, size, age):
+        path = os.path.join(self.cache_dir, 'ab', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(b'x' * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evicts_least_recently_served_files(self):
+        oldest = self.write_cached('a.jpg', 400, age=300)
+        served = self.write_cached('b.jpg', 400, age=200)
+        newest = self.write_cached('c.jpg', 400, age=100)
+        resize._touch(served)
+
+        self.assertEqual(resize.evict(max_bytes=1000), 1)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(served))
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual(cache.get(resize.SIZE_KEY), 800)
+
+    def test_directory_is_walked_only_when_over_the_limit(self):
+        resize.get_variant(self.name, 20, 20)
+        total = cache.get(resize.SIZE_KEY)
+        self.assertGreater(total, 0)
+
+        with mock.patch.object(resize.os, 'walk', wraps=os.walk) as walk:
+            resize.get_variant(self.name, 30, 0)
+            walk.assert_not_called()
+            self.assertGreater(cache.get(resize.SIZE_KEY), total)
+
+            with override_settings(RESIZE_CACHE_MAX_BYTES=1):
+                resize.get_variant(self.name, 20, 20, accepts_webp=True)
+            walk.assert_called_once()
+        self.assertEqual(cache.get(resize.SIZE_KEY), 0)
+
+
+class SiteCounterTests(TestCase):
+    def setUp(self):
+        self.sport = Sport.objects.create(name='Cricket')
+
+    def stored(self, name):
+        return SiteCounter.objects.get(name=name).value
+
+    def create_event(self, days, sport=None):
+        return Event.objects.create(
+            title='Match', sport=sport or self.sport, date=timezone.localdate() + timedelta(days=days),
+            location='Ground', description='', banner='events/match.jpg',
+        )
+
+    def test_counters_follow_creates_and_deletes(self):
+        self.assertEqual(counters.get_counters()['events'], 0)
+        event = self.create_event(days=1)
+        self.assertEqual(self.stored('events'), 1)
+        event.delete()
+        self.assertEqual(self.stored('events'), 0)
+
+        counters.get_counters()
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.get_counters()['events'], 0)
+
+    def test_sports_count_only_sports_with_events(self):
+        football = Sport.objects.create(name='Football')
+        Sport.objects.create(name='Hockey')
+        self.assertEqual(counters.get_counters()[counters.EVENT_SPORTS], 0)
+
+        event = self.create_event(days=1)
+        self.create_event(days=-1)
+        self.assertEqual(counters.get_counters()[counters.EVENT_SPORTS], 1)
+
+        event.sport = football
+        event.save()
+        self.assertEqual(counters.get_counters()[counters.EVENT_SPORTS], 2)
+        event.delete()
+        self.assertEqual(counters.get_counters()[counters.EVENT_SPORTS], 1)
+
+    def test_upcoming_events_are_recomputed_after_changes_and_on_a_new_day(self):
+        counters.get_counters()
+        event = self.create_event(days=1)
+        self.create_event(days=-1)
+        self.assertEqual(counters.get_counters()[counters.UPCOMING_EVENTS], 1)
+
+        event.date = timezone.localdate() - timedelta(days=2)
+        event.save()
+        self.assertEqual(counters.get_counters()[counters.UPCOMING_EVENTS], 0)
+
+        self.create_event(days=1)
+        SiteCounter.objects.filter(name=counters.UPCOMING_EVENTS).update(
+            value=99, as_of=timezone.localdate() - timedelta(days=1),
+        )
+        self.assertEqual(counters.get_counters()[counters.UPCOMING_EVENTS], 1)
+
+    def test_reconcile_corrects_drift(self):
+        self.create_event(days=-1)
+        counters.get_counters()
+        # Bulk operations skip the signals
+        Event.objects.bulk_create([
+            Event(title='Match', sport=self.sport, date=timezone.localdate() - timedelta(days=days),
+                  location='Ground', description='', banner='events/match.jpg')
+            for days in (2, 3)
+        ])
+        self.assertEqual(self.stored('events'), 1)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('events: 1 -> 3', out.getvalue())
+        self.assertIn('(1 corrected)', out.getvalue())
+        self.assertEqual(self.stored('events'), 3)
+
+
+class SiteCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache._local.clear()
+        self.footer = Footer.objects.create(address='Old Road')
+
+    def test_warm_reads_skip_the_database(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(site_cache.get_footer().address, 'Old Road')
+        with self.assertNumQueries(0):
+            self.assertEqual(site_cache.get_footer().address, 'Old Road')
+
+    def test_saving_bumps_the_version(self):
+        site_cache.get_footer()
+        version = site_cache.get_version()
+
+        self.footer.address = 'New Road'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.footer.save()
+
+        self.assertNotEqual(site_cache.get_version(), version)
+        self.assertEqual(site_cache.get_footer().address, 'New Road')
+
+    def test_version_is_stored_without_timeout(self):
+        with mock.patch.object(site_cache.cache, 'set') as cache_set:
+            site_cache.bump_version()
+        self.assertIsNone(cache_set.call_args.args[2])
+
+    def test_version_is_read_once_per_request(self):
+        site_cache.bump_version()
+        site_cache.start_request()
+        self.addCleanup(site_cache.finish_request)
+        with mock.patch.object(site_cache.cache, 'get', wraps=cache.get) as cache_get:
+            site_cache.get_footer()
+            site_cache.get_active_popup()
+            site_cache.get_site_menu()
+        self.assertEqual(cache_get.call_count, 1)
+
+    def test_bump_from_another_process(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        file_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}
+        with override_settings(CACHES=file_cache):
+            self.assertEqual(site_cache.get_footer().address, 'Old Road')
+            # Changed behind this process's back, then bumped by another worker
+            Footer.objects.filter(pk=self.footer.pk).update(address='New Road')
+            env = dict(os.environ, CACHE_BACKEND=file_cache['default']['BACKEND'], CACHE_LOCATION=location)
+            subprocess.run(
+                [sys.executable, 'manage.py', 'shell', '-c', 'from core import site_cache; site_cache.bump_version()'],
+                cwd=settings.BASE_DIR, env=env, check=True, capture_output=True,
+            )
+            self.assertEqual(site_cache.get_footer().address, 'New Road')
+
+
+class ThemeStylesheetTests(MediaTestCase):
+    def read(self, name):
+        with default_storage.open(name) as fh:
+            return fh.read().decode('utf-8')
+
+    def test_custom_css_is_compiled_without_style_tags(self):
+        theme = WebsiteTheme.objects.create(custom_css='<style>\n.hero { color: red; }\n</style>')
+        css = self.read(theme.compiled_css.name)
+        self.assertIn('.hero { color: red; }', css)
+        self.assertNotIn('<style', css)
+        self.assertTrue(theme.compiled_css.name.startswith(f'{THEME_CSS_DIR}/theme-'))
+
+    def test_plain_custom_css_is_kept(self):
+        theme = WebsiteTheme(custom_css='.hero { color: red; }')
+        self.assertEqual(theme.get_custom_css_rules(), '.hero { color: red; }')
+        self.assertEqual(theme.get_custom_css_markup(), '')
+
+    def test_markup_outside_style_tags_is_left_out_and_reported(self):
+        theme = WebsiteTheme.objects.create(
+            custom_css='<script>track()</script>\n<style>.hero { color: red; }</style>',
+        )
+        self.assertEqual(theme.get_custom_css_markup(), '<script>track()</script>')
+        self.assertNotIn('track()', self.read(theme.compiled_css.name))
+        self.assertEqual(WebsiteTheme(custom_css='<script>track()</script>').get_custom_css_rules(), '')
+
+        out = StringIO()
+        call_command('compile_theme_css', stdout=out)
+        self.assertIn('markup outside <style> tags', out.getvalue())
+        self.assertIn('<script>track()</script>', out.getvalue())
+
+    def test_unchanged_theme_reuses_its_file(self):
+        theme = WebsiteTheme.objects.create(primary_color='#112233')
+        name = theme.compiled_css.name
+        theme.save()
+        self.assertEqual(theme.compile_css(), name)
+        self.assertEqual(default_storage.listdir(THEME_CSS_DIR)[1], [name.split('/')[-1]])
+
+    def test_prune_removes_stylesheets_no_theme_uses(self):
+        theme = WebsiteTheme.objects.create(primary_color='#112233')
+        old_name = theme.compiled_css.name
+        theme.primary_color = '#445566'
+        theme.save()
+        self.assertTrue(default_storage.exists(old_name))
+
+        out = StringIO()
+        call_command('compile_theme_css', '--prune', stdout=out)
+        self.assertIn('Pruned 1 stale stylesheet(s)', out.getvalue())
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(theme.compiled_css.name))
+
+
+class SiteMenuTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache._local.clear()
+        self.page = Page.objects.create(title='About', slug='about')
+        self.about = MenuItem.objects.create(title='About', page=self.page, order=2)
+        self.home = MenuItem.objects.create(title='Home', url='/', order=1)
+        MenuItem.objects.create(title='History', parent=self.about, url='/history/', order=1)
+        MenuItem.objects.create(title='Hidden', url='/hidden/', order=3, is_active=False)
+
+    def test_menu_tree_takes_one_query(self):
+        with self.assertNumQueries(1):
+            menu = site_cache.build_site_menu()
+        self.assertEqual(menu, [
+            {'title': 'Home', 'url': '/', 'children': []},
+            {'title': 'About', 'url': '/page/about/', 'children': [{'title': 'History', 'url': '/history/'}]},
+        ])
+
+    def assertBumps(self, change):
+        site_cache.get_site_menu()
+        version = site_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(site_cache.get_version(), version)
+        return site_cache.get_site_menu()
+
+    def test_menu_item_save_bumps_the_version(self):
+        def rename():
+            self.home.title = 'Start'
+            self.home.save()
+        self.assertEqual(self.assertBumps(rename)[0]['title'], 'Start')
+
+    def test_page_save_bumps_the_version(self):
+        def change_slug():
+            self.page.slug = 'about-us'
+            self.page.save()
+        menu = self.assertBumps(change_slug)
+        self.assertIn('about-us', menu[1]['url'])
+
+    def test_menu_item_delete_bumps_the_version(self):
+        self.assertEqual([item['title'] for item in self.assertBumps(self.home.delete)], ['About'])
+
+
+class StaticExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        author = get_user_model().objects.create(username='editor')
+        self.article = NewsArticle.objects.create(
+            title='Final', slug='final', content='<p>Won</p>', author=author, is_published=True,
+        )
+        NewsArticle.objects.create(title='Draw', slug='draw', content='<p>Tied</p>', author=author, is_published=True)
+
+    def publish(self, **kwargs):
+        """Export result, and the URLs rendered (whether or not their HTML changed)"""
+        with mock.patch.object(static_export, 'render_url', wraps=static_export.render_url) as render_url:
+            result = static_export.publish(root=self.root, **kwargs)
+        return result, [call.args[1] for call in render_url.call_args_list]
+
+    def read(self, url):
+        with open(os.path.join(self.root, url.strip('/'), 'index.html'), encoding='utf-8') as fh:
+            return fh.read()
+
+    def test_writes_pages_and_manifest(self):
+        result, _ = self.publish()
+        self.assertEqual(result['skipped'], [])
+        self.assertIn('/news/final/', result['rendered'])
+        self.assertIn('Final', self.read('/news/final/'))
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'news', 'final', 'index.html.gz')))
+
+        manifest = static_export.load_manifest(self.root)
+        self.assertEqual(manifest['date'], timezone.localdate().isoformat())
+        self.assertEqual(set(manifest['pages']), set(result['rendered']))
+        self.assertIn('news.newsarticle', manifest['fingerprints'])
+        self.assertIn('gallery.tag', manifest['fingerprints'])
+
+    def test_unchanged_content_is_not_rendered_again(self):
+        self.publish()
+        result, rendered = self.publish()
+        self.assertEqual(rendered, [])
+        self.assertEqual(result['rendered'], [])
+        self.assertIn('/news/final/', result['unchanged'])
+
+    def test_edit_rerenders_the_pages_of_its_app(self):
+        self.publish()
+        self.article.title = 'Final result'
+        self.article.save()
+        result, rendered = self.publish()
+        self.assertIn('/news/final/', result['rendered'])
+        self.assertIn('Final result', self.read('/news/final/'))
+        # Re-rendered with its app, but written only if its HTML changed
+        self.assertIn('/news/draw/', rendered)
+        self.assertIn('/news/draw/', result['unchanged'])
+        self.assertNotIn('/teams/', rendered)
+
+    def test_unpublished_pages_are_removed(self):
+        self.publish()
+        self.article.is_published = False
+        self.article.save()
+        result, _ = self.publish()
+        self.assertEqual(result['removed'], ['/news/final/'])
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'news', 'final')))
+        self.assertNotIn('/news/final/', static_export.load_manifest(self.root)['pages'])
+
+    def test_models_without_timestamps_are_stamped_on_change(self):
+        self.assertIsNone(static_export._auto_now_field(Tag))
+        before = static_export.get_fingerprints()['gallery.tag']
+        with self.assertNumQueries(0):
+            tag = Tag(name='Finals', slug='finals')
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        after_create = static_export.get_fingerprints()['gallery.tag']
+        self.assertNotEqual(after_create, before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'Final'
+            tag.save()
+        self.assertNotEqual(static_export.get_fingerprints()['gallery.tag'], after_create)
+
+    def test_missing_pages_are_skipped(self):
+        factory = static_export.RequestFactory()
+        self.assertEqual(static_export.render_url(factory, '/news/missing/').status_code, 404)
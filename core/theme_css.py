@@ -0,0 +1,33 @@
+"""
+Compile a WebsiteTheme into a content-hashed stylesheet.
+
+The CSS is rendered from templates/core/theme.css and written to the default
+storage as theme/theme-<hash>.css. Because the file name changes whenever the
+content does, it can be served with far-future cache headers.
+"""
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+
+THEME_CSS_DIR = 'theme'
+
+
+def render_theme_css(theme):
+    """Render the theme stylesheet for the given theme (or the defaults if None)."""
+    return render_to_string('core/theme.css', {'theme': theme})
+
+
+def compile_theme_css(theme):
+    """Write the theme's stylesheet to storage and return its storage name.
+
+    Files are named after a hash of their content, so an unchanged theme maps
+    to the file that already exists and nothing is written.
+    """
+    css = render_theme_css(theme)
+    digest = hashlib.md5(css.encode('utf-8')).hexdigest()[:12]
+    name = f'{THEME_CSS_DIR}/theme-{digest}.css'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(css.encode('utf-8')))
+    return name
@@ -1,4 +1,9 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
 from django.views.generic import TemplateView
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
@@ -15,14 +20,10 @@ from .forms import (
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .models import Popup
+from . import resize, site_cache
 from page_content.models import Page
 from django.template.loader import render_to_string
-from page_content.models import (
-    HeroBannerBlock, TextImageBlock, FeatureHighlightsBlock, TestimonialBlock,
-    CallToActionBlock, GalleryBlock, VideoEmbedBlock, FAQBlock, CounterStatsBlock,
-    ContactFormBlock, TeamMemberBlock, BlogPreviewBlock, TwoColumnTextBlock,
-    TimelineBlock, FooterInfoBlock, Block
-)
+from page_content.blocks import get_page_stylesheet, render_page_blocks, query_budget
 from contact.forms import ContactForm
 from news.models import NewsArticle
 
@@ -32,13 +33,13 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["popup"] = Popup.objects.filter(is_active=True).first()
+        context["popup"] = site_cache.get_active_popup()
         context['hero_slides'] = HeroSlide.objects.filter(is_active=True).order_by('order')
-        context['featured_events'] = Event.objects.filter(is_upcoming=True)[:3]
-        context['latest_news'] = NewsArticle.objects.filter(is_published=True)[:3]
+        context['featured_events'] = Event.objects.upcoming().select_related('sport')[:3]
+        context['latest_news'] = NewsArticle.objects.published().cards()[:3]
         context['featured_gallery'] = GalleryItem.objects.filter(is_featured=True)[:6]
-        context['theme'] = WebsiteTheme.objects.filter(is_active=True).first()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
+        context['theme'] = site_cache.get_active_theme()
+        context['footer'] = site_cache.get_footer()
         
         stats_section = AboutSection.objects.filter(section_type='stats', is_active=True).first()
         if stats_section:
@@ -63,14 +64,14 @@ class AboutView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['theme'] = WebsiteTheme.objects.filter(is_active=True).first()
+        context['theme'] = site_cache.get_active_theme()
         context['about_sections'] = AboutSection.objects.filter(is_active=True).order_by('order')
         context['team_members'] = AboutTeamMember.objects.all().order_by('order')
         context['values'] = Value.objects.filter(is_active=True).order_by('order')
         # Recognition & Achievements entries for About page
         context['achievements'] = RecognitionAchievement.objects.all()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         
         # Add PageHero for about page
         try:
@@ -96,8 +97,8 @@ class ThemeCustomizeView(TemplateView):
             )
         context['theme'] = theme
         context['form'] = WebsiteThemeForm(instance=theme)
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -123,9 +124,9 @@ class ThemePreviewView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['theme'] = WebsiteTheme.objects.filter(is_active=True).first()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['theme'] = site_cache.get_active_theme()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
 
 
@@ -142,8 +143,8 @@ class HeroSectionEditView(TemplateView):
             context['section'] = section
         else:
             context['form'] = HeroSectionForm()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -172,8 +173,8 @@ class MissionSectionEditView(TemplateView):
             context['section'] = section
         else:
             context['form'] = MissionSectionForm()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -202,8 +203,8 @@ class ValuesSectionEditView(TemplateView):
             context['section'] = section
         else:
             context['form'] = ValuesSectionForm()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -233,8 +234,8 @@ class TeamSectionEditView(TemplateView):
         else:
             context['form'] = TeamSectionForm()
         context['team_members'] = AboutTeamMember.objects.all().order_by('order')
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -266,8 +267,8 @@ class HistorySectionEditView(TemplateView):
             context['section'] = section
         else:
             context['form'] = HistorySectionForm()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -296,8 +297,8 @@ class AchievementsSectionEditView(TemplateView):
             context['section'] = section
         else:
             context['form'] = AchievementsSectionForm()
-        context['footer'] = Footer.objects.prefetch_related('quick_links').first()
-        context['popup'] = Popup.objects.filter(is_active=True).first()
+        context['footer'] = site_cache.get_footer()
+        context['popup'] = site_cache.get_active_popup()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -410,53 +411,56 @@ class FooterEditView(TemplateView):
             return render(request, self.template_name, {'form': form, 'formset': formset, 'footer': footer})
 
 
+@method_decorator(query_budget(), name='get')
 class PageDetailView(TemplateView):
     template_name = 'core/page_detail.html'
 
     def get(self, request, slug=None, *args, **kwargs):
         page = get_object_or_404(Page, slug=slug)
-        # Gather all typed blocks for this page
-        typed_qs_lists = [
-            HeroBannerBlock.objects.filter(page=page, is_active=True),
-            TextImageBlock.objects.filter(page=page, is_active=True),
-            FeatureHighlightsBlock.objects.filter(page=page, is_active=True),
-            TestimonialBlock.objects.filter(page=page, is_active=True),
-            CallToActionBlock.objects.filter(page=page, is_active=True),
-            GalleryBlock.objects.filter(page=page, is_active=True),
-            VideoEmbedBlock.objects.filter(page=page, is_active=True),
-            FAQBlock.objects.filter(page=page, is_active=True),
-            CounterStatsBlock.objects.filter(page=page, is_active=True),
-            ContactFormBlock.objects.filter(page=page, is_active=True),
-            TeamMemberBlock.objects.filter(page=page, is_active=True),
-            BlogPreviewBlock.objects.filter(page=page, is_active=True),
-            TwoColumnTextBlock.objects.filter(page=page, is_active=True),
-            TimelineBlock.objects.filter(page=page, is_active=True),
-            FooterInfoBlock.objects.filter(page=page, is_active=True),
-        ]
-        items = []
-        for qs in typed_qs_lists:
-            items.extend(list(qs))
-        # Include generic rich Blocks if any
-        generic_blocks = list(Block.objects.filter(page=page, is_active=True))
-        items.extend(generic_blocks)
-
-        # Compute template names; map generic Block to a generic template
-        def tpl_for(obj):
-            model_name = obj._meta.model_name
-            if model_name == 'block':
-                return 'blocks/generic_rich_text.html'
-            return f'blocks/{model_name}.html'
-
-        items = sorted(items, key=lambda x: (getattr(x, 'order', 0), x.pk or 0))
+        # Extras used by blocks that can't be served from the fragment cache
+        block_context = {
+            'news_list': NewsArticle.objects.published().cards().order_by('-published_date')[:6],
+            'contact_form': ContactForm(),
+        }
 
         context = {
             'page': page,
-            'content_blocks': [{'obj': b, 'template': tpl_for(b)} for b in items],
-            'theme': WebsiteTheme.objects.filter(is_active=True).first(),
-            'footer': Footer.objects.prefetch_related('quick_links').first(),
-            'popup': Popup.objects.filter(is_active=True).first(),
-            # Extras used by some blocks
-            'news_list': NewsArticle.objects.filter(is_published=True).order_by('-published_date')[:6],
-            'contact_form': ContactForm(),
+            # Ordered layout in one query; cached fragments are reused, the rest
+            # are loaded with one in_bulk() per block model and rendered
+            'content_blocks': render_page_blocks(page, request, block_context),
+            'page_stylesheet': get_page_stylesheet(page),
+            'theme': site_cache.get_active_theme(),
+            'footer': site_cache.get_footer(),
+            'popup': site_cache.get_active_popup(),
         }
         return render(request, self.template_name, context)
+
+
+@require_safe
+def resized_media(request, width, height, path):
+    """Serve a resized copy of a media image, resizing it on first request (see core.resize)"""
+    if not resize.is_allowed(width, height):
+        raise Http404('Image size not allowed')
+    accepts_webp = 'image/webp' in request.headers.get('Accept', '')
+    try:
+        file_path, key, content_type = resize.get_variant(path, width, height, accepts_webp)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        raise Http404('Image not found')
+
+    etag = f'"{key}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+        except FileNotFoundError:
+            # Evicted in between; the next request recreates it
+            raise Http404('Image not found')
+    response['ETag'] = etag
+    if request.GET.get('v') and request.GET['v'] == resize.get_source_version(path):
+        # The URL changes with the original, so this response never does
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=resize.UNVERSIONED_MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
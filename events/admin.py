@@ -4,6 +4,21 @@ from .models import Event, EventImage
 from django_ckeditor_5.widgets import CKEditor5Widget
 
 
+class EventStatusFilter(admin.SimpleListFilter):
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [('upcoming', 'Upcoming'), ('past', 'Past')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'upcoming':
+            return queryset.upcoming()
+        if self.value() == 'past':
+            return queryset.past()
+        return queryset
+
+
 class EventImageInline(admin.TabularInline):
     model = EventImage
     extra = 1
@@ -26,11 +41,12 @@ class EventAdmin(admin.ModelAdmin):
             }
 
     form = EventAdminForm
-    list_display = ['title', 'sport', 'date', 'location', 'is_upcoming', 'created_at']
-    list_filter = ['sport', 'is_upcoming', 'date', 'created_at']
-    search_fields = ['title', 'sport', 'location', 'description']
+    list_display = ['title', 'sport', 'date', 'location', 'upcoming', 'created_at']
+    list_filter = ['sport', EventStatusFilter, 'date', 'created_at']
+    search_fields = ['title', 'sport__name', 'location', 'description']
+    list_select_related = ['sport']
+    autocomplete_fields = ['sport']
     ordering = ['-date']
-    list_editable = ['is_upcoming']
     date_hierarchy = 'date'
     inlines = [EventImageInline]
     
@@ -41,11 +57,12 @@ class EventAdmin(admin.ModelAdmin):
         ('Content', {
             'fields': ('description', 'banner')
         }),
-        ('Status', {
-            'fields': ('is_upcoming',)
-        }),
     )
 
+    @admin.display(boolean=True, description='Upcoming', ordering='date')
+    def upcoming(self, obj):
+        return obj.is_upcoming
+
 
 @admin.register(EventImage)
 class EventImageAdmin(admin.ModelAdmin):
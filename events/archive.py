@@ -0,0 +1,84 @@
+"""
+Date windows and per-month counts for the event list and archive pages.
+
+Every event list query is limited to a date range served by the (date, id)
+index: the main list shows a window around today, and older or later events
+are reached through year and month archive pages. The archive navigation
+needs the number of events per month, which is kept in EventMonthCount rows:
+signals (see events.signals) add or subtract one as events are created,
+moved to another month or deleted, inside the saving transaction, so reading
+the navigation is one query on a table of a few rows per year.
+
+Bulk operations that skip signals (bulk_create, queryset.update) can make the
+counts drift; `manage.py rebuild_event_month_counts` recomputes them.
+"""
+import datetime
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Event, EventMonthCount
+
+# Months before and after the current one shown by the main event list
+LIST_MONTHS_BEFORE = 6
+LIST_MONTHS_AFTER = 12
+
+
+def add_months(day, months):
+    """First day of the month `months` away from the month of `day`"""
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def get_list_window(today=None):
+    """(first day, day after the last day) of the dates shown by the main event list"""
+    today = today or timezone.localdate()
+    return add_months(today, -LIST_MONTHS_BEFORE), add_months(today, LIST_MONTHS_AFTER + 1)
+
+
+def get_month_counts():
+    """[(first day of month, number of events)], most recent month first"""
+    return list(EventMonthCount.objects.filter(count__gt=0).order_by('-month').values_list('month', 'count'))
+
+
+def get_archive_years():
+    """[(year, number of events, [(first day of month, number of events)])] for the archive navigation"""
+    return [
+        (year, sum(count for _, count in months), months)
+        for year, months in ((year, list(months)) for year, months in groupby(get_month_counts(), key=lambda row: row[0].year))
+    ]
+
+
+def add_to_month(day, delta):
+    """Add delta events to the count of the month of day"""
+    month = day.replace(day=1)
+    rows = EventMonthCount.objects.filter(month=month)
+    if delta < 0:
+        # Never below zero, even if the counts drifted (the column is unsigned)
+        rows.filter(count__gte=-delta).update(count=F('count') + delta)
+        return
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            EventMonthCount.objects.create(month=month, count=delta)
+    except IntegrityError:
+        # Created concurrently by another request
+        rows.update(count=F('count') + delta)
+
+
+def rebuild_month_counts():
+    """Recompute every month count with one GROUP BY; returns the number of months"""
+    counts = (
+        Event._base_manager.order_by()
+        .annotate(month=TruncMonth('date')).values('month')
+        .annotate(count=Count('pk')).values_list('month', 'count')
+    )
+    with transaction.atomic():
+        EventMonthCount.objects.all().delete()
+        return len(EventMonthCount.objects.bulk_create(
+            EventMonthCount(month=month, count=count) for month, count in counts
+        ))
@@ -0,0 +1,102 @@
+"""
+iCalendar (RFC 5545) feeds of the events, for calendar app subscriptions.
+
+Calendar clients poll their subscriptions, typically every hour; the feeds
+are answered through a core.feed_cache.FeedState, which signals (see
+events.signals) invalidate when an event or sport changes.
+"""
+import html
+from datetime import timedelta, timezone as dt_timezone
+
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from core.feed_cache import FeedState
+from .models import Event
+
+PRODID = '-//NSCPL//Events//EN'
+
+feed_state = FeedState('events:ical', Event)
+
+
+def escape(value):
+    """Escape a TEXT property value"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into 75-octet pieces, continuation lines starting with a space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never cut a multi-byte character in half
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts)
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def plain_text(value):
+    """Text of a rich text (HTML) field"""
+    return html.unescape(strip_tags(value or '')).strip()
+
+
+def render_event(event, request):
+    url = request.build_absolute_uri(reverse('events:event_detail', args=[event.pk]))
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{request.get_host()}',
+        f'DTSTAMP:{format_utc(event.updated_at)}',
+        f'LAST-MODIFIED:{format_utc(event.updated_at)}',
+        # All-day events; DTEND is exclusive
+        f"DTSTART;VALUE=DATE:{event.date.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(event.date + timedelta(days=1)).strftime('%Y%m%d')}",
+        f'SUMMARY:{escape(event.title)}',
+        f'LOCATION:{escape(event.location)}',
+        f'CATEGORIES:{escape(event.sport.name)}',
+        f'DESCRIPTION:{escape(plain_text(event.description))}',
+        f'URL:{url}',
+        'END:VEVENT',
+    ]
+    return lines
+
+
+def render_calendar(request, sport=None):
+    """The feed of all events, or of one sport's events, as iCalendar text"""
+    events = Event.objects.select_related('sport').order_by('date', 'id')
+    name = 'NSCPL Events'
+    if sport is not None:
+        events = events.filter(sport=sport)
+        name = f'NSCPL {sport.name} Events'
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(name)}',
+        # Suggested polling interval for clients that honour it
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+        'X-PUBLISHED-TTL:PT1H',
+    ]
+    for event in events.iterator():
+        lines.extend(render_event(event, request))
+    lines.append('END:VCALENDAR')
+    return ''.join(f'{fold(line)}\r\n' for line in lines)
+
+
+def get_calendar(request, sport=None):
+    """Rendered feed, from the cache while the events are unchanged"""
+    return feed_state.get_body(request, sport.slug if sport else 'all', lambda: render_calendar(request, sport))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.archive import rebuild_month_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-month event counts shown in the event archive navigation'
+
+    def handle(self, *args, **options):
+        months = rebuild_month_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt event counts for {months} months'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_eventimage'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='event',
+            name='is_upcoming',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+# Events saved with an empty sport name are filed under this sport
+FALLBACK_SPORT = 'Other'
+
+
+def link_sports(apps, schema_editor):
+    """Point every event at the Sport matching its sport name, creating missing sports"""
+    Event = apps.get_model('events', 'Event')
+    Sport = apps.get_model('sports', 'Sport')
+
+    # Names are matched ignoring case and surrounding whitespace, so "cricket "
+    # and "Cricket" end up on the same sport
+    sports = {sport.name.strip().lower(): sport for sport in Sport.objects.all()}
+    slugs = set(Sport.objects.values_list('slug', flat=True))
+    for name in Event.objects.values_list('sport', flat=True).distinct():
+        name = name.strip() or FALLBACK_SPORT
+        if name.lower() in sports:
+            continue
+        base = slugify(name)[:90] or 'sport'
+        slug, n = base, 2
+        while slug in slugs:
+            slug, n = f'{base}-{n}', n + 1
+        slugs.add(slug)
+        sports[name.lower()] = Sport.objects.create(name=name[:100], slug=slug)
+
+    for name in Event.objects.values_list('sport', flat=True).distinct():
+        sport = sports[(name.strip() or FALLBACK_SPORT).lower()]
+        Event.objects.filter(sport=name).update(sport_ref=sport)
+
+
+def unlink_sports(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Sport = apps.get_model('sports', 'Sport')
+    for pk, name in Sport.objects.values_list('pk', 'name'):
+        Event.objects.filter(sport_ref=pk).update(sport=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_status_by_date'),
+        ('sports', '0003_alter_sport_description_alter_sport_history_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='sport_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sports.sport'),
+        ),
+        migrations.RunPython(link_sports, unlink_sports),
+        # A default lets the text column be re-added when migrating backwards
+        migrations.AlterField(
+            model_name='event',
+            name='sport',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='sport',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='sport_ref',
+            new_name='sport',
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='sport',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='events', to='sports.sport'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['sport', 'date'], name='event_sport_date_idx'),
+        ),
+    ]
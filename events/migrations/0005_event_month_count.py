@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:09
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def count_months(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventMonthCount = apps.get_model('events', 'EventMonthCount')
+    counts = (
+        Event.objects.order_by()
+        .annotate(month=TruncMonth('date')).values('month')
+        .annotate(count=Count('pk')).values_list('month', 'count')
+    )
+    EventMonthCount.objects.bulk_create(EventMonthCount(month=month, count=count) for month, count in counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_sport_foreign_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Event Month Count',
+                'verbose_name_plural': 'Event Month Counts',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.RunPython(count_months, migrations.RunPython.noop),
+    ]
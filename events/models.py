@@ -2,39 +2,65 @@ from django.db import models
 from django.utils import timezone
 
 
+class EventQuerySet(models.QuerySet):
+    """Upcoming/past status is decided by comparing dates at query time, so it
+    never goes stale the way a flag set on save would."""
+
+    def upcoming(self, today=None):
+        """Events from today on, soonest first"""
+        return self.filter(date__gte=today or timezone.localdate()).order_by('date', 'id')
+
+    def past(self, today=None):
+        """Events before today, most recent first"""
+        return self.filter(date__lt=today or timezone.localdate()).order_by('-date', '-id')
+
+
 class Event(models.Model):
     title = models.CharField(max_length=200)
-    sport = models.CharField(max_length=100)
+    sport = models.ForeignKey('sports.Sport', on_delete=models.PROTECT, related_name='events')
     date = models.DateField()
     location = models.CharField(max_length=200)
     description = models.TextField()
     banner = models.ImageField(upload_to="events/")
-    is_upcoming = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date']
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
+        indexes = [
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+            # A sport's upcoming events
+            models.Index(fields=['sport', 'date'], name='event_sport_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def is_upcoming(self):
+        return self.date >= timezone.localdate()
+
     @property
     def is_past(self):
-        return self.date < timezone.now().date()
+        return not self.is_upcoming
 
-    def save(self, *args, **kwargs):
-        # Keep is_upcoming boolean in sync with the date to avoid admin/data drift.
-        try:
-            today = timezone.now().date()
-            # If date is in future or today, mark upcoming; otherwise, not upcoming
-            self.is_upcoming = self.date >= today
-        except Exception:
-            # If date not set or invalid, leave as-is
-            pass
-        super().save(*args, **kwargs)
+
+class EventMonthCount(models.Model):
+    """Number of events in a month, for the archive navigation (see events.archive)"""
+    month = models.DateField(unique=True, help_text='First day of the month')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month']
+        verbose_name = 'Event Month Count'
+        verbose_name_plural = 'Event Month Counts'
+
+    def __str__(self):
+        return f'{self.month:%B %Y}: {self.count}'
 
 
 class EventImage(models.Model):
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from sports.models import Sport
+from . import archive, ical
+from .models import Event
+
+
+def invalidate_calendar(sender, **kwargs):
+    """Event feeds show event details and sport names"""
+    transaction.on_commit(ical.feed_state.invalidate)
+
+
+for _model in (Event, Sport):
+    post_save.connect(invalidate_calendar, sender=_model, dispatch_uid=f'event_calendar_save_{_model._meta.label_lower}')
+    post_delete.connect(invalidate_calendar, sender=_model, dispatch_uid=f'event_calendar_delete_{_model._meta.label_lower}')
+
+
+def remember_event_date(sender, instance, raw=False, **kwargs):
+    """Note the stored date of an event being edited, to move it between month counts"""
+    if instance.pk is not None and not raw:
+        instance._stored_date = Event._base_manager.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+def count_event_month(sender, instance, created=False, **kwargs):
+    old_date = None if created else getattr(instance, '_stored_date', None)
+    if old_date is not None and (old_date.year, old_date.month) == (instance.date.year, instance.date.month):
+        return
+    if old_date is not None:
+        archive.add_to_month(old_date, -1)
+    if created or old_date is not None:
+        archive.add_to_month(instance.date, 1)
+
+
+def uncount_event_month(sender, instance, **kwargs):
+    archive.add_to_month(instance.date, -1)
+
+
+pre_save.connect(remember_event_date, sender=Event, dispatch_uid='event_month_counts_pre_save')
+post_save.connect(count_event_month, sender=Event, dispatch_uid='event_month_counts_save')
+post_delete.connect(uncount_event_month, sender=Event, dispatch_uid='event_month_counts_delete')
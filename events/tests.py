@@ -1,3 +1,209 @@
-from django.test import TestCase
+import importlib
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import ProtectedError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from sports.models import Sport
+from . import archive, ical
+from .models import Event, EventMonthCount
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_event(sport, **kwargs):
+    values = {
+        'title': 'Final', 'sport': sport, 'date': date(2025, 3, 1), 'location': 'Ground',
+        'description': '', 'banner': 'events/final.jpg',
+    }
+    values.update(kwargs)
+    return Event.objects.create(**values)
+
+
+class EventSportTests(TestCase):
+    def test_sport_with_events_cannot_be_deleted(self):
+        sport = Sport.objects.create(name='Cricket')
+        create_event(sport)
+        with self.assertRaises(ProtectedError):
+            sport.delete()
+        self.assertTrue(Event.objects.filter(sport=sport).exists())
+
+
+class EventStatusTests(TestCase):
+    def setUp(self):
+        self.sport = Sport.objects.create(name='Cricket')
+        self.yesterday = create_event(self.sport, title='Semi', date=date(2025, 2, 28))
+        self.today = create_event(self.sport, title='Final', date=date(2025, 3, 1))
+        self.tomorrow = create_event(self.sport, title='Parade', date=date(2025, 3, 2))
+
+    def test_events_of_today_are_upcoming(self):
+        today = date(2025, 3, 1)
+        self.assertEqual(list(Event.objects.upcoming(today)), [self.today, self.tomorrow])
+        self.assertEqual(list(Event.objects.past(today)), [self.yesterday])
+
+    def test_status_follows_the_calendar_without_saves(self):
+        with mock.patch.object(timezone, 'localdate', return_value=date(2025, 3, 2)):
+            self.assertEqual(list(Event.objects.upcoming()), [self.tomorrow])
+            self.assertEqual(list(Event.objects.past()), [self.today, self.yesterday])
+            self.assertFalse(self.today.is_upcoming)
+            self.assertTrue(self.today.is_past)
+            self.assertTrue(self.tomorrow.is_upcoming)
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_today_is_the_local_date(self):
+        # 20:00 UTC on 1 March is already 2 March in India
+        now = datetime(2025, 3, 1, 20, 0, tzinfo=dt_timezone.utc)
+        with mock.patch.object(timezone, 'now', return_value=now):
+            self.assertEqual(list(Event.objects.upcoming()), [self.tomorrow])
+            self.assertFalse(self.today.is_upcoming)
+        with override_settings(TIME_ZONE='UTC'), mock.patch.object(timezone, 'now', return_value=now):
+            self.assertEqual(list(Event.objects.upcoming()), [self.today, self.tomorrow])
+            self.assertTrue(self.today.is_upcoming)
+
+
+class EventArchiveTests(TestCase):
+    def setUp(self):
+        self.sport = Sport.objects.create(name='Cricket')
+        self.old = create_event(self.sport, title='Old final', date=date(2024, 1, 20))
+        self.semi = create_event(self.sport, title='Semi', date=date(2025, 3, 1))
+        self.final = create_event(self.sport, title='Final', date=date(2025, 3, 30))
+
+    def test_month_counts_follow_saves_and_deletes(self):
+        self.assertEqual(archive.get_month_counts(), [(date(2025, 3, 1), 2), (date(2024, 1, 1), 1)])
+
+        # Same month: no change; another month: moved
+        self.final.date = date(2025, 3, 2)
+        self.final.save()
+        self.semi.date = date(2025, 4, 5)
+        self.semi.save()
+        self.assertEqual(archive.get_month_counts(), [(date(2025, 4, 1), 1), (date(2025, 3, 1), 1), (date(2024, 1, 1), 1)])
+
+        self.old.delete()
+        self.assertEqual(archive.get_month_counts(), [(date(2025, 4, 1), 1), (date(2025, 3, 1), 1)])
+        self.assertEqual(archive.get_archive_years(), [(2025, 2, [(date(2025, 4, 1), 1), (date(2025, 3, 1), 1)])])
+
+    def test_reading_counts_is_one_query(self):
+        with self.assertNumQueries(1):
+            archive.get_archive_years()
+
+    def test_rebuild_corrects_drift(self):
+        Event.objects.bulk_create([Event(
+            title='Bulk', sport=self.sport, date=date(2025, 3, 5), location='Ground', description='', banner='events/final.jpg',
+        )])
+        self.assertEqual(archive.get_month_counts()[0], (date(2025, 3, 1), 2))
+        out = StringIO()
+        call_command('rebuild_event_month_counts', stdout=out)
+        self.assertIn('2 months', out.getvalue())
+        self.assertEqual(archive.get_month_counts(), [(date(2025, 3, 1), 3), (date(2024, 1, 1), 1)])
+
+    def test_migration_fills_counts(self):
+        migration = importlib.import_module('events.migrations.0005_event_month_count')
+        EventMonthCount.objects.all().delete()
+        migration.count_months(apps, None)
+        self.assertEqual(archive.get_month_counts(), [(date(2025, 3, 1), 2), (date(2024, 1, 1), 1)])
+
+    def test_year_archive(self):
+        response = self.client.get(reverse('events:event_archive_year', args=[2025]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['events']), [self.semi, self.final])
+        self.assertContains(response, reverse('events:event_archive_year', args=[2024]))
+        self.assertEqual(self.client.get(reverse('events:event_archive_year', args=[2023])).status_code, 404)
+
+    def test_month_archive(self):
+        response = self.client.get(reverse('events:event_archive_month', args=[2024, 1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['events']), [self.old])
+        self.assertEqual(response.context['next_month'], date(2025, 3, 1))
+        self.assertEqual(self.client.get(reverse('events:event_archive_month', args=[2024, 2])).status_code, 404)
+
+    def test_list_window(self):
+        self.assertEqual(archive.get_list_window(date(2025, 3, 15)), (date(2024, 9, 1), date(2026, 4, 1)))
+        self.assertEqual(archive.get_list_window(date(2025, 12, 31)), (date(2025, 6, 1), date(2027, 1, 1)))
+
+    def test_list_shows_six_months_back_and_twelve_ahead(self):
+        first = create_event(self.sport, title='First shown', date=date(2024, 9, 1))
+        create_event(self.sport, title='Too old', date=date(2024, 8, 31))
+        last = create_event(self.sport, title='Last shown', date=date(2026, 3, 31))
+        create_event(self.sport, title='Too far', date=date(2026, 4, 1))
+        with mock.patch.object(timezone, 'localdate', return_value=date(2025, 3, 15)):
+            response = self.client.get(reverse('events:event_list'))
+        self.assertEqual(list(response.context['events']), [last, self.final, self.semi, first])
+
+
+class ICalFormatTests(SimpleTestCase):
+    def unfold(self, text):
+        return text.replace('\r\n ', '')
+
+    def assertFolded(self, line):
+        folded = ical.fold(line)
+        physical = folded.split('\r\n')
+        for i, part in enumerate(physical):
+            self.assertLessEqual(len(part.encode('utf-8')), 75)
+            if i:
+                self.assertTrue(part.startswith(' '))
+        self.assertEqual(self.unfold(folded), line)
+        return physical
+
+    def test_escape(self):
+        self.assertEqual(ical.escape('a,b;c\\d\r\ne\nf'), 'a\\,b\\;c\\\\d\\ne\\nf')
+
+    def test_short_lines_are_not_folded(self):
+        line = 'S' * 75
+        self.assertEqual(ical.fold(line), line)
+
+    def test_fold_at_75_octets(self):
+        physical = self.assertFolded('SUMMARY:' + 'x' * 200)
+        self.assertEqual(len(physical[0]), 75)
+        self.assertEqual(len(physical[1]), 75)
+
+    def test_fold_never_splits_multibyte_characters(self):
+        # 2, 3 and 4 byte characters landing on the 75th octet
+        for text in ('é' * 80, 'x' + '€' * 60, 'xy' + '\U0001F3CF' * 40, 'Ω€\U0001F3CF' * 20):
+            with self.subTest(text=text[:3]):
+                physical = self.assertFolded('SUMMARY:' + text)
+                self.assertGreater(len(physical), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ICalFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sport = Sport.objects.create(name='Cricket')
+        self.event = create_event(self.sport, title='Final, day 1', description='<p>Gates open; bring water</p>')
+
+    def test_feed_contents(self):
+        response = self.client.get(reverse('events:event_calendar'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode('utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Final\\, day 1\r\n', body)
+        self.assertIn('DESCRIPTION:Gates open\\; bring water\r\n', body)
+        self.assertIn('DTSTART;VALUE=DATE:20250301\r\n', body)
+
+    def test_conditional_get(self):
+        url = reverse('events:sport_calendar', args=[self.sport.slug])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # The feed of all events has its own ETag
+        self.assertNotEqual(self.client.get(reverse('events:event_calendar'))['ETag'], etag)
+
+        self.event.title = 'Final, day 2'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(b'day 2', response.content)
@@ -7,4 +7,8 @@ urlpatterns = [
     path('', views.EventListView.as_view(), name='event_list'),
     path('upcoming-events/', views.UpcomingEventsView.as_view(), name='upcoming_events'),
     path('<int:pk>/', views.EventDetailView.as_view(), name='event_detail'),
+    path('archive/<int:year>/', views.EventYearArchiveView.as_view(), name='event_archive_year'),
+    path('archive/<int:year>/<int:month>/', views.EventMonthArchiveView.as_view(), name='event_archive_month'),
+    path('calendar.ics', views.event_calendar, name='event_calendar'),
+    path('calendar/<slug:sport_slug>.ics', views.event_calendar, name='sport_calendar'),
 ]
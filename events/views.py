@@ -1,23 +1,24 @@
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.views.generic import ListView, DetailView
-from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+from django.views.generic import ListView, DetailView, MonthArchiveView, YearArchiveView
 from .models import Event
+from . import archive, ical
 from core.models import PageHero
+from sports.models import Sport
 
 
-class EventListView(ListView):
+class EventListMixin:
+    """Shared context of the event list and archive pages"""
     model = Event
     template_name = 'events/event_list.html'
     context_object_name = 'events'
     paginate_by = 9
 
-    def get_queryset(self):
-        # Show all events ordered by date (most recent first)
-        # This ensures admin changes are immediately visible
-        return Event.objects.all().order_by('-date')
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['archive_years'] = archive.get_archive_years()
         # Add PageHero for events page
         try:
             context['page_hero'] = PageHero.objects.get(page='events', is_active=True)
@@ -26,6 +27,31 @@ class EventListView(ListView):
         return context
 
 
+class EventListView(EventListMixin, ListView):
+
+    def get_queryset(self):
+        # Recent and coming months only; older seasons are in the archive
+        start, end = archive.get_list_window()
+        return Event.objects.filter(date__gte=start, date__lt=end).select_related('sport').order_by('-date', '-id')
+
+
+class EventArchiveMixin(EventListMixin):
+    date_field = 'date'
+    allow_future = True
+    ordering = ['date', 'id']
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('sport')
+
+
+class EventYearArchiveView(EventArchiveMixin, YearArchiveView):
+    make_object_list = True
+
+
+class EventMonthArchiveView(EventArchiveMixin, MonthArchiveView):
+    month_format = '%m'
+
+
 class UpcomingEventsView(ListView):
     model = Event
     template_name = 'events/upcoming_events.html'
@@ -33,17 +59,31 @@ class UpcomingEventsView(ListView):
     paginate_by = 9
 
     def get_queryset(self):
-        today = timezone.now().date()
-        return Event.objects.filter(date__gte=today).order_by('date')
+        return Event.objects.upcoming().select_related('sport')
 
 
 class EventDetailView(DetailView):
     model = Event
     template_name = 'events/event_detail.html'
     context_object_name = 'event'
+    queryset = Event.objects.select_related('sport')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Add all event images to the context
         context['event_images'] = self.object.images.all()
-        return context
\ No newline at end of file
+        return context
+
+
+@require_safe
+@condition(
+    etag_func=lambda request, sport_slug=None: ical.feed_state.get_etag(request, sport_slug or 'all'),
+    last_modified_func=lambda request, sport_slug=None: ical.feed_state.get_last_modified(request),
+)
+def event_calendar(request, sport_slug=None):
+    """iCalendar feed of all events, or of one sport's events (see events.ical)"""
+    sport = get_object_or_404(Sport, slug=sport_slug) if sport_slug else None
+    response = HttpResponse(ical.get_calendar(request, sport), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="{sport_slug or "events"}.ics"'
+    patch_cache_control(response, public=True, max_age=60 * 15)
+    return response
\ No newline at end of file
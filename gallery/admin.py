@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, GalleryItem
+from .models import Category, GalleryItem, Tag
 from django.utils.html import format_html
 
 
@@ -22,6 +22,20 @@ class CategoryAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    """Tags are maintained from GalleryItem.tags; only renaming is allowed here"""
+    list_display = ['name', 'slug', 'item_count']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['slug', 'item_count']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(GalleryItem)
 class GalleryItemAdmin(admin.ModelAdmin):
     list_display = ['title', 'category', 'is_featured', 'uploaded_date']
@@ -45,9 +59,7 @@ class GalleryItemAdmin(admin.ModelAdmin):
         if not obj:
             return ""
         # Prefer video thumbnail if available
-        thumb = None
-        if getattr(obj, 'video_url', None):
-            thumb = obj.youtube_thumbnail()
+        thumb = obj.youtube_thumbnail()
         if not thumb and getattr(obj, 'image', None):
             try:
                 thumb = obj.image.url
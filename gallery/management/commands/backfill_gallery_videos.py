@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from gallery.models import GalleryItem
+
+VIDEO_FIELDS = ['video_provider', 'video_id', 'video_thumbnail']
+
+
+class Command(BaseCommand):
+    help = 'Parse the video URLs of existing gallery items into their stored provider, id and thumbnail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows updated per batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = GalleryItem.objects.only('pk', 'video_url', *VIDEO_FIELDS).order_by('pk')
+        changed, updated = [], 0
+        for item in queryset.iterator(chunk_size=options['batch_size']):
+            if item.update_video_fields():
+                changed.append(item)
+            if len(changed) >= options['batch_size']:
+                updated += GalleryItem.objects.bulk_update(changed, VIDEO_FIELDS)
+                changed = []
+        if changed:
+            updated += GalleryItem.objects.bulk_update(changed, VIDEO_FIELDS)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} gallery items'))
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:09
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def build_tag_index(apps, schema_editor):
+    Tag = apps.get_model('gallery', 'Tag')
+    GalleryItem = apps.get_model('gallery', 'GalleryItem')
+
+    tags = {}
+    item_slugs = {}
+    for item in GalleryItem.objects.only('pk', 'tags').iterator():
+        slugs = []
+        for name in (item.tags or '').split(','):
+            name = name.strip()[:100]
+            slug = slugify(name)[:100]
+            if slug and slug not in slugs:
+                slugs.append(slug)
+                tags.setdefault(slug, name)
+        item_slugs[item.pk] = slugs
+
+    Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in tags.items()])
+    tag_ids = dict(Tag.objects.values_list('slug', 'pk'))
+
+    Through = GalleryItem.tag_index.through
+    Through.objects.bulk_create([
+        Through(galleryitem_id=item_id, tag_id=tag_ids[slug])
+        for item_id, slugs in item_slugs.items() for slug in slugs
+    ], batch_size=500)
+
+    counts = {}
+    for slugs in item_slugs.values():
+        for slug in slugs:
+            counts[slug] = counts.get(slug, 0) + 1
+    for slug, count in counts.items():
+        Tag.objects.filter(slug=slug).update(item_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0002_galleryitem_video_url_alter_galleryitem_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('item_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['item_count', 'name'], name='gallery_tag_count_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='galleryitem',
+            name='tag_index',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='items', to='gallery.tag'),
+        ),
+        migrations.RunPython(build_tag_index, migrations.RunPython.noop),
+    ]
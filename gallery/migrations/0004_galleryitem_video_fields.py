@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0003_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryitem',
+            name='video_id',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='galleryitem',
+            name='video_provider',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='galleryitem',
+            name='video_thumbnail',
+            field=models.URLField(blank=True, editable=False),
+        ),
+    ]
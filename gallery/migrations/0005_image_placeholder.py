@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0004_galleryitem_video_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryitem',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
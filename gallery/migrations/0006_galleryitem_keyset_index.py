@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0005_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='galleryitem',
+            index=models.Index(fields=['-uploaded_date', '-id'], name='gallery_item_keyset_idx'),
+        ),
+    ]
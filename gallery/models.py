@@ -1,6 +1,22 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 
+from core.images import update_placeholder
+from .video import parse_video_url, get_thumbnail_url
+
+
+def parse_tags(value):
+    """Split a comma-separated tags string into {slug: name}, first spelling wins"""
+    tags = {}
+    for name in (value or '').split(','):
+        name = name.strip()[:100]
+        slug = slugify(name)[:100]
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -23,12 +39,54 @@ class Category(models.Model):
         super().save(*args, **kwargs)
 
 
+class Tag(models.Model):
+    """Normalized gallery tag, kept in sync with GalleryItem.tags.
+
+    item_count caches how many items carry the tag, so the tag cloud is a
+    single indexed query.
+    """
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Tag'
+        verbose_name_plural = 'Tags'
+        indexes = [
+            models.Index(fields=['item_count', 'name'], name='gallery_tag_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def refresh_counts(cls, tag_ids):
+        """Recount the items of the given tags in one query"""
+        if not tag_ids:
+            return
+        through = GalleryItem.tag_index.through
+        item_counts = (
+            through.objects.filter(tag=OuterRef('pk'))
+            .values('tag').annotate(count=Count('*')).values('count')
+        )
+        cls.objects.filter(pk__in=tag_ids).update(item_count=Coalesce(Subquery(item_counts), 0))
+
+
 class GalleryItem(models.Model):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to="gallery/", blank=True, null=True)
+    # Blurred data: URI of image, shown while it loads (set by save())
+    image_placeholder = models.TextField(blank=True, editable=False)
     video_url = models.URLField(blank=True, null=True, help_text='YouTube video URL (optional)')
+    # Parsed from video_url by save()
+    video_provider = models.CharField(max_length=20, blank=True, editable=False)
+    video_id = models.CharField(max_length=32, blank=True, editable=False)
+    video_thumbnail = models.URLField(blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='items')
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    # Normalized copy of `tags`, maintained by save()
+    tag_index = models.ManyToManyField(Tag, related_name='items', blank=True, editable=False)
     description = models.TextField(blank=True)
     uploaded_date = models.DateTimeField(auto_now_add=True)
     is_featured = models.BooleanField(default=False)
@@ -37,27 +95,56 @@ class GalleryItem(models.Model):
         ordering = ['-uploaded_date']
         verbose_name = 'Gallery Item'
         verbose_name_plural = 'Gallery Items'
+        indexes = [
+            # Keyset pagination order (see gallery.pagination)
+            models.Index(fields=['-uploaded_date', '-id'], name='gallery_item_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.update_video_fields()
+        update_placeholder(self, 'image')
+        super().save(*args, **kwargs)
+        self.sync_tags()
+
+    def update_video_fields(self):
+        """Parse video_url into video_provider, video_id and video_thumbnail.
+
+        Returns True when any of them changed.
+        """
+        provider, video_id = parse_video_url(self.video_url)
+        values = (provider, video_id, get_thumbnail_url(provider, video_id))
+        if values == (self.video_provider, self.video_id, self.video_thumbnail):
+            return False
+        self.video_provider, self.video_id, self.video_thumbnail = values
+        return True
+
+    def sync_tags(self):
+        """Mirror the comma-separated tags into tag_index and recount the tags that changed"""
+        wanted = parse_tags(self.tags)
+        current = dict(self.tag_index.values_list('slug', 'pk'))
+        if set(wanted) == set(current):
+            return
+
+        existing = dict(Tag.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+        missing = [Tag(slug=slug, name=name) for slug, name in wanted.items() if slug not in existing]
+        if missing:
+            Tag.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = dict(Tag.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+
+        added = [existing[slug] for slug in wanted if slug not in current]
+        removed = [pk for slug, pk in current.items() if slug not in wanted]
+        if removed:
+            self.tag_index.remove(*removed)
+        if added:
+            self.tag_index.add(*added)
+        Tag.refresh_counts(added + removed)
+
     def youtube_thumbnail(self):
-        """Return a YouTube thumbnail URL if video_url is present and looks like a YouTube link."""
-        if not self.video_url:
-            return None
-        # Try to extract video id from common YouTube URL formats
-        import re
-        patterns = [
-            r'youtu\.be/(?P<id>[A-Za-z0-9_-]{11})',
-            r'v=(?P<id>[A-Za-z0-9_-]{11})',
-            r'embed/(?P<id>[A-Za-z0-9_-]{11})',
-        ]
-        for p in patterns:
-            m = re.search(p, self.video_url)
-            if m:
-                vid = m.group('id')
-                return f'https://img.youtube.com/vi/{vid}/hqdefault.jpg'
-        return None
+        """Return the thumbnail URL stored for the video, or None"""
+        return self.video_thumbnail or None
 
     @property
     def tag_list(self):
@@ -0,0 +1,52 @@
+"""
+Keyset pagination for gallery items.
+
+Items are listed newest first on (uploaded_date, id), and a page is requested
+with an opaque cursor naming the last item already shown. Each page is one
+indexed range query for limit + 1 rows (the extra row only tells whether
+there is a next page), so deep pages cost the same as the first and no COUNT
+is ever run.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+ORDERING = ('-uploaded_date', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item):
+    value = f'{item.uploaded_date.isoformat()}|{item.pk}'
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(uploaded_date, id) of a cursor; raises InvalidCursor"""
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        date_value, pk = value.split('|')
+        uploaded_date = parse_datetime(date_value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if uploaded_date is None:
+        raise InvalidCursor(cursor)
+    return uploaded_date, pk
+
+
+def keyset_page(queryset, cursor=None, limit=12):
+    """Return (items, next_cursor) for the page after cursor; next_cursor is None on the last page"""
+    queryset = queryset.order_by(*ORDERING)
+    if cursor:
+        uploaded_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(uploaded_date__lt=uploaded_date) | Q(uploaded_date=uploaded_date, id__lt=pk))
+    items = list(queryset[:limit + 1])
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(items[-1])
+    return items, None
@@ -0,0 +1,17 @@
+from django.db.models.signals import pre_delete, post_delete
+
+from .models import GalleryItem, Tag
+
+
+def remember_item_tags(sender, instance, **kwargs):
+    """Note the tags of an item about to be deleted; its tag links go with it"""
+    instance._deleted_tag_ids = list(instance.tag_index.values_list('pk', flat=True))
+
+
+def recount_item_tags(sender, instance, **kwargs):
+    """Recount the tags of a deleted item (also covers category cascades)"""
+    Tag.refresh_counts(getattr(instance, '_deleted_tag_ids', []))
+
+
+pre_delete.connect(remember_item_tags, sender=GalleryItem, dispatch_uid='gallery_item_tags_pre_delete')
+post_delete.connect(recount_item_tags, sender=GalleryItem, dispatch_uid='gallery_item_tags_post_delete')
@@ -1,3 +1,179 @@
-from django.test import TestCase
+import base64
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, GalleryItem, Tag, parse_tags
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .video import YOUTUBE, get_thumbnail_url, parse_video_url
+
+
+class TagIndexTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Matches')
+
+    def create_item(self, tags, category=None):
+        return GalleryItem.objects.create(title='Photo', category=category or self.category, tags=tags)
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'item_count'))
+
+    def test_parse_tags_normalizes_slugs(self):
+        self.assertEqual(parse_tags(' Cup, cup ,World Cup 2024,, '), {'cup': 'Cup', 'world-cup-2024': 'World Cup 2024'})
+
+    def test_tags_are_indexed_and_counted(self):
+        first = self.create_item('Cup, Final')
+        self.create_item('cup')
+
+        self.assertEqual(self.counts(), {'cup': 2, 'final': 1})
+        self.assertEqual(Tag.objects.get(slug='cup').name, 'Cup')
+        self.assertQuerySetEqual(first.tag_index.order_by('slug'), ['cup', 'final'], transform=lambda tag: tag.slug)
+
+    def test_editing_tags_recounts_added_and_removed_tags(self):
+        item = self.create_item('Cup, Final')
+        self.create_item('Final')
+
+        item.tags = 'Cup, Training'
+        item.save()
+
+        self.assertEqual(self.counts(), {'cup': 1, 'final': 1, 'training': 1})
+
+    def test_deleting_items_recounts_their_tags(self):
+        item = self.create_item('Cup, Final')
+        other_category = Category.objects.create(name='Training')
+        self.create_item('Cup', category=other_category)
+        self.create_item('Final', category=other_category)
+
+        item.delete()
+        self.assertEqual(self.counts(), {'cup': 1, 'final': 1})
+
+        # Items deleted by the category cascade are recounted too
+        other_category.delete()
+        self.assertEqual(self.counts(), {'cup': 0, 'final': 0})
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Matches')
+        now = timezone.now()
+        # Two items share a timestamp, so pages must break ties on id
+        dates = [now, now - timedelta(hours=1), now - timedelta(hours=1), now - timedelta(hours=2), now - timedelta(hours=3)]
+        cls.items = []
+        for i, date in enumerate(dates):
+            item = GalleryItem.objects.create(title=f'Photo {i}', category=category)
+            GalleryItem.objects.filter(pk=item.pk).update(uploaded_date=date)
+            item.refresh_from_db()
+            cls.items.append(item)
+        cls.ordered = sorted(cls.items, key=lambda item: (item.uploaded_date, item.pk), reverse=True)
+
+    def test_cursor_round_trip(self):
+        item = self.items[1]
+        self.assertEqual(decode_cursor(encode_cursor(item)), (item.uploaded_date, item.pk))
+
+    def test_tampered_cursors_are_rejected(self):
+        for cursor in ('not base64!', base64.urlsafe_b64encode(b'2024-01-01T00:00:00|x').decode(),
+                       base64.urlsafe_b64encode(b'yesterday|3').decode(), base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+                       encode_cursor(self.items[0]) + 'AA'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_pages_cover_every_item_once(self):
+        seen, cursor = [], None
+        with self.assertNumQueries(3):
+            for _ in range(3):
+                items, cursor = keyset_page(GalleryItem.objects.all(), cursor, limit=2)
+                seen.extend(items)
+        self.assertEqual(seen, self.ordered)
+        self.assertIsNone(cursor)
+
+    def test_exactly_full_last_page_has_no_next_cursor(self):
+        items, cursor = keyset_page(GalleryItem.objects.all(), limit=5)
+        self.assertEqual(items, self.ordered)
+        self.assertIsNone(cursor)
+
+        items, cursor = keyset_page(GalleryItem.objects.all(), limit=4)
+        self.assertEqual(cursor, encode_cursor(self.ordered[3]))
+        self.assertEqual(keyset_page(GalleryItem.objects.all(), cursor, limit=4), ([self.ordered[4]], None))
+
+    def test_api_pages_and_errors(self):
+        url = reverse('gallery:gallery_items_api')
+        # An empty cursor is the first page
+        first = self.client.get(url, {'limit': 3, 'cursor': ''}).json()
+        self.assertEqual([item['id'] for item in first['results']], [item.pk for item in self.ordered[:3]])
+        second = self.client.get(url, {'limit': 3, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([item['id'] for item in second['results']], [item.pk for item in self.ordered[3:]])
+        self.assertIsNone(second['next_cursor'])
+
+        self.assertEqual(self.client.get(url, {'cursor': 'tampered'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'many'}).status_code, 400)
+
+
+class VideoUrlTests(SimpleTestCase):
+    VIDEO_ID = 'dQw4w9WgXcQ'
+
+    def test_youtube_url_forms(self):
+        urls = [
+            f'https://www.youtube.com/watch?v={self.VIDEO_ID}',
+            f'https://m.youtube.com/watch?feature=share&v={self.VIDEO_ID}&t=42',
+            f'https://youtu.be/{self.VIDEO_ID}?si=abc',
+            f'https://www.youtube.com/shorts/{self.VIDEO_ID}',
+            f'https://www.youtube.com/embed/{self.VIDEO_ID}?autoplay=1',
+            f'https://www.youtube-nocookie.com/embed/{self.VIDEO_ID}',
+            f'https://www.youtube.com/live/{self.VIDEO_ID}',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(parse_video_url(url), (YOUTUBE, self.VIDEO_ID))
+
+    def test_unsupported_and_bad_urls(self):
+        urls = [
+            None,
+            '',
+            'https://vimeo.com/76979871',
+            'https://player.vimeo.com/video/76979871',
+            'https://www.youtube.com/watch?v=short',
+            f'https://www.youtube.com/watch?v={self.VIDEO_ID}X',
+            f'https://example.com/watch?v={self.VIDEO_ID}',
+            'not a url',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(parse_video_url(url), ('', ''))
+
+    def test_thumbnail_url(self):
+        self.assertEqual(
+            get_thumbnail_url(YOUTUBE, self.VIDEO_ID), f'https://img.youtube.com/vi/{self.VIDEO_ID}/hqdefault.jpg'
+        )
+        self.assertEqual(get_thumbnail_url('', ''), '')
+
+
+class BackfillGalleryVideosTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Highlights')
+
+    def backfill(self, **options):
+        out = StringIO()
+        call_command('backfill_gallery_videos', stdout=out, **options)
+        return out.getvalue()
+
+    def test_fills_stored_video_fields(self):
+        video = GalleryItem.objects.create(
+            title='Final', category=self.category, video_url='https://youtu.be/dQw4w9WgXcQ'
+        )
+        photo = GalleryItem.objects.create(title='Team', category=self.category)
+        # Rows saved before the fields existed
+        GalleryItem.objects.update(video_provider='', video_id='', video_thumbnail='')
+
+        self.assertIn('Updated 1 gallery items', self.backfill(batch_size=1))
+        video.refresh_from_db()
+        self.assertEqual((video.video_provider, video.video_id), (YOUTUBE, 'dQw4w9WgXcQ'))
+        self.assertEqual(video.video_thumbnail, get_thumbnail_url(YOUTUBE, 'dQw4w9WgXcQ'))
+        photo.refresh_from_db()
+        self.assertEqual(photo.video_id, '')
+
+        self.assertIn('Updated 0 gallery items', self.backfill())
@@ -5,4 +5,5 @@ app_name = 'gallery'
 
 urlpatterns = [
     path('', views.GalleryView.as_view(), name='gallery'),
+    path('api/items/', views.gallery_items_api, name='gallery_items_api'),
 ]
@@ -0,0 +1,35 @@
+"""
+Video URL parsing for gallery items.
+
+A GalleryItem's video URL is parsed once, when the item is saved, into a
+provider, a video id and a thumbnail URL (see GalleryItem.update_video_fields);
+views and the admin only read the stored values.
+"""
+import re
+
+YOUTUBE = 'youtube'
+
+# watch?v=, youtu.be/, embed/, shorts/, live/ and v/ links, on youtube.com,
+# m.youtube.com, music.youtube.com and youtube-nocookie.com
+YOUTUBE_ID_RE = re.compile(
+    r'(?:'
+    r'youtu\.be/'
+    r'|(?:[\w-]+\.)?youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/|live/|v/)'
+    r')(?P<id>[A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+)
+
+
+def parse_video_url(url):
+    """Return (provider, video_id) for a supported video URL, or ('', '')"""
+    if url:
+        match = YOUTUBE_ID_RE.search(url)
+        if match:
+            return YOUTUBE, match.group('id')
+    return '', ''
+
+
+def get_thumbnail_url(provider, video_id):
+    """Thumbnail image URL for a parsed video, or ''"""
+    if provider == YOUTUBE and video_id:
+        return f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg'
+    return ''
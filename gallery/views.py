@@ -1,71 +1,116 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
 from django.views.generic import ListView
-from .models import GalleryItem, Category
+from django.utils.text import slugify
+from core.images import get_image_sources
+from .models import GalleryItem, Category, Tag
+from .pagination import InvalidCursor, keyset_page
+
+PAGE_SIZE = 12
+VIDEO_PAGE_SIZE = 8
+MAX_PAGE_SIZE = 48
+
+
+def get_items_queryset(kind='image', category=None, tag=None):
+    """Gallery images (or videos), optionally filtered by category and tag slug"""
+    queryset = GalleryItem.objects.filter(video_url__isnull=(kind != 'video'))
+    if category:
+        queryset = queryset.filter(category__slug=category)
+    if tag:
+        # Exact tag, through the tag index
+        queryset = queryset.filter(tag_index__slug=slugify(tag))
+    return queryset.select_related('category').prefetch_related('tag_index')
+
+
+def serialize_item(item):
+    data = {
+        'id': item.pk,
+        'title': item.title,
+        'description': item.description,
+        'uploaded_date': item.uploaded_date.isoformat(),
+        'category': {'name': item.category.name, 'slug': item.category.slug},
+        'tags': [{'name': tag.name, 'slug': tag.slug} for tag in item.tag_index.all()],
+    }
+    if item.video_url:
+        data['video'] = {
+            'url': item.video_url,
+            'provider': item.video_provider,
+            'id': item.video_id,
+            'thumbnail': item.video_thumbnail,
+        }
+    if item.image:
+        sources = get_image_sources(item.image)
+        data['image'] = {
+            'url': item.image.url,
+            'src': sources['src'],
+            'sources': [{'type': content_type, 'srcset': srcset} for content_type, srcset in sources.get('sources', [])],
+            'placeholder': item.image_placeholder,
+        }
+    return data
+
+
+@require_safe
+def gallery_items_api(request):
+    """Keyset-paginated gallery items as JSON.
+
+    Query parameters: kind (image or video), category and tag (slugs), limit
+    and cursor (the next_cursor of the previous page).
+    """
+    kind = request.GET.get('kind', 'image')
+    if kind not in ('image', 'video'):
+        return JsonResponse({'error': 'kind must be image or video'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+
+    queryset = get_items_queryset(kind, request.GET.get('category'), request.GET.get('tag'))
+    try:
+        items, next_cursor = keyset_page(queryset, request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'results': [serialize_item(item) for item in items],
+        'next_cursor': next_cursor,
+    })
 
 
 class GalleryView(ListView):
     model = GalleryItem
     template_name = 'gallery/gallery.html'
     context_object_name = 'gallery_items'
-    paginate_by = 12
-    
+
     def get_queryset(self):
-        queryset = GalleryItem.objects.filter(video_url__isnull=True).order_by('-uploaded_date')
-        
-        # Filter by category if specified
-        category_slug = self.request.GET.get('category')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
-        
-        # Filter by tag if specified
-        tag = self.request.GET.get('tag')
-        if tag:
-            queryset = queryset.filter(tags__icontains=tag)
-        
-        return queryset
-    
+        return get_items_queryset('image', self.request.GET.get('category'), self.request.GET.get('tag'))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.filter(is_active=True).order_by('name')
-        
-        # Get all unique tags
-        all_items = GalleryItem.objects.all()
-        all_tags = set()
-        for item in all_items:
-            all_tags.update(item.tag_list)
-        context['all_tags'] = sorted(list(all_tags))
-        # Video items (separate)
-        video_qs = GalleryItem.objects.filter(video_url__isnull=False).order_by('-uploaded_date')
-        video_items = []
-        import re
-        for v in video_qs:
-            thumb = v.youtube_thumbnail()
-            # extract video id
-            vid = None
-            patterns = [
-                r'(?:youtube\.com\/(?:[^\/\n\s]+\/\s*)*(?:v\/|e\/|watch\?.*v=|\&v=)|youtu\.be\/)([A-Za-z0-9_-]{11})',
-                r'(?:youtube\.com\/embed\/)([A-Za-z0-9_-]{11})',
-                r'(?:youtube\.com\/shorts\/)([A-Za-z0-9_-]{11})'
-            ]
-            for p in patterns:
-                m = re.search(p, v.video_url)
-                if m:
-                    vid = m.group(1)
-                    break
-            video_items.append({
-                'title': v.title,
-                'category': v.category,
-                'video_url': v.video_url,
-                'youtube_thumbnail': thumb,
-                'video_id': vid,
-            })
-        context['video_items'] = video_items
-        
+
+        # Tags in use, from the tag index
+        context['all_tags'] = Tag.objects.filter(item_count__gt=0).order_by('name')
+
+        # First page of images and videos; later pages come from gallery_items_api
+        # (or from the Load more links without JavaScript)
+        context['gallery_items'], context['next_cursor'] = self.get_page(
+            self.object_list, 'cursor', PAGE_SIZE
+        )
+        # Video items (separate); ids and thumbnails are parsed when items are saved
+        context['video_items'], context['next_video_cursor'] = self.get_page(
+            get_items_queryset('video'), 'video_cursor', VIDEO_PAGE_SIZE
+        )
+
         # Add PageHero for gallery page
         try:
             from core.models import PageHero
             context['page_hero'] = PageHero.objects.get(page='gallery', is_active=True)
         except PageHero.DoesNotExist:
             context['page_hero'] = None
-        
-        return context
\ No newline at end of file
+
+        return context
+
+    def get_page(self, queryset, param, limit):
+        try:
+            return keyset_page(queryset, self.request.GET.get(param), limit)
+        except InvalidCursor:
+            return keyset_page(queryset, None, limit)
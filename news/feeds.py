@@ -0,0 +1,61 @@
+"""
+RSS and Atom feeds of the published news articles.
+
+Aggregators and the mobile app poll the feeds; they are answered through a
+core.feed_cache.FeedState, which signals (see news.signals) invalidate when an
+article is saved or deleted. The state covers all articles, not only the
+published ones, so unpublishing an article changes the feeds too.
+"""
+from django.contrib.syndication.views import Feed
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from core.feed_cache import FeedState
+from .models import NewsArticle
+
+FEED_ITEMS = 20
+
+feed_state = FeedState('news:feed', NewsArticle)
+
+
+def get_cached_feed(feed, request, name):
+    """(content, content type) of a feed, from the cache while the articles are unchanged"""
+    def render():
+        response = feed(request)
+        return response.content, response['Content-Type']
+    return feed_state.get_body(request, name, render)
+
+
+class LatestNewsFeed(Feed):
+    title = 'NSCPL News'
+    description = 'The latest news from NSCPL.'
+
+    def link(self):
+        return reverse('news:news_list')
+
+    def items(self):
+        return NewsArticle.objects.published().cards().order_by('-published_date')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        # The stored excerpt; the full content stays on the site
+        return item.excerpt
+
+    def item_link(self, item):
+        return reverse('news:news_detail', args=[item.slug])
+
+    def item_pubdate(self, item):
+        return item.published_date
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class LatestNewsAtomFeed(LatestNewsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestNewsFeed.description
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:28
+
+import html
+import math
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# Frozen copy of news.text as of this migration, so later changes there don't
+# change what it computes
+EXCERPT_WORDS = 40
+WORDS_PER_MINUTE = 200
+
+BLOCK_END_RE = re.compile(r'</(p|div|h[1-6]|li|blockquote|tr)>|<br\s*/?>', re.IGNORECASE)
+
+
+def plain_text(value):
+    text = html.unescape(strip_tags(BLOCK_END_RE.sub(' ', value or '')))
+    return ' '.join(text.split())
+
+
+def get_excerpt(value):
+    return Truncator(plain_text(value)).words(EXCERPT_WORDS)
+
+
+def get_reading_time(value):
+    return max(1, math.ceil(len(plain_text(value).split()) / WORDS_PER_MINUTE))
+
+
+def fill_excerpts(apps, schema_editor):
+    NewsArticle = apps.get_model('news', 'NewsArticle')
+    batch = []
+    for article in NewsArticle.objects.only('pk', 'content').iterator(chunk_size=200):
+        article.excerpt = get_excerpt(article.content)
+        article.reading_time = get_reading_time(article.content)
+        batch.append(article)
+        if len(batch) == 200:
+            NewsArticle.objects.bulk_update(batch, ['excerpt', 'reading_time'])
+            batch = []
+    NewsArticle.objects.bulk_update(batch, ['excerpt', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_remove_newsarticle_custom_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, help_text='Minutes'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
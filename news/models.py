@@ -4,6 +4,21 @@ from django.contrib.auth.models import User
 from django_ckeditor_5.fields import CKEditor5Field
 from django.utils import timezone
 
+from .text import get_excerpt, get_reading_time
+
+# Fields computed from the content when it is saved
+SUMMARY_FIELDS = ('excerpt', 'reading_time')
+
+
+class NewsArticleQuerySet(models.QuerySet):
+
+    def published(self):
+        return self.filter(is_published=True)
+
+    def cards(self):
+        """Articles for list cards: the stored excerpt stands in for the full content"""
+        return self.defer('content').select_related('author')
+
 
 class NewsArticle(models.Model):
     title = models.CharField(max_length=200)
@@ -14,6 +29,11 @@ class NewsArticle(models.Model):
     is_published = models.BooleanField(default=False)
     published_date = models.DateTimeField(default=timezone.now, help_text="Published date for this article")
     updated_at = models.DateTimeField(auto_now=True)
+    # Computed from content on save, so lists don't need to load it
+    excerpt = models.TextField(blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes")
+
+    objects = NewsArticleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-published_date']
@@ -26,4 +46,19 @@ class NewsArticle(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        update_fields = kwargs.get('update_fields')
+        if 'content' in self.get_deferred_fields():
+            # Content isn't written, so neither are the summaries of it: the
+            # stored ones may be newer than the ones loaded with this instance
+            if update_fields is None:
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in self.get_deferred_fields()
+                ]
+            kwargs['update_fields'] = [name for name in update_fields if name not in SUMMARY_FIELDS]
+        elif update_fields is None or 'content' in update_fields:
+            self.excerpt = get_excerpt(self.content)
+            self.reading_time = get_reading_time(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *SUMMARY_FIELDS}
         super().save(*args, **kwargs)
\ No newline at end of file
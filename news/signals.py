@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from . import feeds
+from .models import NewsArticle
+
+
+def invalidate_feeds(sender, **kwargs):
+    transaction.on_commit(feeds.feed_state.invalidate)
+
+
+post_save.connect(invalidate_feeds, sender=NewsArticle, dispatch_uid='news_feeds_save')
+post_delete.connect(invalidate_feeds, sender=NewsArticle, dispatch_uid='news_feeds_delete')
@@ -1,3 +1,146 @@
-from django.test import TestCase
+import importlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .models import NewsArticle
+from .text import get_excerpt, get_reading_time, plain_text
+
+
+class TextTests(SimpleTestCase):
+    def test_block_tags_separate_words(self):
+        self.assertEqual(plain_text('<p>One</p><p>two</p><h2>Three</h2>four<br>five<br/>six'), 'One two Three four five six')
+        # Inline tags don't
+        self.assertEqual(plain_text('<p>foot<strong>ball</strong></p>'), 'football')
+
+    def test_entities_are_unescaped(self):
+        self.assertEqual(plain_text('<p>Fish &amp; chips&nbsp;&lt;3</p>'), 'Fish & chips <3')
+        self.assertEqual(get_excerpt('<p>&quot;Hat-trick&quot;</p>'), '"Hat-trick"')
+
+    def test_excerpt_is_truncated(self):
+        self.assertEqual(get_excerpt('<p>%s</p>' % ' '.join(['word'] * 50), words=3), 'word word word…')
+        self.assertEqual(get_excerpt(None), '')
+
+    def test_reading_time_is_at_least_a_minute(self):
+        self.assertEqual(get_reading_time(''), 1)
+        self.assertEqual(get_reading_time('<p>Short</p>'), 1)
+        self.assertEqual(get_reading_time(' '.join(['word'] * 200)), 1)
+        self.assertEqual(get_reading_time(' '.join(['word'] * 201)), 2)
+
+
+class NewsArticleSummaryTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('editor')
+        self.article = NewsArticle.objects.create(
+            title='Final report', author=self.author, content='<p>Old report</p>', is_published=False,
+        )
+
+    def test_summary_follows_content(self):
+        self.assertEqual(self.article.excerpt, 'Old report')
+        self.article.content = '<p>New report</p>'
+        self.article.save(update_fields=['content'])
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.excerpt, 'New report')
+
+    def test_saving_a_card_keeps_the_stored_summary(self):
+        card = NewsArticle.objects.cards().get(pk=self.article.pk)
+        self.article.content = '<p>Edited meanwhile</p>'
+        self.article.save()
+
+        card.is_published = True
+        card.save()
+        self.article.refresh_from_db()
+        self.assertTrue(self.article.is_published)
+        self.assertEqual(self.article.content, '<p>Edited meanwhile</p>')
+        self.assertEqual(self.article.excerpt, 'Edited meanwhile')
+
+    def test_migration_fills_summaries(self):
+        migration = importlib.import_module('news.migrations.0005_newsarticle_excerpt_reading_time')
+        NewsArticle.objects.update(excerpt='', reading_time=0, content='<p>%s</p>' % ' '.join(['word'] * 250))
+        migration.fill_excerpts(apps, None)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.excerpt, ' '.join(['word'] * 40) + '…')
+        self.assertEqual(self.article.reading_time, 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NewsFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user('editor', first_name='Asha', last_name='Rao')
+        self.article = NewsArticle.objects.create(
+            title='Finals this weekend', author=author, is_published=True,
+            content='<p>Gates open at nine &amp; close at six.</p>',
+        )
+        NewsArticle.objects.create(title='Draft', author=author, content='<p>Not yet</p>', is_published=False)
+
+    def save(self, article):
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+
+    def test_rss_contents(self):
+        response = self.client.get(reverse('news:news_rss'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/rss+xml'))
+        self.assertContains(response, '<title>Finals this weekend</title>')
+        self.assertContains(response, 'Gates open at nine &amp; close at six.')
+        self.assertContains(response, reverse('news:news_detail', args=[self.article.slug]))
+        self.assertNotContains(response, 'Draft')
+
+    def test_atom_contents(self):
+        response = self.client.get(reverse('news:news_atom'))
+        self.assertTrue(response['Content-Type'].startswith('application/atom+xml'))
+        self.assertContains(response, '<name>Asha Rao</name>')
+        self.assertContains(response, '<title>Finals this weekend</title>')
+
+    def test_not_modified(self):
+        url = reverse('news:news_rss')
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertNotEqual(self.client.get(reverse('news:news_atom'))['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+            # Unchanged: the full response comes from the cache too
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_saving_an_article_changes_the_feed(self):
+        url = reverse('news:news_rss')
+        etag = self.client.get(url)['ETag']
+        self.article.title = 'Finals moved to Sunday'
+        self.save(self.article)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Finals moved to Sunday')
+
+    def test_unpublishing_an_article_changes_the_feed(self):
+        url = reverse('news:news_rss')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.article.is_published = False
+        self.save(self.article)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Finals this weekend')
+
+    def test_deleting_an_article_moves_last_modified(self):
+        url = reverse('news:news_rss')
+        last_modified = self.client.get(url)['Last-Modified']
+        # Last-Modified has one-second resolution; delete a minute later
+        later = timezone.now() + timedelta(minutes=1)
+        with mock.patch.object(timezone, 'now', return_value=later), self.captureOnCommitCallbacks(execute=True):
+            self.article.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Finals this weekend')
@@ -0,0 +1,28 @@
+"""Plain text summaries of rich text (CKEditor HTML), stored on articles when they are saved."""
+import html
+import math
+import re
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 40
+WORDS_PER_MINUTE = 200
+
+_BLOCK_END_RE = re.compile(r'</(p|div|h[1-6]|li|blockquote|tr)>|<br\s*/?>', re.IGNORECASE)
+
+
+def plain_text(value):
+    """Text of an HTML fragment with whitespace collapsed"""
+    # Keep words of adjacent paragraphs apart once the tags are gone
+    text = html.unescape(strip_tags(_BLOCK_END_RE.sub(' ', value or '')))
+    return ' '.join(text.split())
+
+
+def get_excerpt(value, words=EXCERPT_WORDS):
+    return Truncator(plain_text(value)).words(words)
+
+
+def get_reading_time(value):
+    """Minutes it takes to read an HTML fragment, at least 1"""
+    return max(1, math.ceil(len(plain_text(value).split()) / WORDS_PER_MINUTE))
@@ -5,5 +5,7 @@ app_name = 'news'
 
 urlpatterns = [
     path('', views.NewsListView.as_view(), name='news_list'),
+    path('feed.xml', views.rss_feed, name='news_rss'),
+    path('atom.xml', views.atom_feed, name='news_atom'),
     path('<slug:slug>/', views.NewsDetailView.as_view(), name='news_detail'),
 ]
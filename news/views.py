@@ -1,6 +1,10 @@
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
 from django.views.generic import ListView, DetailView
 from .models import NewsArticle
+from . import feeds
 
 
 class NewsListView(ListView):
@@ -10,7 +14,7 @@ class NewsListView(ListView):
     paginate_by = 9
     
     def get_queryset(self):
-        return NewsArticle.objects.filter(is_published=True).order_by('-published_date')
+        return NewsArticle.objects.published().cards().order_by('-published_date')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -28,4 +32,24 @@ class NewsDetailView(DetailView):
     template_name = 'news/news_detail.html'
     context_object_name = 'article'
     slug_field = 'slug'
-    slug_url_kwarg = 'slug'
\ No newline at end of file
+    slug_url_kwarg = 'slug'
+    queryset = NewsArticle.objects.select_related('author')
+
+
+def cached_feed(feed, name):
+    """View serving a news feed with conditional GET, from the cache while articles are unchanged (see news.feeds)"""
+    @require_safe
+    @condition(
+        etag_func=lambda request: feeds.feed_state.get_etag(request, name),
+        last_modified_func=lambda request: feeds.feed_state.get_last_modified(request),
+    )
+    def view(request):
+        content, content_type = feeds.get_cached_feed(feed, request, name)
+        response = HttpResponse(content, content_type=content_type)
+        patch_cache_control(response, public=True, max_age=60 * 5)
+        return response
+    return view
+
+
+rss_feed = cached_feed(feeds.LatestNewsFeed(), 'rss')
+atom_feed = cached_feed(feeds.LatestNewsAtomFeed(), 'atom')
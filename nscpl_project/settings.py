@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -123,6 +123,56 @@ else:
         }
     }
 
+# The test database is built from the current models: the historical
+# migrations can't run from scratch (page_content 0002 copies rows out of core
+# models that core 0024 has already removed on a fresh database)
+DATABASES['default']['TEST'] = {'MIGRATE': False}
+
+# Runs the tests against a local memory cache instead of the shared file cache
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Holds the version stamps that invalidate per-process caches (see core.site_cache)
+# and rendered block fragments, so every worker process must see the same cache.
+# The file cache is shared by the workers of one host; use Redis/Memcached across hosts.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        # Lifetime of bulk entries (image manifests, rendered fragments, ...).
+        # Version stamps are stored without a timeout and change only when bumped.
+        'TIMEOUT': config('CACHE_TIMEOUT', default=60 * 60, cast=int),
+        'OPTIONS': {
+            # Past this the file cache deletes a third of its entries at random
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    }
+}
+
+# CMS page views log a warning when a request runs more queries than this (see page_content.blocks)
+PAGE_QUERY_BUDGET = config('PAGE_QUERY_BUDGET', default=30, cast=int)
+
+# Where `manage.py publish_static` writes the static HTML export (see core.static_export)
+STATIC_EXPORT_ROOT = config('STATIC_EXPORT_ROOT', default=str(BASE_DIR / 'static_site'))
+
+# Widths (px) of the WebP/JPEG variants generated for uploaded images, and their quality (see core.images)
+IMAGE_VARIANT_WIDTHS = config('IMAGE_VARIANT_WIDTHS', default='320,640,960,1280,1920', cast=Csv(int))
+IMAGE_VARIANT_QUALITY = config('IMAGE_VARIANT_QUALITY', default=80, cast=int)
+# WebP encoder effort, 0 (fast) to 6 (smallest files, several times slower)
+IMAGE_VARIANT_WEBP_METHOD = config('IMAGE_VARIANT_WEBP_METHOD', default=4, cast=int)
+# Generate variants right after an upload is committed, in the upload request. Off by
+# default: uploads are picked up by `manage.py generate_image_variants` run from cron
+IMAGE_VARIANTS_ON_UPLOAD = config('IMAGE_VARIANTS_ON_UPLOAD', default=False, cast=bool)
+
+# On-demand resizing at /media/r/<width>x<height>/<path> (see core.resize): sizes that may be
+# requested (a height of 0 keeps the aspect ratio), and where and how much is cached
+RESIZE_ALLOWED_SIZES = config('RESIZE_ALLOWED_SIZES', default='240x240,600x600,1200x0,1920x0', cast=Csv())
+RESIZE_CACHE_DIR = config('RESIZE_CACHE_DIR', default=str(BASE_DIR / 'resize_cache'))
+RESIZE_CACHE_MAX_BYTES = config('RESIZE_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -179,6 +229,12 @@ STATIC_ROOT = (BASE_DIR / 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = (BASE_DIR / 'media')
 
+# Uploads are stored once per distinct content (see core.storage)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.DedupFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import resized_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("ckeditor5/", include('django_ckeditor_5.urls')),
@@ -32,6 +34,9 @@ urlpatterns = [
     path('sports/', include('sports.urls')),
     path('teams/', include('teams.urls')),
     path('page/<slug:slug>/', include('page_content.urls')),
+
+    # On-demand resized images; must come before the media files themselves
+    path(f"{settings.MEDIA_URL.strip('/')}/r/<int:width>x<int:height>/<path:path>", resized_media, name='resized_media'),
 ]
 
 if settings.DEBUG:
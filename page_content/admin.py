@@ -4,6 +4,7 @@ from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.contrib.contenttypes.models import ContentType
+from django.db.models.fields.files import FieldFile
 from .models import (
     BlockType, Page, Block, MenuItem, StyleOptions,
     HeroBannerBlock, TextImageBlock, FeatureHighlightsBlock, FeatureItem,
@@ -14,6 +15,7 @@ from .models import (
     StyledContentBlock
 )
 from core.forms import PageForm, StyleOptionsForm
+from .styles import OPTION_FIELDS
 
 
 class BlockInline(admin.StackedInline):
@@ -23,16 +25,42 @@ class BlockInline(admin.StackedInline):
     readonly_fields = ()
 
 
+# Style fields as they appear on block/team admin forms ('style_<option>'),
+# built once at startup and shared by every generated form class
+STYLE_FORM_FIELDS = {f'style_{name}': field for name, field in StyleOptionsForm.base_fields.items()}
+
+# Initial values for objects without StyleOptions
+STYLE_FIELD_DEFAULTS = {
+    f'style_{field.name}': field.default
+    for field in (StyleOptions._meta.get_field(name) for name in OPTION_FIELDS)
+    if field.has_default() and not callable(field.default)
+}
+
+
+class StyleOptionsFormMixin:
+    """Fills the style_* fields of an admin form from its instance's StyleOptions"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        so = None
+        if self.instance.pk:
+            try:
+                so = self.instance.style_options
+            except StyleOptions.DoesNotExist:
+                pass
+        for sf in OPTION_FIELDS:
+            key = f'style_{sf}'
+            if key in self.initial:
+                continue
+            if so is not None:
+                self.initial[key] = getattr(so, sf)
+            elif key in STYLE_FIELD_DEFAULTS:
+                self.initial[key] = STYLE_FIELD_DEFAULTS[key]
+
+
 class StyleOptionsAdminMixin:
     """Mixin to add style options fields to admin forms"""
-    STYLE_FIELDS = [
-        'background_type', 'background_color', 'background_gradient', 'background_image', 'background_image_opacity',
-        'text_color', 'text_align',
-        'padding_top', 'padding_bottom', 'padding_left', 'padding_right',
-        'margin_top', 'margin_bottom',
-        'container_width', 'border_radius', 'shadow',
-        'animate_on_scroll', 'hover_effect', 'custom_class',
-    ]
+    STYLE_FIELDS = list(OPTION_FIELDS)
 
     def get_fieldsets(self, request, obj=None):
         fieldsets = super(StyleOptionsAdminMixin, self).get_fieldsets(request, obj)
@@ -50,91 +78,68 @@ class StyleOptionsAdminMixin:
     def get_form(self, request, obj=None, **kwargs):
         # Filter out style fields from fields list if present
         if 'fields' in kwargs and kwargs['fields'] is not None:
-            style_fields_to_remove = [f'style_{sf}' for sf in self.STYLE_FIELDS]
-            kwargs['fields'] = [f for f in kwargs['fields'] if f not in style_fields_to_remove]
-        
-        # Get the base form from the parent admin class
-        BaseForm = super(StyleOptionsAdminMixin, self).get_form(request, obj, **kwargs)
-        
-        # Create a new form class that inherits from BaseForm and adds style fields
-        style_form = StyleOptionsForm()
-        
-        # Create form class with style fields added as class attributes with 'style_' prefix
-        attrs = {}
-        for name, field in style_form.fields.items():
-            prefixed_name = f'style_{name}'
-            attrs[prefixed_name] = field
-        
-        FormClass = type(f'{self.model.__name__}StyleForm', (BaseForm,), attrs)
-
-        # Wrap __init__ to populate initial values from obj.style_options
-        orig_init = getattr(FormClass, '__init__', None)
-
-        def __init__(form_self, *fargs, **fkwargs):
-            if orig_init:
-                orig_init(form_self, *fargs, **fkwargs)
-            # populate initial style values only if obj exists
-            if obj:
-                try:
-                    so = getattr(obj, 'style_options', None)
-                except Exception:
-                    so = None
-                if not so:
-                    # ensure a StyleOptions exists to populate defaults
-                    so = StyleOptions.objects.create()
-                    obj.style_options = so
-                    obj.save()
-                for sf in self.STYLE_FIELDS:
-                    key = f'style_{sf}'
-                    if key in form_self.initial:
-                        continue
-                    try:
-                        form_self.initial[key] = getattr(so, sf)
-                    except Exception:
-                        # ignore missing attrs
-                        pass
-            else:
-                # For new objects, set defaults from StyleOptions model
-                for sf in self.STYLE_FIELDS:
-                    key = f'style_{sf}'
-                    if key not in form_self.initial:
-                        try:
-                            field = StyleOptions._meta.get_field(sf)
-                            if field.default is not None and not callable(field.default):
-                                form_self.initial[key] = field.default
-                        except Exception:
-                            pass
-
-        FormClass.__init__ = __init__
+            kwargs['fields'] = [f for f in kwargs['fields'] if f not in STYLE_FORM_FIELDS]
+
+        # Generated form classes are memoized per admin: building one runs
+        # modelform_factory and a formfield lookup for every model field
+        forms_cache = self.__dict__.setdefault('_style_form_classes', {})
+        key = self._get_form_cache_key(request, obj, kwargs)
+        FormClass = forms_cache.get(key)
+        if FormClass is None:
+            BaseForm = super(StyleOptionsAdminMixin, self).get_form(request, obj, **kwargs)
+            FormClass = type(
+                f'{self.model.__name__}StyleForm',
+                (StyleOptionsFormMixin, BaseForm),
+                dict(STYLE_FORM_FIELDS),
+            )
+            forms_cache[key] = FormClass
         return FormClass
 
-    def save_model(self, request, obj, form, change):
-        # First save the main object
-        super().save_model(request, obj, form, change)
+    def _get_form_cache_key(self, request, obj, kwargs):
+        """What ModelAdmin.get_form() output depends on besides the model admin itself"""
+        related_admins = self.__dict__.get('_related_admins')
+        if related_admins is None:
+            related_admins = self._related_admins = [
+                self.admin_site._registry[field.related_model]
+                for field in self.model._meta.get_fields()
+                if field.concrete and field.is_relation and field.related_model in self.admin_site._registry
+            ]
+        # Related-object widgets show add/change/delete/view links by permission
+        related_permissions = tuple(
+            (
+                related.has_add_permission(request),
+                related.has_change_permission(request),
+                related.has_delete_permission(request),
+                related.has_view_permission(request),
+            )
+            for related in related_admins
+        )
+        return (
+            obj is None,
+            obj is not None and not self.has_change_permission(request, obj),
+            tuple(self.get_readonly_fields(request, obj)),
+            repr(sorted(kwargs.items())),
+            related_permissions,
+        )
 
-        # Ensure style_options exists
-        so = getattr(obj, 'style_options', None)
-        if not so:
-            so = StyleOptions.objects.create()
-            obj.style_options = so
-            obj.save()
-
-        # Pull prefixed style fields from form.cleaned_data and save to StyleOptions
-        updated = False
+    def save_model(self, request, obj, form, change):
+        # StyleOptions rows are shared: point obj at the row matching the
+        # submitted values (copy-on-write) instead of editing its row in place
+        so = getattr(obj, 'style_options', None) or StyleOptions()
+        changes = {}
         for sf in self.STYLE_FIELDS:
             key = f'style_{sf}'
             if key in form.cleaned_data:
                 val = form.cleaned_data.get(key)
-                # assign if value present (files handled by FileField)
-                try:
-                    setattr(so, sf, val)
-                    updated = True
-                except Exception:
-                    # ignore invalid assignments
-                    pass
-
-        if updated:
-            so.save()
+                if isinstance(val, FieldFile):
+                    # unchanged file
+                    val = val.name
+                elif sf == 'background_image' and val is False:
+                    # "clear" ticked on the file input
+                    val = None
+                changes[sf] = val
+        obj.style_options = StyleOptions.intern(so.copy(**changes))
+        super().save_model(request, obj, form, change)
 
 
 class PageAdmin(admin.ModelAdmin):
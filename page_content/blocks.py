@@ -0,0 +1,345 @@
+"""
+Block loading for CMS pages.
+
+A page's layout is read from PageLayoutEntry in a single query; the blocks it
+references are then fetched with one in_bulk() per block model present on the
+page, with their StyleOptions joined in and their child items (slides, FAQs,
+counters, ...) prefetched. Rendering a page therefore costs a fixed number of
+queries per block model, however many blocks the page holds.
+
+Rendered block HTML is cached per block under a version stamp that signals
+bump whenever the block, its StyleOptions or one of its child items changes
+(see page_content.signals), so a page is assembled from cached fragments and
+an edit only re-renders the affected block. Block styles are served from a
+per-page stylesheet (see page_content.styles) whose name is cached the same way.
+"""
+import functools
+import logging
+import uuid
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import styles
+from .models import Block, BaseBlock, PageLayoutEntry
+
+logger = logging.getLogger(__name__)
+
+
+def get_block_models():
+    """The generic Block plus every concrete typed block model"""
+    return [Block] + [model for model in apps.get_models() if issubclass(model, BaseBlock)]
+
+
+def get_child_relations(model):
+    """Accessor names of the child collections of a block model (e.g. 'faqs')"""
+    return [
+        rel.get_accessor_name()
+        for rel in model._meta.related_objects
+        if rel.one_to_many and rel.related_model is not PageLayoutEntry
+    ]
+
+
+def get_block_queryset(model):
+    """Queryset for a block model with StyleOptions and child items preloaded"""
+    queryset = model.objects.all()
+    if any(field.name == 'style_options' for field in model._meta.concrete_fields):
+        queryset = queryset.select_related('style_options')
+    child_relations = get_child_relations(model)
+    if child_relations:
+        queryset = queryset.prefetch_related(*child_relations)
+    return queryset
+
+
+def get_page_layout(page):
+    """(content_type_id, object_id) of the active blocks of a page, in layout order"""
+    return list(
+        PageLayoutEntry.objects.filter(page=page, is_active=True)
+        .order_by('order', 'object_id')
+        .values_list('content_type_id', 'object_id')
+    )
+
+
+def load_blocks(refs):
+    """Batch-load blocks for (content_type_id, object_id) pairs, one query per model.
+
+    Returns a dict keyed by the same pairs; blocks that no longer exist are absent.
+    """
+    ids_by_type = defaultdict(list)
+    for content_type_id, object_id in refs:
+        ids_by_type[content_type_id].append(object_id)
+
+    loaded = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        for pk, obj in get_block_queryset(model).in_bulk(ids).items():
+            loaded[(content_type_id, pk)] = obj
+    return loaded
+
+
+def get_page_blocks(page):
+    """Return the active blocks of a page, in layout order"""
+    layout = get_page_layout(page)
+    loaded = load_blocks(layout)
+    # Entries whose block disappeared without a signal (e.g. raw SQL) are skipped
+    return [loaded[key] for key in layout if key in loaded]
+
+
+def get_typed_block_model(block_type):
+    """Typed block model a BlockType stands for, matched on its slug, or None.
+
+    'faqblock', 'faq-block' and 'faq_block' all resolve to FAQBlock.
+    """
+    key = block_type.slug.replace('-', '').replace('_', '')
+    for model in get_block_models()[1:]:
+        if model._meta.model_name == key:
+            return model
+    return None
+
+
+def resolve_page_blocks(page):
+    """Map a page's generic Block rows to the typed blocks they stand for.
+
+    The Nth active Block of a BlockType stands for the Nth active block of the
+    matching typed model (both by order), so typed blocks appear where editors
+    placed their Blocks. The last Block of a type also takes any typed blocks
+    left over; Blocks with no typed block left render nothing, and Blocks whose
+    BlockType names no typed model are kept as-is. Typed blocks are fetched with
+    one query per distinct model on the page, not per Block.
+    """
+    blocks = list(page.blocks.filter(is_active=True).select_related('block_type').order_by('order', 'pk'))
+
+    models = {}
+    for block in blocks:
+        if block.block_type_id not in models:
+            models[block.block_type_id] = get_typed_block_model(block.block_type)
+
+    typed_blocks = {
+        model: list(get_block_queryset(model).filter(page=page, is_active=True).order_by('order', 'pk'))
+        for model in set(models.values()) if model is not None
+    }
+    remaining = Counter(models[block.block_type_id] for block in blocks if models[block.block_type_id] is not None)
+    position = Counter()
+
+    resolved = []
+    for block in blocks:
+        model = models[block.block_type_id]
+        if model is None:
+            resolved.append(block)
+            continue
+        index = position[model]
+        position[model] += 1
+        remaining[model] -= 1
+        if remaining[model]:
+            resolved.extend(typed_blocks[model][index:index + 1])
+        else:
+            resolved.extend(typed_blocks[model][index:])
+    return blocks, resolved
+
+
+# =====================
+# Rendered fragment cache
+# =====================
+
+DEFAULT_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def get_block_template(block):
+    """Template used to render a block; generic Blocks share the rich text template"""
+    if isinstance(block, Block):
+        return 'blocks/generic_rich_text.html'
+    return block.template_name
+
+
+def _version_key(label, pk):
+    return f'page_content:block:{label}:{pk}:version'
+
+
+def _fragment_key(label, pk, version):
+    return f'page_content:block:{label}:{pk}:html:{version}'
+
+
+def bump_block_version(model, pk):
+    """Invalidate the cached HTML of one block.
+
+    Called when the block, its StyleOptions or one of its child items changes.
+    Dropping the version means the next render starts a new one, so only this
+    block's fragment is rebuilt.
+    """
+    cache.delete(_version_key(model._meta.label_lower, pk))
+
+
+def _get_versions(refs):
+    """Current version stamp of each (label, pk), creating missing ones"""
+    keys = {ref: _version_key(*ref) for ref in refs}
+    found = cache.get_many(keys.values())
+    versions, missing = {}, {}
+    for ref, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = missing[key] = uuid.uuid4().hex
+        versions[ref] = version
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def render_block(block, request=None, context=None):
+    """Render one block. Cacheable blocks only see the block itself.
+
+    Their templates may not use the request, context processor variables or
+    variant-dependent image tags; page_content.checks warns when they do.
+    """
+    template_name = get_block_template(block)
+    if getattr(block, 'cache_fragment', True):
+        return render_to_string(template_name, {'block': block})
+    return render_to_string(template_name, {**(context or {}), 'block': block}, request=request)
+
+
+def _lookup_fragments(refs):
+    """Fragment cache keys for cacheable (label, pk) refs, plus the HTML already cached"""
+    versions = _get_versions(refs)
+    keys = {ref: _fragment_key(*ref, versions[ref]) for ref in refs}
+    found = cache.get_many(keys.values())
+    return keys, {ref: mark_safe(found[key]) for ref, key in keys.items() if key in found}
+
+
+def _store_fragments(fragments):
+    if fragments:
+        cache.set_many(fragments, getattr(settings, 'BLOCK_FRAGMENT_TIMEOUT', DEFAULT_FRAGMENT_TIMEOUT))
+
+
+def render_page_blocks(page, request=None, context=None):
+    """Render the active blocks of a page to a list of HTML fragments, in layout order.
+
+    Only blocks whose fragment is not cached (and blocks that can't be cached)
+    are loaded from the database and rendered.
+    """
+    layout = get_page_layout(page)
+    cache_refs = {}
+    for content_type_id, object_id in layout:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if getattr(model, 'cache_fragment', True):
+            cache_refs[(content_type_id, object_id)] = (model._meta.label_lower, object_id)
+
+    keys, cached = _lookup_fragments(list(cache_refs.values()))
+    fragments = {ref: cached[cache_ref] for ref, cache_ref in cache_refs.items() if cache_ref in cached}
+
+    to_cache = {}
+    for ref, block in load_blocks([ref for ref in layout if ref not in fragments]).items():
+        fragments[ref] = render_block(block, request, context)
+        if ref in cache_refs:
+            to_cache[keys[cache_refs[ref]]] = str(fragments[ref])
+    _store_fragments(to_cache)
+
+    return [fragments[ref] for ref in layout if ref in fragments]
+
+
+def render_blocks(blocks, request=None, context=None):
+    """Render already-loaded blocks to HTML fragments, using the fragment cache"""
+    refs = [(block._meta.label_lower, block.pk) for block in blocks if getattr(block, 'cache_fragment', True)]
+    keys, cached = _lookup_fragments(refs)
+
+    fragments, to_cache = [], {}
+    for block in blocks:
+        ref = (block._meta.label_lower, block.pk)
+        if ref in cached:
+            fragments.append(cached[ref])
+            continue
+        html = render_block(block, request, context)
+        fragments.append(html)
+        if ref in keys:
+            to_cache[keys[ref]] = str(html)
+    _store_fragments(to_cache)
+    return fragments
+
+
+# =====================
+# Page stylesheet
+# =====================
+
+def _stylesheet_key(page_id):
+    return f'page_content:page:{page_id}:stylesheet'
+
+
+def invalidate_page_stylesheet(page_id):
+    """Forget the stylesheet of a page; it is rebuilt on its next render"""
+    cache.delete(_stylesheet_key(page_id))
+
+
+def get_page_stylesheet(page):
+    """URL of the stylesheet holding the block styles of a page, or ''.
+
+    The storage name is cached per page; on a miss the compiled declarations
+    are read with one query per block model on the page.
+    """
+    name = cache.get(_stylesheet_key(page.pk))
+    if name is None:
+        ids_by_type = defaultdict(list)
+        for content_type_id, object_id in get_page_layout(page):
+            ids_by_type[content_type_id].append(object_id)
+
+        declarations = []
+        for content_type_id, ids in ids_by_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if any(field.name == 'style_options' for field in model._meta.concrete_fields):
+                declarations.extend(
+                    model.objects.filter(pk__in=ids)
+                    .values_list('style_options__css_declarations', flat=True)
+                )
+        name = styles.compile_page_stylesheet(declarations)
+        cache.set(_stylesheet_key(page.pk), name, None)
+    return default_storage.url(name) if name else ''
+
+
+# =====================
+# Query budget
+# =====================
+
+DEFAULT_QUERY_BUDGET = 30
+
+
+class QueryBudget:
+    """Count the database queries run inside a block and warn when over a limit.
+
+    Usable as a context manager, or through query_budget() as a view decorator.
+    """
+
+    def __init__(self, limit=None, label=''):
+        self.limit = limit if limit is not None else getattr(settings, 'PAGE_QUERY_BUDGET', DEFAULT_QUERY_BUDGET)
+        self.label = label
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.count = 0
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+        if self.count > self.limit:
+            logger.warning('%s ran %d queries (budget %d)', self.label or 'view', self.count, self.limit)
+        return False
+
+
+def query_budget(limit=None):
+    """Decorator applying a QueryBudget to a view; use method_decorator for class-based views"""
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with QueryBudget(limit, label=request.path):
+                return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+"""
+System checks for the block fragment cache.
+
+Cacheable blocks (cache_fragment = True) are rendered with nothing but
+{'block': block} and their HTML is reused for BLOCK_FRAGMENT_TIMEOUT, until
+the block, a child item or its StyleOptions is saved. Their templates must
+therefore not read anything tied to the request (request, user, CSRF token,
+messages, context processor variables) nor markup that changes without a
+save, such as responsive_image output, which falls back to the original until
+the image's variants are generated. Blocks that need either set
+cache_fragment = False.
+"""
+import re
+
+from django.core.checks import Tags, Warning, register
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+
+# Variables only present when rendering with a request and context processors
+REQUEST_NAMES = ('request', 'user', 'perms', 'messages', 'csrf_token', 'debug', 'sql_queries', 'theme', 'footer', 'site_menu')
+
+# Tags whose output depends on whether image variants exist yet
+VARIANT_TAGS = ('responsive_image', 'background_image_url')
+
+# A root variable or tag name inside {{ ... }} or {% ... %}; 'block.user' is fine
+TEMPLATE_NAME_RE = re.compile(
+    r'\{[{%%][^}]*?(?<![\w.])(%s)\b' % '|'.join(REQUEST_NAMES + VARIANT_TAGS)
+)
+
+
+def get_uncacheable_names(template_name):
+    """Request-bound variables and variant-dependent tags a template uses"""
+    source = get_template(template_name).template.source
+    return sorted(set(TEMPLATE_NAME_RE.findall(source)))
+
+
+@register(Tags.templates)
+def check_cacheable_block_templates(app_configs, **kwargs):
+    from .blocks import get_block_models, get_block_template
+
+    errors = []
+    for model in get_block_models():
+        if not getattr(model, 'cache_fragment', True):
+            continue
+        template_name = get_block_template(model())
+        try:
+            names = get_uncacheable_names(template_name)
+        except TemplateDoesNotExist:
+            continue
+        if names:
+            errors.append(Warning(
+                f'{template_name} uses {", ".join(names)}, which a cached block fragment would freeze.',
+                hint=f'Set cache_fragment = False on {model.__name__} or render without them.',
+                obj=model,
+                id='page_content.W001',
+            ))
+    return errors
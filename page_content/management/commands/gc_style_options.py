@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from page_content import styles
+from page_content.models import StyleOptions
+
+
+def unreferenced_style_options():
+    """StyleOptions that no block, team or other model points to.
+
+    The default row is always kept: StyleOptions.get_default() may have just
+    returned it to a block or team that isn't saved yet.
+    """
+    queryset = StyleOptions.objects.exclude(content_hash=styles.get_content_hash(StyleOptions()))
+    for rel in StyleOptions._meta.related_objects:
+        if rel.one_to_many or rel.one_to_one:
+            queryset = queryset.filter(
+                ~Exists(rel.related_model._base_manager.filter(**{rel.field.name: OuterRef('pk')}))
+            )
+    return queryset
+
+
+class Command(BaseCommand):
+    help = 'Delete StyleOptions rows that nothing references any more (left behind by deleted blocks and teams)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows deleted per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = unreferenced_style_options().count()
+            self.stdout.write(f'{count} unreferenced StyleOptions would be deleted')
+            return
+
+        deleted = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                unreferenced_style_options().filter(pk__gt=last_pk)
+                .order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            # Re-check on delete: a row may have been picked up since it was selected
+            count, _ = unreferenced_style_options().filter(pk__in=pks).delete()
+            deleted += count
+            self.stdout.write(f'Deleted {deleted} so far')
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced StyleOptions'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('page_content', '0004_styledcontentblock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageLayoutEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='layout_entries', to='page_content.page')),
+            ],
+            options={
+                'verbose_name': 'Page Layout Entry',
+                'verbose_name_plural': 'Page Layout Entries',
+                'ordering': ['order', 'object_id'],
+                'indexes': [models.Index(fields=['page', 'is_active', 'order'], name='layout_page_active_order_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pagelayoutentry',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_layout_entry_per_block'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+BLOCK_MODELS = [
+    'Block',
+    'HeroBannerBlock', 'TextImageBlock', 'FeatureHighlightsBlock', 'TestimonialBlock',
+    'CallToActionBlock', 'GalleryBlock', 'VideoEmbedBlock', 'FAQBlock', 'CounterStatsBlock',
+    'ContactFormBlock', 'TeamMemberBlock', 'BlogPreviewBlock', 'TwoColumnTextBlock',
+    'TimelineBlock', 'FooterInfoBlock', 'StyledContentBlock',
+]
+
+
+def populate_layout(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    PageLayoutEntry = apps.get_model('page_content', 'PageLayoutEntry')
+
+    entries = []
+    for model_name in BLOCK_MODELS:
+        model = apps.get_model('page_content', model_name)
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label='page_content', model=model_name.lower()
+        )
+        for pk, page_id, order, is_active in model.objects.values_list('pk', 'page_id', 'order', 'is_active'):
+            entries.append(PageLayoutEntry(
+                page_id=page_id,
+                content_type=content_type,
+                object_id=pk,
+                order=order,
+                is_active=is_active,
+            ))
+    PageLayoutEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0005_pagelayoutentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_layout, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+from page_content.styles import compile_style
+
+
+def compile_existing_styles(apps, schema_editor):
+    StyleOptions = apps.get_model('page_content', 'StyleOptions')
+    for options in StyleOptions.objects.iterator():
+        declarations, classes = compile_style(options)
+        StyleOptions.objects.filter(pk=options.pk).update(css_declarations=declarations, css_classes=classes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0006_populate_pagelayoutentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='styleoptions',
+            name='css_classes',
+            field=models.CharField(blank=True, editable=False, max_length=400),
+        ),
+        migrations.AddField(
+            model_name='styleoptions',
+            name='css_declarations',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(compile_existing_styles, migrations.RunPython.noop),
+    ]
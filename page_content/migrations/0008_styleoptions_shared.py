@@ -0,0 +1,99 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0007_styleoptions_compiled_css'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='styleoptions',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blogpreviewblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='calltoactionblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='contactformblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='counterstatsblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='faqblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='featurehighlightsblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='footerinfoblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='galleryblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='herobannerblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='styledcontentblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='teammemberblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='testimonialblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='textimageblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='timelineblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='twocolumntextblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+        migrations.AlterField(
+            model_name='videoembedblock',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this block', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import hashlib
+import json
+from collections import defaultdict
+
+from django.db import migrations
+
+# Frozen copies of page_content.styles.OPTION_FIELDS and get_content_hash as of
+# this migration, so later changes to the live hash can't change what it computes
+OPTION_FIELDS = (
+    'background_type', 'background_color', 'background_gradient', 'background_image', 'background_image_opacity',
+    'text_color', 'text_align',
+    'padding_top', 'padding_bottom', 'padding_left', 'padding_right',
+    'margin_top', 'margin_bottom',
+    'container_width', 'border_radius', 'shadow',
+    'animate_on_scroll', 'hover_effect', 'custom_class',
+)
+
+
+def get_content_hash(options):
+    """sha256 of the option values of a StyleOptions (images by file name)"""
+    values = []
+    for name in OPTION_FIELDS:
+        value = getattr(options, name)
+        if name == 'background_image':
+            value = value.name if value else ''
+        values.append(value)
+    return hashlib.sha256(json.dumps(values).encode('utf-8')).hexdigest()
+
+
+def intern_style_options(apps, schema_editor):
+    """Merge StyleOptions rows with identical values and store their content hash"""
+    StyleOptions = apps.get_model('page_content', 'StyleOptions')
+
+    rows_by_hash = defaultdict(list)
+    for options in StyleOptions.objects.order_by('pk').iterator():
+        rows_by_hash[get_content_hash(options)].append(options.pk)
+
+    relations = [rel for rel in StyleOptions._meta.related_objects if rel.one_to_many]
+    for content_hash, pks in rows_by_hash.items():
+        keep, duplicates = pks[0], pks[1:]
+        if duplicates:
+            for rel in relations:
+                rel.related_model.objects.filter(
+                    **{f'{rel.field.name}__in': duplicates}
+                ).update(**{rel.field.name: keep})
+            StyleOptions.objects.filter(pk__in=duplicates).delete()
+        StyleOptions.objects.filter(pk=keep).update(content_hash=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0008_styleoptions_shared'),
+        # Team.style_options must no longer be one-to-one before rows are merged
+        ('teams', '0006_team_shared_style_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(intern_style_options, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:01
+
+import page_content.styles
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0009_intern_styleoptions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='styleoptions',
+            name='background_color',
+            field=models.CharField(default='#FFFFFF', help_text='Background color (hex code)', max_length=7, validators=[page_content.styles.validate_color]),
+        ),
+        migrations.AlterField(
+            model_name='styleoptions',
+            name='background_gradient',
+            field=models.TextField(blank=True, help_text='CSS gradient value (e.g., linear-gradient(45deg, #ff0000, #0000ff))', validators=[page_content.styles.validate_gradient]),
+        ),
+        migrations.AlterField(
+            model_name='styleoptions',
+            name='text_color',
+            field=models.CharField(default='#212529', help_text='Text color (hex code)', max_length=7, validators=[page_content.styles.validate_color]),
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from . import styles
 
 
 class BlockType(models.Model):
@@ -24,15 +26,16 @@ class BlockType(models.Model):
 
 class StyleOptionsMixin(models.Model):
     """Mixin to add style_options to block models"""
-    style_options = models.OneToOneField('StyleOptions', on_delete=models.SET_NULL, null=True, blank=True, help_text='Custom styling options for this block')
+    # Shared between blocks with identical styling, see StyleOptions.intern()
+    style_options = models.ForeignKey('StyleOptions', on_delete=models.SET_NULL, null=True, blank=True, help_text='Custom styling options for this block')
 
     class Meta:
         abstract = True
 
     def save(self, *args, **kwargs):
-        # Auto-create StyleOptions if not exists
+        # Fall back to the shared default StyleOptions
         if not self.style_options:
-            self.style_options = StyleOptions.objects.create()
+            self.style_options = StyleOptions.get_default()
         super().save(*args, **kwargs)
 
 
@@ -51,13 +54,21 @@ class StyleOptions(models.Model):
         default='color',
         help_text='Type of background to use'
     )
-    background_color = models.CharField(max_length=7, default='#FFFFFF', help_text='Background color (hex code)')
-    background_gradient = models.TextField(blank=True, help_text='CSS gradient value (e.g., linear-gradient(45deg, #ff0000, #0000ff))')
+    background_color = models.CharField(
+        max_length=7, default='#FFFFFF', validators=[styles.validate_color], help_text='Background color (hex code)'
+    )
+    background_gradient = models.TextField(
+        blank=True,
+        validators=[styles.validate_gradient],
+        help_text='CSS gradient value (e.g., linear-gradient(45deg, #ff0000, #0000ff))',
+    )
     background_image = models.ImageField(upload_to='backgrounds/', blank=True, null=True, help_text='Background image')
     background_image_opacity = models.FloatField(default=1.0, help_text='Background image opacity (0.0-1.0)')
 
     # Text Options
-    text_color = models.CharField(max_length=7, default='#212529', help_text='Text color (hex code)')
+    text_color = models.CharField(
+        max_length=7, default='#212529', validators=[styles.validate_color], help_text='Text color (hex code)'
+    )
     text_align = models.CharField(
         max_length=10,
         choices=[
@@ -120,6 +131,12 @@ class StyleOptions(models.Model):
     # Custom Options
     custom_class = models.CharField(max_length=200, blank=True, help_text='Additional CSS classes')
 
+    # Compiled from the options above on save (see page_content.styles)
+    css_declarations = models.TextField(blank=True, editable=False)
+    css_classes = models.CharField(max_length=400, blank=True, editable=False)
+    # Rows are shared by everything styled the same way; edits go through intern()
+    content_hash = models.CharField(max_length=64, unique=True, null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -130,121 +147,77 @@ class StyleOptions(models.Model):
     def __str__(self):
         return f"Style Options ({self.pk})"
 
+    def save(self, *args, **kwargs):
+        self.content_hash = styles.get_content_hash(self)
+        super().save(*args, **kwargs)
+        # Compiled after saving so an uploaded background image has its final URL
+        self.compile_styles()
+
+    @classmethod
+    def intern(cls, options):
+        """Return the stored StyleOptions with the same values as options.
+
+        options is an unsaved instance; it is saved only if no row has the same
+        content hash yet. Rows are shared, so callers wanting different styles
+        intern a modified copy instead of editing a row in place.
+        """
+        image = options.background_image
+        if image and not image._committed:
+            # Store the upload first so the hash covers its final file name
+            image.save(image.name, image.file, save=False)
+        content_hash = styles.get_content_hash(options)
+        existing = cls.objects.filter(content_hash=content_hash).first()
+        if existing is not None:
+            return existing
+        try:
+            with transaction.atomic():
+                options.save()
+        except IntegrityError:
+            # Created concurrently by another request
+            existing = cls.objects.filter(content_hash=content_hash).first()
+            if existing is None:
+                raise
+            return existing
+        return options
+
+    @classmethod
+    def get_default(cls):
+        """The shared StyleOptions holding the default values"""
+        return cls.intern(cls())
+
+    def copy(self, **changes):
+        """Unsaved copy of these options with the given values changed"""
+        values = {name: getattr(self, name) for name in styles.OPTION_FIELDS}
+        values['background_image'] = self.background_image.name if self.background_image else None
+        values.update(changes)
+        return StyleOptions(**values)
+
+    def compile_styles(self):
+        """Store the compiled CSS declarations and class list of these options"""
+        declarations, classes = styles.compile_style(self)
+        if (declarations, classes) != (self.css_declarations, self.css_classes):
+            self.css_declarations, self.css_classes = declarations, classes
+            StyleOptions.objects.filter(pk=self.pk).update(css_declarations=declarations, css_classes=classes)
+
     def get_padding_values(self):
         """Convert padding choices to pixel values"""
-        padding_map = {
-            'none': '0',
-            'small': '20px',
-            'medium': '40px',
-            'large': '80px',
-            'xl': '120px'
-        }
-        return {
-            'top': padding_map.get(self.padding_top, '40px'),
-            'bottom': padding_map.get(self.padding_bottom, '40px'),
-            'left': padding_map.get(self.padding_left, '0'),
-            'right': padding_map.get(self.padding_right, '0')
-        }
+        return styles.get_padding_values(self)
 
     def get_margin_values(self):
         """Convert margin choices to pixel values"""
-        margin_map = {
-            'none': '0',
-            'small': '20px',
-            'medium': '40px',
-            'large': '80px',
-            'xl': '120px'
-        }
-        return {
-            'top': margin_map.get(self.margin_top, '0'),
-            'bottom': margin_map.get(self.margin_bottom, '0')
-        }
+        return styles.get_margin_values(self)
 
     def get_container_class(self):
         """Get Bootstrap container class based on width choice"""
-        if self.container_width == 'full':
-            return 'container-fluid'
-        elif self.container_width == 'narrow':
-            return 'container-narrow'
-        else:  # boxed
-            return 'container'
+        return styles.get_container_class(self)
 
     def get_inline_styles(self):
-        """Generate inline styles for the block"""
-        styles = []
-
-        # Background
-        if self.background_type == 'color' and self.background_color:
-            styles.append(f"background-color: {self.background_color}")
-        elif self.background_type == 'gradient' and self.background_gradient:
-            styles.append(f"background: {self.background_gradient}")
-        elif self.background_type == 'image' and self.background_image:
-            styles.append(f"background-image: url('{self.background_image.url}')")
-            styles.append("background-size: cover")
-            styles.append("background-position: center")
-            styles.append("background-repeat: no-repeat")
-            if self.background_color:
-                styles.append(f"background-color: {self.background_color}")
-            # Apply background image opacity
-            if self.background_image_opacity < 1.0:
-                styles.append(f"opacity: {self.background_image_opacity}")
-
-        # Text color
-        if self.text_color:
-            styles.append(f"color: {self.text_color}")
-
-        # Text align
-        if self.text_align:
-            styles.append(f"text-align: {self.text_align}")
-
-        # Padding
-        padding = self.get_padding_values()
-        if padding['top'] != '40px':  # Only add if not default
-            styles.append(f"padding-top: {padding['top']}")
-        if padding['bottom'] != '40px':  # Only add if not default
-            styles.append(f"padding-bottom: {padding['bottom']}")
-        if padding['left'] != '0':  # Only add if not default
-            styles.append(f"padding-left: {padding['left']}")
-        if padding['right'] != '0':  # Only add if not default
-            styles.append(f"padding-right: {padding['right']}")
-
-        # Margin
-        margin = self.get_margin_values()
-        if margin['top'] != '0':  # Only add if not default
-            styles.append(f"margin-top: {margin['top']}")
-        if margin['bottom'] != '0':  # Only add if not default
-            styles.append(f"margin-bottom: {margin['bottom']}")
-
-        # Border radius
-        if self.border_radius > 0:
-            styles.append(f"border-radius: {self.border_radius}px")
-
-        return '; '.join(styles)
+        """Generate inline styles for the block (templates use css_declarations)"""
+        return styles.get_declarations(self)
 
     def get_css_classes(self):
-        """Generate CSS classes for the block"""
-        classes = []
-
-        # Container width
-        classes.append(self.get_container_class())
-
-        # Shadow
-        if self.shadow:
-            classes.append('shadow-lg')
-
-        # Hover effects
-        if self.hover_effect == 'lift':
-            classes.append('hover-lift')
-        elif self.hover_effect == 'zoom':
-            classes.append('hover-zoom')
-        elif self.hover_effect == 'glow':
-            classes.append('hover-glow')
-
-        # Custom classes
-        if self.custom_class:
-            classes.extend(self.custom_class.split())
-
-        return ' '.join(classes)
+        """Generate CSS classes for the block (templates use css_classes)"""
+        return styles.get_class_names(self)
 
 
 class Page(models.Model):
@@ -285,6 +258,72 @@ class Page(models.Model):
             Block.objects.get_or_create(page=self, block_type=bt, defaults={'content': ''})
 
 
+def sync_layout(page):
+    """Rebuild the layout entries of a page from its blocks.
+
+    save() keeps single blocks in sync; this covers writes that bypass it (see
+    BlockQuerySet). Entries of blocks moved here from another page are moved too.
+    """
+    from .blocks import get_block_models
+
+    page_id = getattr(page, 'pk', page)
+    wanted = {}
+    claimed = Q(page_id=page_id)
+    for model in get_block_models():
+        content_type_id = ContentType.objects.get_for_model(model, for_concrete_model=False).pk
+        rows = list(model._base_manager.filter(page_id=page_id).values_list('pk', 'order', 'is_active'))
+        for pk, order, is_active in rows:
+            wanted[(content_type_id, pk)] = (order, is_active)
+        if rows:
+            claimed |= Q(content_type_id=content_type_id, object_id__in=[row[0] for row in rows])
+
+    changed = []
+    for entry in PageLayoutEntry.objects.filter(claimed):
+        key = (entry.content_type_id, entry.object_id)
+        if key not in wanted:
+            entry.delete()
+            continue
+        values = (page_id, *wanted.pop(key))
+        if values != (entry.page_id, entry.order, entry.is_active):
+            entry.page_id, entry.order, entry.is_active = values
+            changed.append(entry)
+    PageLayoutEntry.objects.bulk_update(changed, ['page', 'order', 'is_active'])
+    PageLayoutEntry.objects.bulk_create([
+        PageLayoutEntry(page_id=page_id, content_type_id=content_type_id, object_id=pk, order=order, is_active=is_active)
+        for (content_type_id, pk), (order, is_active) in wanted.items()
+    ])
+
+
+class BlockQuerySet(models.QuerySet):
+    """Queryset of blocks whose bulk writes keep the page layout index in sync.
+
+    bulk_update() goes through update(); deletes are covered by post_delete.
+    """
+    LAYOUT_FIELDS = {'page', 'page_id', 'order', 'is_active'}
+
+    def update(self, **kwargs):
+        if not self.LAYOUT_FIELDS & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks, page_ids = set(), set()
+            for pk, page_id in self.values_list('pk', 'page_id'):
+                pks.add(pk)
+                page_ids.add(page_id)
+            rows = super().update(**kwargs)
+            # Pages the blocks were moved to
+            page_ids.update(self.model._base_manager.filter(pk__in=pks).values_list('page_id', flat=True))
+            for page_id in page_ids:
+                sync_layout(page_id)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            for page_id in {obj.page_id for obj in objs}:
+                sync_layout(page_id)
+        return objs
+
+
 class Block(models.Model):
     """An instance of a block attached to a page. Content is free-form text/HTML.
     Blocks reference a BlockType so admin/UI can present the correct editor.
@@ -296,6 +335,8 @@ class Block(models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
+    objects = BlockQuerySet.as_manager()
+
     class Meta:
         ordering = ['order']
         verbose_name = 'Block'
@@ -304,6 +345,10 @@ class Block(models.Model):
     def __str__(self):
         return f"{self.page.title} - {self.block_type.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        PageLayoutEntry.sync(self)
+
 
 class MenuItem(models.Model):
     """Represents an item in the site navigation. Can link to a Page or an external URL.
@@ -335,6 +380,51 @@ class MenuItem(models.Model):
         return self.url or '#'
 
 
+class PageLayoutEntry(models.Model):
+    """Ordered index of every block placed on a page, across all block models.
+
+    One row per generic Block or typed block, kept in sync by the blocks' save(),
+    by their queryset's bulk writes (see sync_layout) and by a post_delete signal. Rendering a page reads its layout in a single
+    query and then batch-loads each block model present (see page_content.blocks).
+    """
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name='layout_entries')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    block = GenericForeignKey('content_type', 'object_id')
+    order = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['order', 'object_id']
+        verbose_name = 'Page Layout Entry'
+        verbose_name_plural = 'Page Layout Entries'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='unique_layout_entry_per_block'),
+        ]
+        indexes = [
+            models.Index(fields=['page', 'is_active', 'order'], name='layout_page_active_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.page_id} #{self.order} - {self.content_type.model} {self.object_id}"
+
+    @classmethod
+    def sync(cls, block):
+        """Create or update the layout entry mirroring a saved block"""
+        cls.objects.update_or_create(
+            content_type=ContentType.objects.get_for_model(block, for_concrete_model=False),
+            object_id=block.pk,
+            defaults={'page_id': block.page_id, 'order': block.order, 'is_active': block.is_active},
+        )
+
+    @classmethod
+    def remove(cls, block):
+        cls.objects.filter(
+            content_type=ContentType.objects.get_for_model(block, for_concrete_model=False),
+            object_id=block.pk,
+        ).delete()
+
+
 # =====================
 # Stream-like Page Blocks
 # =====================
@@ -345,6 +435,11 @@ class BaseBlock(StyleOptionsMixin, models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
+    objects = BlockQuerySet.as_manager()
+
+    # Whether the rendered HTML depends only on the block itself and can be cached
+    cache_fragment = True
+
     class Meta:
         abstract = True
         ordering = ['order', 'id']
@@ -354,6 +449,7 @@ class BaseBlock(StyleOptionsMixin, models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        PageLayoutEntry.sync(self)
 
     @property
     def template_name(self):
@@ -483,6 +579,9 @@ class ContactFormBlock(BaseBlock):
     heading = models.CharField(max_length=200, blank=True)
     description = models.TextField(blank=True)
 
+    # Renders a form with a per-request CSRF token
+    cache_fragment = False
+
 
 class TeamMemberBlock(BaseBlock):
     heading = models.CharField(max_length=200, blank=True)
@@ -509,6 +608,9 @@ class BlogPreviewBlock(BaseBlock):
     heading = models.CharField(max_length=200, blank=True)
     count = models.PositiveIntegerField(default=3)
 
+    # Renders the latest news passed in by the view
+    cache_fragment = False
+
 
 class TwoColumnTextBlock(BaseBlock):
     left_text = CKEditor5Field('Left Text', config_name='default', blank=True)
@@ -0,0 +1,61 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+
+from .blocks import get_block_models, bump_block_version, invalidate_page_stylesheet
+from .models import PageLayoutEntry, StyleOptions
+
+
+def remove_layout_entry(sender, instance, **kwargs):
+    """Drop the layout entry of a deleted block (also covers cascades and bulk deletes)"""
+    PageLayoutEntry.remove(instance)
+
+
+def invalidate_block(sender, instance, **kwargs):
+    """A block changed: drop its cached HTML and its page's stylesheet once the change is committed"""
+    transaction.on_commit(partial(bump_block_version, sender, instance.pk))
+    transaction.on_commit(partial(invalidate_page_stylesheet, instance.page_id))
+
+
+def invalidate_parent_block(sender, instance, block_field=None, **kwargs):
+    """A child item (slide, FAQ, counter, ...) changed: drop its block's cached HTML"""
+    block_pk = getattr(instance, block_field.attname)
+    if block_pk is not None:
+        transaction.on_commit(partial(bump_block_version, block_field.related_model, block_pk))
+
+
+def invalidate_styled_blocks(sender, instance, **kwargs):
+    """StyleOptions changed: drop the cached HTML and page stylesheets of the blocks using them.
+
+    Connected to pre_delete as well, since SET_NULL detaches the blocks before post_delete.
+    """
+    if kwargs.get('created'):
+        # Newly interned rows aren't used by any block yet
+        return
+    for model in get_block_models():
+        if not any(field.name == 'style_options' for field in model._meta.concrete_fields):
+            continue
+        for pk, page_id in model.objects.filter(style_options=instance).values_list('pk', 'page_id'):
+            transaction.on_commit(partial(bump_block_version, model, pk))
+            transaction.on_commit(partial(invalidate_page_stylesheet, page_id))
+
+
+for _model in get_block_models():
+    _label = _model._meta.label_lower
+    post_delete.connect(remove_layout_entry, sender=_model, dispatch_uid=f'layout_delete_{_label}')
+    post_save.connect(invalidate_block, sender=_model, dispatch_uid=f'fragment_save_{_label}')
+    post_delete.connect(invalidate_block, sender=_model, dispatch_uid=f'fragment_delete_{_label}')
+
+    # Child items hang off their block through a ForeignKey
+    for _rel in _model._meta.related_objects:
+        if not _rel.one_to_many or _rel.related_model is PageLayoutEntry:
+            continue
+        _child = _rel.related_model
+        _receiver = partial(invalidate_parent_block, block_field=_rel.field)
+        _child_label = _child._meta.label_lower
+        post_save.connect(_receiver, sender=_child, weak=False, dispatch_uid=f'fragment_child_save_{_child_label}')
+        post_delete.connect(_receiver, sender=_child, weak=False, dispatch_uid=f'fragment_child_delete_{_child_label}')
+
+post_save.connect(invalidate_styled_blocks, sender=StyleOptions, dispatch_uid='fragment_styleoptions_save')
+pre_delete.connect(invalidate_styled_blocks, sender=StyleOptions, dispatch_uid='fragment_styleoptions_delete')
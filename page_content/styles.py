@@ -0,0 +1,207 @@
+"""
+Precompiled block styles.
+
+StyleOptions are compiled once, when they are saved, into CSS declarations and
+a class list stored on the row (see StyleOptions.compile_styles). Blocks no
+longer carry inline style= attributes: each distinct set of declarations gets
+a class named after its hash, and the rules used by a page are written to a
+single content-hashed stylesheet (page_css/page-<hash>.css). Pages and blocks
+sharing the same styles therefore share the same rules and the same cached
+file.
+
+Rows themselves are interned by a hash of their option values
+(StyleOptions.intern), so blocks and teams with identical styling share one
+row; the gc_style_options command removes rows nothing references any more.
+"""
+import hashlib
+import json
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+PAGE_CSS_DIR = 'page_css'
+
+# The editable options of a StyleOptions, i.e. what its content hash covers
+OPTION_FIELDS = (
+    'background_type', 'background_color', 'background_gradient', 'background_image', 'background_image_opacity',
+    'text_color', 'text_align',
+    'padding_top', 'padding_bottom', 'padding_left', 'padding_right',
+    'margin_top', 'margin_bottom',
+    'container_width', 'border_radius', 'shadow',
+    'animate_on_scroll', 'hover_effect', 'custom_class',
+)
+
+# Free-text options end up in a stylesheet shared by every page using it, so
+# they are limited to what they are meant to hold
+COLOR_RE = re.compile(r'^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+GRADIENT_RE = re.compile(r'^(?!.*url\()(?:repeating-)?(?:linear|radial|conic)-gradient\([\w\s#%.,()+-]*\)$', re.I)
+# Anything that could end a declaration or rule, or the <style> element
+UNSAFE_CSS_CHARS = re.compile(r'[{};<>\\]')
+
+SPACING_VALUES = {
+    'none': '0',
+    'small': '20px',
+    'medium': '40px',
+    'large': '80px',
+    'xl': '120px',
+}
+
+CONTAINER_CLASSES = {
+    'full': 'container-fluid',
+    'narrow': 'container-narrow',
+    'boxed': 'container',
+}
+
+HOVER_CLASSES = {
+    'lift': 'hover-lift',
+    'zoom': 'hover-zoom',
+    'glow': 'hover-glow',
+}
+
+
+def get_padding_values(options):
+    return {
+        'top': SPACING_VALUES.get(options.padding_top, '40px'),
+        'bottom': SPACING_VALUES.get(options.padding_bottom, '40px'),
+        'left': SPACING_VALUES.get(options.padding_left, '0'),
+        'right': SPACING_VALUES.get(options.padding_right, '0'),
+    }
+
+
+def get_margin_values(options):
+    return {
+        'top': SPACING_VALUES.get(options.margin_top, '0'),
+        'bottom': SPACING_VALUES.get(options.margin_bottom, '0'),
+    }
+
+
+def validate_color(value):
+    if value and not COLOR_RE.match(value):
+        raise ValidationError('Enter a hex colour such as #1A2B3C.', code='invalid_color')
+
+
+def validate_gradient(value):
+    if value and not GRADIENT_RE.match(value.strip()):
+        raise ValidationError(
+            'Enter a CSS gradient such as linear-gradient(45deg, #ff0000, #0000ff).',
+            code='invalid_gradient',
+        )
+
+
+def is_safe_declaration(declaration):
+    return not UNSAFE_CSS_CHARS.search(declaration)
+
+
+def get_container_class(options):
+    return CONTAINER_CLASSES.get(options.container_width, 'container')
+
+
+def get_declarations(options):
+    """CSS declarations for a StyleOptions, as formerly emitted in style=''"""
+    styles = []
+
+    # Background
+    if options.background_type == 'color' and options.background_color:
+        styles.append(f"background-color: {options.background_color}")
+    elif options.background_type == 'gradient' and options.background_gradient:
+        styles.append(f"background: {options.background_gradient.strip()}")
+    elif options.background_type == 'image' and options.background_image:
+        styles.append(f"background-image: url('{options.background_image.url}')")
+        styles.append("background-size: cover")
+        styles.append("background-position: center")
+        styles.append("background-repeat: no-repeat")
+        if options.background_color:
+            styles.append(f"background-color: {options.background_color}")
+        # Apply background image opacity
+        if options.background_image_opacity < 1.0:
+            styles.append(f"opacity: {options.background_image_opacity}")
+
+    if options.text_color:
+        styles.append(f"color: {options.text_color}")
+    if options.text_align:
+        styles.append(f"text-align: {options.text_align}")
+
+    # Padding and margin, only where they differ from the defaults
+    padding = get_padding_values(options)
+    for side, default in (('top', '40px'), ('bottom', '40px'), ('left', '0'), ('right', '0')):
+        if padding[side] != default:
+            styles.append(f"padding-{side}: {padding[side]}")
+    margin = get_margin_values(options)
+    for side in ('top', 'bottom'):
+        if margin[side] != '0':
+            styles.append(f"margin-{side}: {margin[side]}")
+
+    if options.border_radius > 0:
+        styles.append(f"border-radius: {options.border_radius}px")
+
+    # Rows saved around form validation (shell, fixtures, older data) must not
+    # be able to break out of their rule
+    return '; '.join(item for item in styles if is_safe_declaration(item))
+
+
+def get_class_names(options):
+    """Layout/effect classes of a StyleOptions (without its style class)"""
+    classes = [get_container_class(options)]
+    if options.shadow:
+        classes.append('shadow-lg')
+    if options.hover_effect in HOVER_CLASSES:
+        classes.append(HOVER_CLASSES[options.hover_effect])
+    if options.custom_class:
+        classes.extend(options.custom_class.split())
+    return ' '.join(classes)
+
+
+def get_content_hash(options):
+    """sha256 of the option values of a StyleOptions (images by file name)"""
+    values = []
+    for name in OPTION_FIELDS:
+        value = getattr(options, name)
+        if name == 'background_image':
+            value = value.name if value else ''
+        values.append(value)
+    return hashlib.sha256(json.dumps(values).encode('utf-8')).hexdigest()
+
+
+def get_style_class(declarations):
+    """Class name standing for a set of declarations, e.g. 'so-3f2a9c1b0d'"""
+    return 'so-' + hashlib.md5(declarations.encode('utf-8')).hexdigest()[:10]
+
+
+def compile_style(options):
+    """Return (declarations, classes) to store on a StyleOptions"""
+    declarations = get_declarations(options)
+    classes = get_class_names(options)
+    if declarations:
+        classes = f'{classes} {get_style_class(declarations)}'
+    return declarations, classes
+
+
+def get_style_rule(declarations):
+    # The doubled class outranks single-class theme rules the way the former
+    # inline styles did, while Bootstrap's !important utilities still win.
+    css_class = get_style_class(declarations)
+    return f'.{css_class}.{css_class} {{ {declarations}; }}'
+
+
+def compile_page_stylesheet(declarations):
+    """Write the rules for the given declarations to storage and return the file name.
+
+    Returns '' when there is nothing to style. Files are named after a hash of
+    their content, so identical rule sets map to the file that already exists.
+    """
+    # Declarations are stored compiled; skip any compiled before values were
+    # checked that would escape their rule
+    rules = sorted({
+        get_style_rule(item) for item in declarations
+        if item and is_safe_declaration(item.replace(';', ''))
+    })
+    if not rules:
+        return ''
+    css = '\n'.join(rules) + '\n'
+    digest = hashlib.md5(css.encode('utf-8')).hexdigest()[:12]
+    name = f'{PAGE_CSS_DIR}/page-{digest}.css'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(css.encode('utf-8')))
+    return name
@@ -1,3 +1,337 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import flatten_fieldsets
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import blocks as blocks_module, styles
+from .blocks import (
+    QueryBudget, get_block_models, get_page_blocks, get_page_layout, render_blocks, render_page_blocks,
+    resolve_page_blocks,
+)
+from .management.commands.gc_style_options import unreferenced_style_options
+from .checks import check_cacheable_block_templates, get_uncacheable_names
+from .models import (
+    BaseBlock, Block, BlockType, CallToActionBlock, ContactFormBlock, FAQBlock, FAQItem, Page, PageLayoutEntry,
+    StyleOptions, TextImageBlock, sync_layout,
+)
+
+
+class ResolvePageBlocksTests(TestCase):
+    def setUp(self):
+        self.page = Page.objects.create(title='Blocks', slug='blocks')
+        self.faq_type = BlockType.objects.create(name='FAQ', slug='faq-block')
+        self.text_type = BlockType.objects.create(name='Text', slug='text')
+        self.page.blocks.all().delete()
+
+    def resolve(self):
+        return resolve_page_blocks(self.page)[1]
+
+    def test_nth_block_stands_for_nth_typed_block(self):
+        faq1 = FAQBlock.objects.create(page=self.page, heading='one', order=1)
+        faq2 = FAQBlock.objects.create(page=self.page, heading='two', order=2)
+        Block.objects.create(page=self.page, block_type=self.faq_type, order=1)
+        text = Block.objects.create(page=self.page, block_type=self.text_type, order=2)
+        Block.objects.create(page=self.page, block_type=self.faq_type, order=3)
+
+        self.assertEqual(self.resolve(), [faq1, text, faq2])
+
+    def test_last_block_of_a_type_takes_the_remaining_typed_blocks(self):
+        faqs = [FAQBlock.objects.create(page=self.page, heading=str(i), order=i) for i in range(3)]
+        text = Block.objects.create(page=self.page, block_type=self.text_type, order=1)
+        Block.objects.create(page=self.page, block_type=self.faq_type, order=2)
+
+        self.assertEqual(self.resolve(), [text, *faqs])
+
+    def test_blocks_without_typed_blocks_left_render_nothing(self):
+        faq = FAQBlock.objects.create(page=self.page, heading='only', order=1)
+        Block.objects.create(page=self.page, block_type=self.faq_type, order=1)
+        Block.objects.create(page=self.page, block_type=self.faq_type, order=2)
+
+        self.assertEqual(self.resolve(), [faq])
+
+
+class StyleDeclarationTests(SimpleTestCase):
+    def test_colors_and_gradients_are_validated(self):
+        styles.validate_color('#1a2B3c')
+        styles.validate_gradient('linear-gradient(135deg, var(--primary-color) 0%, #fff 100%)')
+        for value in ('red;}body{display:none', '#12345g'):
+            with self.assertRaises(ValidationError):
+                styles.validate_color(value)
+        for value in (
+            'linear-gradient(#000, #fff); } body { display: none',
+            'linear-gradient(#000, #fff)</style><script>',
+            'url(//example.com/x.png)',
+            'linear-gradient(url(x), #fff)',
+        ):
+            with self.assertRaises(ValidationError):
+                styles.validate_gradient(value)
+
+    def test_model_rejects_unsafe_values(self):
+        options = StyleOptions(background_color='#fff;}', background_gradient='x{')
+        with self.assertRaises(ValidationError) as cm:
+            options.clean_fields()
+        self.assertEqual(set(cm.exception.message_dict), {'background_color', 'background_gradient'})
+
+    def test_unsafe_declarations_are_not_compiled(self):
+        options = StyleOptions(
+            background_type='gradient',
+            background_gradient='linear-gradient(#000, #fff); } body { display: none',
+            text_color='#fff',
+        )
+        self.assertEqual(styles.get_declarations(options), 'color: #fff; text-align: left; border-radius: 8px')
+
+    @override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+    def test_stylesheet_skips_unsafe_stored_declarations(self):
+        name = styles.compile_page_stylesheet(['color: #fff', 'color: red } body { display: none'])
+        css = default_storage.open(name).read().decode()
+        self.assertEqual(css, styles.get_style_rule('color: #fff') + '\n')
+
+
+class StyleOptionsAdminFormCacheTests(TestCase):
+    def setUp(self):
+        self.model_admin = admin.site._registry[FAQBlock]
+        self.model_admin.__dict__.pop('_style_form_classes', None)
+        self.page = Page.objects.create(title='Admin', slug='admin')
+        self.block = FAQBlock.objects.create(page=self.page, heading='FAQ')
+        User = get_user_model()
+        self.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.editor = User.objects.create_user('editor', 'editor@example.com', 'pw', is_staff=True)
+        self.editor.user_permissions.set(Permission.objects.filter(codename__in=['add_faqblock', 'change_faqblock']))
+
+    def request(self, user):
+        request = RequestFactory().get('/admin/')
+        request.user = get_user_model().objects.get(pk=user.pk)
+        return request
+
+    def get_form(self, request, obj, **kwargs):
+        # As ModelAdmin.changeform_view() calls it
+        fields = flatten_fieldsets(self.model_admin.get_fieldsets(request, obj))
+        return self.model_admin.get_form(request, obj, change=obj is not None, fields=fields, **kwargs)
+
+    def test_form_class_is_reused(self):
+        request = self.request(self.superuser)
+        form_class = self.get_form(request, self.block)
+        self.assertIs(self.get_form(self.request(self.superuser), self.block), form_class)
+        self.assertIn('style_background_color', form_class.base_fields)
+        self.assertIn('heading', form_class.base_fields)
+
+    def test_cache_key_covers_what_the_form_depends_on(self):
+        request = self.request(self.superuser)
+        change_form = self.get_form(request, self.block)
+        self.assertIsNot(self.get_form(request, None), change_form)
+        self.assertIsNot(self.model_admin.get_form(request, self.block, change=True, fields=['heading']), change_form)
+
+        key = self.model_admin._get_form_cache_key
+        self.assertNotEqual(key(request, self.block, {}), key(request, None, {}))
+        self.assertNotEqual(key(request, self.block, {}), key(request, self.block, {'fields': ['heading']}))
+        # Related-object links depend on the user's permissions on the page admin
+        self.assertNotEqual(key(request, self.block, {}), key(self.request(self.editor), self.block, {}))
+
+
+class StyleOptionsInternTests(TestCase):
+    def setUp(self):
+        self.page = Page.objects.create(title='Styles', slug='styles')
+
+    def test_identical_options_share_one_row(self):
+        first = StyleOptions.intern(StyleOptions(text_align='center', shadow=True))
+        second = StyleOptions.intern(StyleOptions(text_align='center', shadow=True))
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(StyleOptions.objects.filter(content_hash=first.content_hash).count(), 1)
+        self.assertNotEqual(StyleOptions.intern(StyleOptions(text_align='right')).pk, first.pk)
+
+    def test_blocks_without_options_share_the_default(self):
+        faq = FAQBlock.objects.create(page=self.page, heading='FAQ')
+        cta = CallToActionBlock.objects.create(page=self.page, heading='Join')
+        self.assertEqual(faq.style_options, StyleOptions.get_default())
+        self.assertEqual(cta.style_options_id, faq.style_options_id)
+
+    def test_copy_leaves_the_shared_row_untouched(self):
+        shared = StyleOptions.intern(StyleOptions(text_align='center'))
+        copy = shared.copy(text_align='right')
+        self.assertIsNone(copy.pk)
+        self.assertEqual(copy.padding_top, shared.padding_top)
+
+        changed = StyleOptions.intern(copy)
+        self.assertNotEqual(changed.pk, shared.pk)
+        shared.refresh_from_db()
+        self.assertEqual(shared.text_align, 'center')
+        # Copying back to the original values finds the original row
+        self.assertEqual(StyleOptions.intern(changed.copy(text_align='center')).pk, shared.pk)
+
+    def test_gc_deletes_only_unreferenced_rows(self):
+        default = StyleOptions.get_default()
+        used = StyleOptions.intern(StyleOptions(text_align='center'))
+        unused = StyleOptions.intern(StyleOptions(text_align='right'))
+        FAQBlock.objects.create(page=self.page, heading='FAQ', style_options=used)
+
+        self.assertEqual(list(unreferenced_style_options()), [unused])
+        call_command('gc_style_options', stdout=StringIO())
+        self.assertEqual(set(StyleOptions.objects.all()), {default, used})
+
+
+class PageLayoutTests(TestCase):
+    def setUp(self):
+        self.page = Page.objects.create(title='Layout', slug='layout')
+        self.page.blocks.all().delete()
+        self.faq = FAQBlock.objects.create(page=self.page, heading='FAQ', order=2)
+        self.text = TextImageBlock.objects.create(page=self.page, heading='Text', order=1)
+        self.cta = CallToActionBlock.objects.create(page=self.page, heading='Join', order=3)
+
+    def test_block_models_include_every_typed_block(self):
+        typed = {model for model in apps.get_models() if issubclass(model, BaseBlock)}
+        self.assertEqual(get_block_models()[0], Block)
+        self.assertEqual(set(get_block_models()[1:]), typed)
+        self.assertIn(CallToActionBlock, typed)
+
+    def test_layout_is_one_query(self):
+        with self.assertNumQueries(1):
+            layout = get_page_layout(self.page)
+        self.assertEqual(len(layout), 3)
+
+    def test_blocks_load_in_layout_order_with_children(self):
+        FAQItem.objects.create(block=self.faq, question='When?', answer='Soon')
+        # Layout, then each block model with its StyleOptions joined and children prefetched
+        with self.assertNumQueries(5):
+            blocks = get_page_blocks(self.page)
+            self.assertEqual([item.question for item in blocks[1].faqs.all()], ['When?'])
+        self.assertEqual(blocks, [self.text, self.faq, self.cta])
+
+    def test_queryset_update_keeps_the_layout_in_sync(self):
+        FAQBlock.objects.filter(pk=self.faq.pk).update(is_active=False)
+        self.assertEqual(get_page_blocks(self.page), [self.text, self.cta])
+
+        TextImageBlock.objects.filter(pk=self.text.pk).update(order=9)
+        FAQBlock.objects.update(is_active=True)
+        self.assertEqual(get_page_blocks(self.page), [self.faq, self.cta, self.text])
+
+    def test_moving_blocks_in_bulk_moves_their_entries(self):
+        other = Page.objects.create(title='Other', slug='other')
+        CallToActionBlock.objects.filter(pk=self.cta.pk).update(page=other)
+        self.assertEqual(get_page_blocks(self.page), [self.text, self.faq])
+        self.assertEqual(get_page_blocks(other), [self.cta])
+
+        self.cta.page = self.page
+        CallToActionBlock.objects.bulk_update([self.cta], ['page'])
+        self.assertEqual(get_page_blocks(other), [])
+        self.assertEqual(get_page_blocks(self.page), [self.text, self.faq, self.cta])
+
+    def test_bulk_create_indexes_new_blocks(self):
+        created = CallToActionBlock.objects.bulk_create([
+            CallToActionBlock(page=self.page, heading='First', order=0),
+        ])
+        self.assertEqual(get_page_blocks(self.page)[0], created[0])
+
+    def test_sync_layout_repairs_a_stale_index(self):
+        PageLayoutEntry.objects.filter(page=self.page).delete()
+        PageLayoutEntry.objects.create(page=self.page, content_type=ContentType.objects.get_for_model(FAQBlock), object_id=999)
+        sync_layout(self.page)
+        self.assertEqual(get_page_blocks(self.page), [self.text, self.faq, self.cta])
+        self.assertEqual(PageLayoutEntry.objects.filter(page=self.page).count(), 3)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.page = Page.objects.create(title='Fragments', slug='fragments')
+        self.page.blocks.all().delete()
+        self.faq = FAQBlock.objects.create(page=self.page, heading='Questions', order=1)
+        self.item = FAQItem.objects.create(block=self.faq, question='When?', answer='Soon')
+        self.cta = CallToActionBlock.objects.create(page=self.page, heading='Join', order=2)
+
+    def render(self):
+        """Rendered fragments of the page, and how many blocks had to be rendered"""
+        with mock.patch.object(blocks_module, 'render_block', wraps=blocks_module.render_block) as render_block:
+            fragments = render_page_blocks(self.page)
+        return fragments, render_block.call_count
+
+    def test_fragments_are_reused(self):
+        fragments, rendered = self.render()
+        self.assertEqual(rendered, 2)
+        self.assertIn('Questions', fragments[0])
+        self.assertEqual(self.render(), (fragments, 0))
+        with mock.patch.object(blocks_module, 'render_block') as render_block:
+            self.assertEqual(render_blocks([self.faq, self.cta]), fragments)
+        render_block.assert_not_called()
+
+    def test_block_save_rebuilds_its_fragment_only(self):
+        self.render()
+        self.faq.heading = 'Answers'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.faq.save()
+        fragments, rendered = self.render()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Answers', fragments[0])
+
+    def test_child_item_save_rebuilds_its_block(self):
+        self.render()
+        self.item.question = 'Where?'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        fragments, rendered = self.render()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Where?', fragments[0])
+
+    def test_style_options_change_rebuilds_the_blocks_using_them(self):
+        self.cta.style_options = StyleOptions.intern(StyleOptions(text_align='center'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cta.save()
+        self.render()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cta.style_options.shadow = True
+            self.cta.style_options.save()
+        self.assertEqual(self.render()[1], 1)
+
+    def test_cacheable_templates_are_checked(self):
+        self.assertEqual(get_uncacheable_names('blocks/contactformblock.html'), ['csrf_token'])
+        self.assertEqual(get_uncacheable_names('blocks/galleryblock.html'), [])
+        self.assertEqual(check_cacheable_block_templates(None), [])
+        with mock.patch.object(ContactFormBlock, 'cache_fragment', True):
+            errors = check_cacheable_block_templates(None)
+        self.assertEqual([(error.id, error.obj) for error in errors], [('page_content.W001', ContactFormBlock)])
+
+
+class QueryBudgetTests(TestCase):
+    def run_queries(self, count, limit):
+        with QueryBudget(limit, label='/page/test/') as budget:
+            for _ in range(count):
+                Page.objects.exists()
+        return budget
+
+    def test_warns_over_the_limit(self):
+        with self.assertLogs('page_content.blocks', 'WARNING') as logs:
+            budget = self.run_queries(3, limit=2)
+        self.assertEqual(budget.count, 3)
+        self.assertEqual(logs.output, ['WARNING:page_content.blocks:/page/test/ ran 3 queries (budget 2)'])
+
+    def test_quiet_within_the_limit(self):
+        with self.assertNoLogs('page_content.blocks', 'WARNING'):
+            self.assertEqual(self.run_queries(2, limit=2).count, 2)
+
+    def test_page_render_stays_within_budget(self):
+        page = Page.objects.create(title='Budget', slug='budget', is_published=True)
+        faq_type = BlockType.objects.create(name='FAQ', slug='faq-block')
+        text_type = BlockType.objects.create(name='Text', slug='text')
+        for order in range(3):
+            faq = FAQBlock.objects.create(page=page, heading=f'FAQ {order}', order=order)
+            FAQItem.objects.create(block=faq, question='Q', answer='A')
+            Block.objects.create(page=page, block_type=faq_type, order=order * 2)
+            Block.objects.create(page=page, block_type=text_type, content='<p>Text</p>', order=order * 2 + 1)
+
+        with self.assertNoLogs('page_content.blocks', 'WARNING'), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/page/{page.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'FAQ 2')
+        self.assertLessEqual(len(queries), settings.PAGE_QUERY_BUDGET)
@@ -1,25 +1,19 @@
 from django.shortcuts import render, get_object_or_404
+from .blocks import get_page_stylesheet, query_budget, render_blocks, resolve_page_blocks
 from .models import Page
 
+
+@query_budget()
 def page_detail(request, slug):
     page = get_object_or_404(Page, slug=slug, is_published=True)
-    blocks = page.blocks.filter(is_active=True).order_by('order')
-    content_blocks = []
-    for block in blocks:
-        # Get the specific block instance
-        block_model = block.block_type.slug.replace('-', '_')
-        try:
-            specific_block = getattr(page, f'content_blocks_{block_model}').filter(is_active=True).order_by('order').first()
-            if specific_block:
-                content_blocks.append(specific_block)
-        except AttributeError:
-            # Fallback to generic block
-            content_blocks.append(block)
-    
+    # Generic Blocks mapped to their typed blocks with one query per block model
+    blocks, content_blocks = resolve_page_blocks(page)
+
     context = {
         'page': page,
         'blocks': blocks,
-        'content_blocks': content_blocks,
+        'content_blocks': render_blocks(content_blocks, request),
+        'page_stylesheet': get_page_stylesheet(page),
     }
     
     # Use custom template if specified, otherwise default
@@ -2,8 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse
 from .forms import PlayerRegistrationForm, CustomPlayerRegistrationForm
 from .models import PlayerRegistration
-from core.models import WebsiteTheme
-from .models import RegistrationPageSetting
+from core import site_cache
 
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
@@ -29,8 +28,8 @@ def register_player(request):
     context = {
         'form': form,
         'payment_info': payment_info,
-        'theme': WebsiteTheme.objects.filter(is_active=True).first(),
-        'registration_style': RegistrationPageSetting.objects.filter(is_active=True).first()
+        'theme': site_cache.get_active_theme(),
+        'registration_style': site_cache.get_registration_setting()
     }
     return render(request, 'registration/registration_form.html', context)
 
@@ -31,6 +31,12 @@ class SportDetailView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Served by the (sport, date) index
+        context['upcoming_events'] = self.object.events.upcoming()[:6]
+        return context
+
 
 class SportUpdateView(UpdateView):
     model = Sport
@@ -0,0 +1,193 @@
+// Gallery infinite scroll (vanilla JS)
+// Pages come from the keyset-paginated JSON API (gallery:gallery_items_api):
+// each response carries the cursor of the next page. The "Load more" links
+// keep working without JavaScript; with it they load while scrolling.
+document.addEventListener('DOMContentLoaded', function () {
+  const IMAGE_SIZES = '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw';
+
+  function el(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) node.className = className;
+    if (text) node.textContent = text;
+    return node;
+  }
+
+  function truncateWords(text, count) {
+    const words = text.trim().split(/\s+/);
+    return words.length > count ? words.slice(0, count).join(' ') + ' …' : text;
+  }
+
+  function buildImageItem(item) {
+    const col = el('div', 'col-lg-4 col-md-6 mb-4 gallery-item fade-in-up');
+    col.dataset.category = item.category.slug;
+    col.dataset.tags = item.tags.map(tag => tag.slug).join(' ');
+
+    const link = el('a', 'gallery-link d-block');
+    link.href = item.image.url;
+    link.dataset.gall = 'gallery';
+    const img = el('img', 'img-fluid');
+    img.src = item.image.src;
+    img.alt = item.title;
+    img.title = item.title;
+    img.loading = 'lazy';
+    if (item.image.placeholder) {
+      img.style.background = "url('" + item.image.placeholder + "') center / cover no-repeat";
+    }
+    if (item.image.sources.length) {
+      const picture = el('picture');
+      item.image.sources.forEach(source => {
+        const node = el('source');
+        node.type = source.type;
+        node.srcset = source.srcset;
+        node.sizes = IMAGE_SIZES;
+        picture.appendChild(node);
+      });
+      picture.appendChild(img);
+      link.appendChild(picture);
+    } else {
+      link.appendChild(img);
+    }
+    col.appendChild(link);
+
+    const overlay = el('div', 'gallery-overlay');
+    const inner = el('div', 'text-center');
+    inner.appendChild(el('h5', 'text-white', item.title));
+    inner.appendChild(el('p', 'text-white-50', item.category.name));
+    if (item.description) inner.appendChild(el('p', 'text-white-50 small', truncateWords(item.description, 10)));
+    overlay.appendChild(inner);
+    col.appendChild(overlay);
+    return col;
+  }
+
+  function buildVideoItem(item) {
+    const col = el('div', 'col-lg-3 col-md-4 col-sm-6 mb-4 fade-in-up');
+    const wrapper = el('div', 'video-item position-relative rounded overflow-hidden shadow-sm');
+    const link = el('a', 'd-block video-thumb');
+    link.href = '#';
+    link.dataset.bsToggle = 'modal';
+    link.dataset.bsTarget = '#videoModal';
+    link.dataset.videoId = item.video.id;
+    link.dataset.videoTitle = item.title;
+    const img = el('img', 'img-fluid w-100');
+    img.src = item.video.thumbnail;
+    img.alt = item.title;
+    img.loading = 'lazy';
+    link.appendChild(img);
+
+    const overlay = el('div', 'video-overlay');
+    const play = el('div', 'play-button');
+    play.appendChild(el('i', 'fas fa-play'));
+    overlay.appendChild(play);
+    const info = el('div', 'video-info');
+    info.appendChild(el('h6', 'video-title mb-1', item.title));
+    info.appendChild(el('span', 'video-category', item.category.name));
+    overlay.appendChild(info);
+    link.appendChild(overlay);
+    wrapper.appendChild(link);
+    col.appendChild(wrapper);
+    return col;
+  }
+
+  function setupGrid(grid) {
+    let link = document.querySelector('.gallery-load-more[data-grid="' + grid.id + '"]');
+    let loading = false;
+    // Responses of superseded requests (e.g. before a filter change) are dropped
+    let generation = 0;
+
+    function ensureLink() {
+      if (!link) {
+        const holder = el('div', 'text-center mb-5');
+        link = el('a', 'btn btn-outline-primary gallery-load-more', 'Load more');
+        link.dataset.grid = grid.id;
+        link.href = '#';
+        holder.appendChild(link);
+        grid.after(holder);
+        link.addEventListener('click', onClick);
+        observer && observer.observe(link);
+      }
+      return link;
+    }
+
+    function load(replace) {
+      if (loading && !replace) return;
+      const cursor = replace ? '' : (link && link.dataset.cursor) || '';
+      if (!replace && !cursor) return;
+      loading = true;
+      const current = ++generation;
+
+      const params = new URLSearchParams({ kind: grid.dataset.kind });
+      if (grid.dataset.category) params.set('category', grid.dataset.category);
+      if (grid.dataset.tag) params.set('tag', grid.dataset.tag);
+      if (cursor) params.set('cursor', cursor);
+
+      fetch(grid.dataset.apiUrl + '?' + params.toString(), { headers: { Accept: 'application/json' } })
+        .then(response => {
+          if (!response.ok) throw new Error('HTTP ' + response.status);
+          return response.json();
+        })
+        .then(data => {
+          if (current !== generation) return;
+          if (replace) grid.querySelectorAll('.gallery-item, .gallery-empty').forEach(node => node.remove());
+          const build = grid.dataset.kind === 'video' ? buildVideoItem : buildImageItem;
+          data.results.forEach(item => grid.appendChild(build(item)));
+          if (replace && !data.results.length) {
+            grid.appendChild(el('p', 'col-12 text-center text-muted gallery-empty', 'No items match this filter.'));
+          }
+
+          const more = ensureLink();
+          more.dataset.cursor = data.next_cursor || '';
+          more.parentElement.hidden = !data.next_cursor;
+          if (observer && data.next_cursor) {
+            // Re-observing reports the link again if it is still in view
+            observer.unobserve(more);
+            observer.observe(more);
+          }
+          document.dispatchEvent(new CustomEvent('gallery:updated', { detail: { grid: grid } }));
+        })
+        .catch(err => console.warn('Loading gallery items failed', err))
+        .finally(() => {
+          if (current === generation) loading = false;
+        });
+    }
+
+    function onClick(event) {
+      event.preventDefault();
+      load(false);
+    }
+
+    const observer = 'IntersectionObserver' in window
+      ? new IntersectionObserver(entries => {
+          if (entries.some(entry => entry.isIntersecting)) load(false);
+        }, { rootMargin: '400px 0px' })
+      : null;
+
+    if (link) {
+      link.addEventListener('click', onClick);
+      if (observer) observer.observe(link);
+    }
+
+    return { load: load };
+  }
+
+  const imageGrid = document.getElementById('gallery-grid');
+  const videoGrid = document.getElementById('video-grid');
+  if (videoGrid) setupGrid(videoGrid);
+  if (!imageGrid) return;
+  const images = setupGrid(imageGrid);
+
+  // Filters fetch the matching items instead of only hiding the loaded ones
+  document.querySelectorAll('[data-filter-category]').forEach(button => {
+    button.addEventListener('click', function () {
+      const value = this.dataset.filterCategory;
+      imageGrid.dataset.category = value === 'all' ? '' : value;
+      images.load(true);
+    });
+  });
+  document.querySelectorAll('[data-filter-tag]').forEach(button => {
+    button.addEventListener('click', function () {
+      const value = this.dataset.filterTag;
+      imageGrid.dataset.tag = value === 'all' ? '' : value;
+      images.load(true);
+    });
+  });
+});
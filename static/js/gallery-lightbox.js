@@ -3,9 +3,10 @@ document.addEventListener('DOMContentLoaded', function () {
   // Elements
   const categoryFilters = document.querySelectorAll('[data-filter-category]');
   const tagFilters = document.querySelectorAll('[data-filter-tag]');
-  const galleryItems = document.querySelectorAll('.gallery-item');
 
   function filterItems() {
+    // Queried each time: gallery-infinite.js adds items after load
+    const galleryItems = document.querySelectorAll('.gallery-item');
     const activeCategory = document.querySelector('[data-filter-category].active')?.dataset.filterCategory || 'all';
     const activeTag = document.querySelector('[data-filter-tag].active')?.dataset.filterTag || 'all';
 
@@ -15,7 +16,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
       let showItem = true;
       if (activeCategory !== 'all' && itemCategory !== activeCategory) showItem = false;
-      if (activeTag !== 'all' && !itemTags.includes(activeTag)) showItem = false;
+      // data-tags holds space-separated tag slugs; match whole tags only
+      if (activeTag !== 'all' && !itemTags.split(' ').includes(activeTag)) showItem = false;
 
       if (showItem) {
         item.style.display = '';
@@ -84,6 +86,7 @@ document.addEventListener('DOMContentLoaded', function () {
     }
   }
 
-  // Init on load
+  // Init on load, and again when more items have been loaded
   initLightbox();
+  document.addEventListener('gallery:updated', initLightbox);
 });
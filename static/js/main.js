@@ -86,7 +86,7 @@ function filterGallery(category, tag) {
             showItem = false;
         }
         
-        if (tagFilter !== 'all' && !itemTags.includes(tagFilter)) {
+        if (tagFilter !== 'all' && !(itemTags || '').split(' ').includes(tagFilter)) {
             showItem = false;
         }
         
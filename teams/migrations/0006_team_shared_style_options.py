@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('page_content', '0008_styleoptions_shared'),
+        ('teams', '0005_team_contact_icon_bg_team_contact_icon_color'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='team',
+            name='style_options',
+            field=models.ForeignKey(blank=True, help_text='Custom styling options for this team', null=True, on_delete=django.db.models.deletion.SET_NULL, to='page_content.styleoptions'),
+        ),
+    ]
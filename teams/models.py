@@ -15,7 +15,7 @@ class Team(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     # Styling options for team cards and sections
-    style_options = dj_models.OneToOneField(
+    style_options = dj_models.ForeignKey(
         'page_content.StyleOptions', on_delete=dj_models.SET_NULL,
         null=True, blank=True, help_text='Custom styling options for this team'
     )
@@ -39,10 +39,9 @@ class Team(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        # Ensure style_options exists for the team
+        # Fall back to the shared default StyleOptions
         if not self.style_options:
-            so = StyleOptions.objects.create()
-            self.style_options = so
+            self.style_options = StyleOptions.get_default()
         super().save(*args, **kwargs)
 
 
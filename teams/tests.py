@@ -1,3 +1,23 @@
-from django.test import TestCase
+from django.core.files.storage import default_storage
 
-# Create your tests here.
+from core.tests import MediaTestCase
+from page_content.models import StyleOptions
+from sports.models import Sport
+from .models import Team
+
+
+class TeamListTests(MediaTestCase):
+    def test_team_styles_come_from_a_stylesheet(self):
+        sport = Sport.objects.create(name='Cricket', slug='cricket')
+        options = StyleOptions.intern(StyleOptions(background_color='#102030'))
+        Team.objects.create(name='Strikers', sport=sport, style_options=options)
+
+        response = self.client.get('/teams/')
+        self.assertContains(response, options.css_classes)
+        self.assertNotContains(response, options.css_declarations)
+
+        url = response.context['team_stylesheet']
+        self.assertContains(response, f'<link rel="stylesheet" href="{url}">')
+        name = url.removeprefix(default_storage.base_url)
+        with default_storage.open(name) as fh:
+            self.assertIn(options.css_declarations, fh.read().decode())
@@ -1,5 +1,7 @@
+from django.core.files.storage import default_storage
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView
+from page_content.styles import compile_page_stylesheet
 from .models import Team, Player
 from django.db.models import Count, Q
 
@@ -12,12 +14,17 @@ class TeamListView(ListView):
     
     def get_queryset(self):
         # Annotate active players count to avoid per-template DB hits and unsupported template calls
-        return Team.objects.filter(is_active=True).annotate(
+        return Team.objects.filter(is_active=True).select_related('style_options').annotate(
             active_players=Count('players', filter=Q(players__is_active=True))
         ).order_by('name')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Per-team style options as classes backed by one shared stylesheet, not inline styles
+        stylesheet = compile_page_stylesheet(
+            [team.style_options.css_declarations for team in context['teams'] if team.style_options]
+        )
+        context['team_stylesheet'] = default_storage.url(stylesheet) if stylesheet else ''
         # Add PageHero for teams page
         try:
             from core.models import PageHero